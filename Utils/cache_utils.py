@@ -0,0 +1,308 @@
+# Script to cache the responses of figure callbacks
+
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+import dash
+import flask
+import plotly
+from dash import _validate
+from dash.exceptions import PreventUpdate
+
+from Utils.data_utils import pinned_tables
+from Utils.metrics_utils import note_cache, phase
+
+try:
+    import orjson
+except ImportError:  # Responses are serialized with plotly's JSON encoder instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Responses are only pre-compressed with gzip
+    brotli = None
+
+GZIP_LEVEL = 9
+# Compression happens once per cached response, but quality 10-11 takes ~20x longer than 9 for a few % less
+BROTLI_QUALITY = 9
+
+
+def _default(value):
+    # What orjson doesn't serialize natively: plotly objects, pandas objects and non-numeric NumPy arrays
+    if hasattr(value, "to_plotly_json"):
+        return value.to_plotly_json()
+    if hasattr(value, "to_numpy"):
+        return value.to_numpy()
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return plotly.utils.PlotlyJSONEncoder().default(value)
+
+
+def encode(value):
+    '''
+    Serializes a callback response like plotly's JSON encoder (NaN and infinity as null), with orjson when it is
+    installed.
+
+    :return: JSON (str)
+    '''
+    if orjson is None:
+        return json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder)
+    return orjson.dumps(value, default=_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+class Response(str):
+    '''
+    Serialized callback response (JSON) that keeps its gzip and brotli encodings once they are made.
+    '''
+
+    def compressed(self, encoding):
+        '''
+        :param encoding: "gzip" or "br"
+        :return: The response compressed with encoding (bytes)
+        '''
+        encodings = self.__dict__.setdefault("encodings", {})
+        if encoding not in encodings:
+            if encoding == "br":
+                encodings[encoding] = brotli.compress(self.encode(), quality=BROTLI_QUALITY)
+            else:
+                # mtime=0 so the same response always compresses to the same bytes
+                encodings[encoding] = gzip.compress(self.encode(), compresslevel=GZIP_LEVEL, mtime=0)
+        return encodings[encoding]
+
+
+class FigureCache:
+    '''
+    Bounded LRU cache of serialized callback responses keyed by (callback output id, inputs). The least recently
+    used entries are evicted once either max_entries or max_bytes is exceeded. Responses are stored as
+    Response, so their compressed encodings (not counted in max_bytes, ~5% of the JSON) are made once.
+
+    Each entry remembers the version of the tables its callback read (see Utils.data_utils.pinned_tables()), and is
+    dropped when one of them is reloaded (see Utils.data_utils.TableLoader.reload()); entries made from other tables
+    stay cached.
+    '''
+
+    def __init__(self, max_entries=2048, max_bytes=256 * 2**20):
+        '''
+        :param max_entries: Maximum number of cached responses
+        :param max_bytes: Maximum total size of the cached responses, in bytes
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        # Key -> dict of (loader, table key) -> version of the tables read to make the entry
+        self._reads = {}
+        # Dash serves callbacks from several threads
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __call__(self, output_id):
+        '''
+        Decorator caching the JSON response of a Dash callback. Inside a request, the response is also handed to
+        send_compressed() through flask.g.
+
+        :param output_id: Callback output id (ie. "DonRateAvgDonAmt-Age.figure")
+        '''
+        def decorator(callback):
+            @wraps(callback)
+            def cached(*args, **kwargs):
+                key = (output_id, json.dumps(args))
+                response = self.get(key)
+                if response is None:
+                    # Made from the tables as they are when the callback starts, even if they are reloaded meanwhile
+                    with pinned_tables() as reads:
+                        response = Response(callback(*args, **kwargs))
+                    self.put(key, response, reads)
+                if flask.has_request_context():
+                    flask.g.cached_response = response
+                return response
+            return cached
+        return decorator
+
+    def get(self, key):
+        '''
+        :return: Cached response for key, or None
+        '''
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None and self._stale(self._reads.get(key)):
+                self._remove(key)
+                self.invalidations += 1
+                response = None
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        note_cache(response is not None)
+        return response
+
+    def put(self, key, response, reads=None):
+        '''
+        :param reads: Optional dict of (loader, table key) -> version of the tables read to make the response (see
+                      Utils.data_utils.pinned_tables()); the entry is dropped once one of them is reloaded
+        '''
+        response = response if isinstance(response, Response) else Response(response)
+        size = len(response)
+        reads = dict(reads or {})
+        if size > self.max_bytes or self._stale(reads):
+            # Made from tables reloaded while the callback ran
+            return
+        for loader in set(loader for loader, _ in reads):
+            loader.subscribe(self.invalidate)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = response
+            self._reads[key] = reads
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    @staticmethod
+    def _stale(reads):
+        return any(loader.table_version(key) != version for (loader, key), version in (reads or {}).items())
+
+    def _remove(self, key):
+        self.size -= len(self._entries.pop(key))
+        self._reads.pop(key, None)
+
+    def invalidate(self, loader, keys):
+        '''
+        Drops the entries made from some of a loader's tables. Called by the loaders the cached callbacks read from
+        when they reload tables.
+
+        :param loader: TableLoader
+        :param keys: (name, source) of the tables reloaded
+        :return: Number of entries dropped
+        '''
+        keys = set((loader, key) for key in keys)
+        with self._lock:
+            stale = [key for key, reads in self._reads.items() if keys.intersection(reads)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._reads.clear()
+            self.size = 0
+
+    def stats(self):
+        '''
+        :return: Dict of hit/miss/eviction/invalidation counters and the current number of entries and bytes
+        '''
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations, "entries": len(self._entries), "bytes": self.size}
+
+
+def cache_callbacks(app, cache):
+    '''
+    Wraps every figure callback registered on a Dash app with a FigureCache and sends the cached responses
+    pre-compressed (see send_compressed()). Call once, after the callbacks are defined.
+
+    :param app: Dash app
+    :param cache: FigureCache
+    '''
+    for output_id, callback in app.callback_map.items():
+        if ".figure" in output_id:
+            callback["callback"] = cache(output_id)(callback["callback"])
+    send_compressed(app)
+
+
+def encode_callbacks(app):
+    '''
+    Serializes the responses of an app's figure callbacks with encode() instead of Dash's json.dumps() with plotly's
+    encoder, which serializes every figure twice to turn NaN into null. Call after the callbacks are defined (and
+    batch_callbacks()), before the other wrappers (serve_bundle(), cache_callbacks()).
+
+    :param app: Dash app
+    '''
+    for output_id, callback in app.callback_map.items():
+        if ".figure" in output_id:
+            # Dash wraps callbacks with functools.wraps, the function as written is one __wrapped__ away
+            callback["callback"] = _encoded(callback["callback"].__wrapped__, output_id)
+
+
+def _encoded(function, output_id):
+    # Same response as Dash's wrapper (dash.Dash.callback), for outputs without pattern-matching ids
+    multi = output_id.startswith("..")
+
+    @wraps(function)
+    def encoded(*args, outputs_list):
+        value = function(*args)
+        if isinstance(value, type(dash.no_update)):
+            raise PreventUpdate
+        values, outputs = (value, outputs_list) if multi else ([value], [outputs_list])
+        _validate.validate_multi_return(outputs, values, output_id)
+
+        response = {}
+        for value, output in zip(values, outputs):
+            if not isinstance(value, type(dash.no_update)):
+                response.setdefault(output["id"], {})[output["property"]] = value
+        if not response:
+            raise PreventUpdate
+        with phase("serialize"):
+            return encode({"response": response, "multi": True})
+    return encoded
+
+
+def accepted_encoding(accept_encoding):
+    '''
+    :param accept_encoding: Accept-Encoding request header
+    :return: "br" or "gzip", whichever the client accepts (brotli preferred), or None
+    '''
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1
+        except ValueError:
+            quality = 0
+        if quality > 0:
+            accepted.add(name.strip())
+    if "br" in accepted and brotli is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def send_compressed(app):
+    '''
+    Sends the responses served by a FigureCache already compressed, in the encoding the client accepts, instead of
+    compressing them on every request. Other responses are still compressed by Flask-Compress, which Dash sets up:
+    this hook is registered after it, so it runs first and Flask-Compress skips responses that have a
+    Content-Encoding. Call once per Dash app serving cached callbacks (cache_callbacks() does for the app it wraps).
+
+    :param app: Dash app
+    '''
+    @app.server.after_request
+    def compressed(response):
+        cached = flask.g.pop("cached_response", None)
+        encoding = accepted_encoding(flask.request.headers.get("Accept-Encoding", ""))
+        if cached is None or encoding is None or response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        response.set_data(cached.compressed(encoding))
+        response.headers["Content-Encoding"] = encoding
+        vary = response.headers.get("Vary")
+        if not vary:
+            response.headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            response.headers["Vary"] = "{}, Accept-Encoding".format(vary)
+        return response
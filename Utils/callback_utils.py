@@ -0,0 +1,202 @@
+# Script to combine Dash callbacks and move them to the browser
+
+import json
+import logging
+
+import dash
+import dash_core_components as dcc
+from dash.exceptions import PreventUpdate
+
+from Utils.cache_utils import cache_callbacks, encode_callbacks
+from Utils.metrics_utils import instrument_callbacks, observe, output_label
+from Utils.prerender import figure_requests, outputs_list, serve_bundle
+
+logger = logging.getLogger(__name__)
+
+
+def batch_callbacks(app, inputs, name="update_graphs"):
+    '''
+    Answers a change of the given inputs with one multi-output callback instead of one request per output: every
+    single-output callback of the app triggered by exactly these inputs (and no state) is folded into a callback that
+    calls them all and returns their outputs together. Call after the callbacks are defined (and before
+    serve_bundle() and cache_callbacks()).
+
+    The folded callbacks stay registered on the server, so their outputs can still be requested one at a time, but
+    the page only sees the batched callback. A folded callback that raises is logged and its output left unchanged
+    (dash.no_update); the other outputs are still updated.
+
+    :param app: Dash app
+    :param inputs: List of dash.dependencies.Input
+    :param name: Name of the batched callback function
+    :return: Output ids of the folded callbacks, in output order
+    '''
+    key = [{"id": i.component_id, "property": i.component_property} for i in inputs]
+    output_ids = [output_id for output_id, callback in app.callback_map.items()
+                  if not output_id.startswith("..") and callback["inputs"] == key and not callback["state"]]
+    # Dash wraps callbacks with functools.wraps, the function as written is one __wrapped__ away
+    # Each timed under its own output as well as the batch's (see Utils.metrics_utils)
+    functions = [observe(output_label(output_id))(app.callback_map[output_id]["callback"].__wrapped__)
+                 for output_id in output_ids]
+
+    app._callback_list[:] = [callback for callback in app._callback_list if callback["output"] not in output_ids]
+
+    def batched(*args):
+        # A callback that fails leaves its output as it is instead of failing the whole batch
+        outputs = []
+        for output_id, function in zip(output_ids, functions):
+            try:
+                outputs.append(function(*args))
+            except PreventUpdate:
+                outputs.append(dash.no_update)
+            except Exception:
+                logger.exception("%s failed for %s in batch %s", output_id, args, name)
+                outputs.append(dash.no_update)
+        return outputs
+
+    batched.__name__ = name
+    outputs = [dash.dependencies.Output(*output_id.rsplit(".", 1)) for output_id in output_ids]
+    app.callback(outputs, inputs)(batched)
+    return output_ids
+
+
+# Applies a figure patch built by _diff() to a copy of the template
+CLIENTSIDE_PATCH = '''
+window.dash_clientside = window.dash_clientside || {};
+window.dash_clientside.figure_store = {
+    render: function(store, output, args) {
+        var entry = store[output];
+        var patch = entry && entry.patches[JSON.stringify(args)];
+        if (patch === undefined) {
+            return window.dash_clientside.no_update;
+        }
+        var figure = JSON.parse(JSON.stringify(entry.template));
+        patch.forEach(function(change) {
+            var path = change[0], parent = figure;
+            for (var i = 0; i < path.length - 1; i++) {
+                parent = parent[path[i]];
+            }
+            if (change.length === 1) {
+                delete parent[path[path.length - 1]];
+            } else {
+                parent[path[path.length - 1]] = change[1];
+            }
+        });
+        return figure;
+    }
+};
+'''
+
+CLIENTSIDE_CALLBACK = '''
+function() {{
+    var args = Array.prototype.slice.call(arguments);
+    var store = args.pop();
+    return window.dash_clientside.figure_store.render(store, "{output_id}", args);
+}}
+'''
+
+
+def _diff(template, value, path=()):
+    '''
+    :return: List of [path, value] changes (or [path] to delete a key) turning template into value. Dicts and lists of
+             the same length holding dicts or lists are compared item by item, anything else is replaced whole.
+    '''
+    if isinstance(template, dict) and isinstance(value, dict):
+        changes = [[list(path) + [key]] for key in template if key not in value]
+        for key, item in value.items():
+            if key in template:
+                changes += _diff(template[key], item, path + (key,))
+            else:
+                changes.append([list(path) + [key], item])
+        return changes
+    if (isinstance(template, list) and isinstance(value, list) and len(template) == len(value) and
+            any(isinstance(item, (dict, list)) for item in value)):
+        changes = []
+        for i, (old, new) in enumerate(zip(template, value)):
+            changes += _diff(old, new, path + (i,))
+        return changes
+    return [] if template == value else [[list(path), value]]
+
+
+def figure_store(app):
+    '''
+    Renders every dropdown combination of an app's figure callbacks (served from the pre-rendered bundle where there
+    is one) and splits each callback's figures into a template and one patch per combination.
+
+    :param app: Dash app
+    :return: Dict of output id -> {"template": figure (list of figures for multi-output callbacks),
+             "patches": {inputs as JSON -> list of changes}}
+    '''
+    # Only the callbacks the page sees (not the ones folded by batch_callbacks())
+    visible = [callback["output"] for callback in app._callback_list]
+    store = {}
+    for output_id, args in figure_requests(app):
+        if output_id not in visible:
+            continue
+        outputs = outputs_list(output_id)
+        response = json.loads(app.callback_map[output_id]["callback"](*args, outputs_list=outputs))["response"]
+        if isinstance(outputs, list):
+            figure = [response[output["id"]][output["property"]] for output in outputs]
+        else:
+            figure = response[outputs["id"]][outputs["property"]]
+
+        entry = store.setdefault(output_id, {"template": figure, "patches": {}})
+        # Keyed like JSON.stringify() of the callback arguments in the browser
+        key = json.dumps(list(args), separators=(",", ":"), ensure_ascii=False)
+        entry["patches"][key] = _diff(entry["template"], figure)
+    return store
+
+
+def clientside_figures(app, store_id="figure-store"):
+    '''
+    Moves the figure callbacks of an app to the browser: the figures of every dropdown combination are sent once with
+    the layout in a dcc.Store (see figure_store()) and clientside callbacks pick them out, so changing a dropdown
+    makes no request. The server callbacks stay registered as a fallback but the page only sees the clientside ones.
+    Call after the callbacks are defined and the other wrappers (serve_bundle(), cache_callbacks()) are applied.
+
+    :param app: Dash app whose layout is an html.Div
+    :param store_id: Id of the dcc.Store holding the figures
+    :return: The figure store
+    '''
+    store = figure_store(app)
+    app.layout.children = list(app.layout.children) + [dcc.Store(id=store_id, data=store)]
+    app._inline_scripts.append(CLIENTSIDE_PATCH)
+
+    for output_id in store:
+        server = app.callback_map[output_id]
+        app._callback_list[:] = [callback for callback in app._callback_list if callback["output"] != output_id]
+        outputs = outputs_list(output_id)
+        if isinstance(outputs, list):
+            outputs = [dash.dependencies.Output(output["id"], output["property"]) for output in outputs]
+        else:
+            outputs = dash.dependencies.Output(outputs["id"], outputs["property"])
+        inputs = [dash.dependencies.Input(i["id"], i["property"]) for i in server["inputs"]]
+        app.clientside_callback(CLIENTSIDE_CALLBACK.format(output_id=output_id), outputs, inputs,
+                                [dash.dependencies.State(store_id, "data")])
+        # Keep answering the output on the server for pages that still ask for it
+        app.callback_map[output_id] = server
+    return store
+
+
+def setup_callbacks(app, name, registry, figure_cache, batch_inputs=None, clientside=False):
+    '''
+    Applies the wrappers every viz puts around its callbacks, in the order they must go on. Call once, after the
+    callbacks are defined.
+
+    :param app: Dash app of the viz
+    :param name: Module name of the viz in Vizes/, which names its pre-rendered bundle
+    :param registry: TableRegistry of the viz
+    :param figure_cache: FigureCache of the viz
+    :param batch_inputs: List of dash.dependencies.Input whose callbacks are batched (see batch_callbacks()), or None
+    :param clientside: Whether to move the figure callbacks to the browser (see clientside_figures())
+    '''
+    if batch_inputs:
+        batch_callbacks(app, batch_inputs)
+    # Serialize figure responses with orjson instead of plotly's encoder
+    encode_callbacks(app)
+    # Serve pre-rendered figures when a bundle was built with python -m Utils.prerender
+    serve_bundle(app, name, registry)
+    cache_callbacks(app, figure_cache)
+    if clientside:
+        clientside_figures(app)
+    # Per-callback latency, payload size and cache metrics, served on /metrics
+    instrument_callbacks(app)
@@ -1,10 +1,1323 @@
 # data_utils.py
+import hashlib
+import logging
+import os
+import sys
+import threading
 import pandas as pd
 import numpy as np
 import glob
+import tempfile
+import textwrap
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows: processes starting at once may each build a missing snapshot
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 values = ["Use with caution", "Estimate suppressed", ""]
 
+# Location of the raw GSS tables and of the columnar store built from them
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLES_DIR = os.path.join(ROOT_DIR, "Tables")
+STORE_DIR = os.path.join(ROOT_DIR, "Store")
+TABLE_PREFIX = "2018-"
+# Processes reading tables at once in load_tables()
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+
+
+def table_names():
+    '''
+    Logical names of every table in Tables/ (file name without the "2018-" prefix and ".csv" suffix).
+
+    :return: Sorted list of table names (ie. "DonRate", "AvgTotDon", etc.)
+    '''
+    paths = glob.glob(os.path.join(TABLES_DIR, TABLE_PREFIX + "*.csv"))
+    return sorted(os.path.basename(path)[len(TABLE_PREFIX):-len(".csv")] for path in paths)
+
+
+def table_path(name):
+    return os.path.join(TABLES_DIR, TABLE_PREFIX + name + ".csv")
+
+
+# Bump when the schema changes the tables it reads, so the columnar store is rebuilt
+SCHEMA_VERSION = 1
+
+
+def partition_path(name):
+    return os.path.join(STORE_DIR, "{}-v{}.npz".format(name, SCHEMA_VERSION))
+
+
+# Columns of the GSS tables: dtype they are read with, strings standing for a missing value besides an empty field,
+# whether values may be missing, and the values allowed (None = any). Unweightedn is a count, with "-" where it wasn't
+# published; floats with NaN, like pandas stores integers with missing values.
+COLUMNS = {
+    "Unnamed: 0": {"dtype": np.int64, "nulls": [], "nullable": False, "values": None},
+    "Group": {"dtype": object, "nulls": [], "nullable": False, "values": None},
+    "Attribute": {"dtype": object, "nulls": [], "nullable": True, "values": None},
+    "Year": {"dtype": np.int64, "nulls": [], "nullable": False, "values": None},
+    "QuestionNo.": {"dtype": object, "nulls": [], "nullable": False, "values": None},
+    "Estimate": {"dtype": np.float64, "nulls": [], "nullable": False, "values": None},
+    "cv": {"dtype": np.float64, "nulls": [], "nullable": True, "values": None},
+    "CI Lower": {"dtype": np.float64, "nulls": [], "nullable": False, "values": None},
+    "CI Upper": {"dtype": np.float64, "nulls": [], "nullable": False, "values": None},
+    "Unweightedn": {"dtype": np.float64, "nulls": ["-"], "nullable": True, "values": None},
+    "QuestionText": {"dtype": object, "nulls": [], "nullable": True, "values": None},
+    "QuestionGroup": {"dtype": object, "nulls": [], "nullable": False, "values": None},
+    # Province tables also break CA down by province code (10 = NL, ..., 59 = BC)
+    "Region": {"dtype": object, "nulls": [], "nullable": False,
+               "values": ["CA", "CA (without QC)", "AT", "QC", "ON", "PR", "AB", "BC",
+                          "10", "11", "12", "13", "24", "35", "46", "47", "48", "59"]},
+    "Province": {"dtype": object, "nulls": [], "nullable": True,
+                 "values": ["NL", "PE", "NS", "NB", "QC", "ON", "MB", "SK", "AB", "BC"]},
+    "Marker": {"dtype": object, "nulls": [], "nullable": True, "values": ["*", "..."]},
+}
+
+BASE_COLUMNS = ["Group", "Attribute", "Year", "QuestionNo.", "Estimate", "cv", "CI Lower", "CI Upper", "Unweightedn",
+                "QuestionText", "QuestionGroup", "Region", "Marker"]
+# Columns of each table family, in file order; tables not listed below are "national"
+FAMILIES = {"national": BASE_COLUMNS,
+            # Broken down by province as well as region
+            "provincial": BASE_COLUMNS[:-1] + ["Province", "Marker"],
+            # Cross tabulations written with their dataframe index
+            "indexed": ["Unnamed: 0"] + BASE_COLUMNS}
+PROVINCIAL_TABLES = ["ActivityVolRate", "AvgHoursVol", "AvgNumCauses", "AvgNumCausesVol", "AvgTotDon", "AvgTotHours",
+                     "AvgTotNumDon", "DonRate", "FormsGiving", "FormsVolunteering", "PercTotDonations",
+                     "PercTotDonors", "PercTotHours", "PercTotVolunteers", "TopCauseFocus", "TopCauseFocusVol",
+                     "VolRate"]
+INDEXED_TABLES = ["AvgAmtBarriers", "AvgAmtMotivations", "BarriersByCause", "MotivationsByCause"]
+
+
+class SchemaError(ValueError):
+    '''
+    A table doesn't match its schema (see table_schema()).
+    '''
+
+
+def table_family(name):
+    if name in PROVINCIAL_TABLES:
+        return "provincial"
+    if name in INDEXED_TABLES:
+        return "indexed"
+    return "national"
+
+
+def table_schema(name):
+    '''
+    :param name: Table name (str)
+    :return: Dict of column name -> column schema (see COLUMNS), in file order
+    '''
+    return {column: COLUMNS[column] for column in FAMILIES[table_family(name)]}
+
+
+def validate_table(name, df, limit=5):
+    '''
+    Checks a table read from its CSV against its schema.
+
+    :param name: Table name (str)
+    :param df: Pandas dataframe
+    :param limit: Rows listed per violation
+    :return: List of violations (str), empty if the table matches its schema
+    '''
+    schema = table_schema(name)
+    violations = []
+    if list(df.columns) != list(schema):
+        violations.append("columns {} instead of {}".format(list(df.columns), list(schema)))
+
+    dtypes = df.dtypes
+    for column, spec in schema.items():
+        if column not in dtypes:
+            continue
+        if dtypes[column] != spec["dtype"]:
+            violations.append("{}: {} instead of {}".format(column, dtypes[column], np.dtype(spec["dtype"])))
+            continue
+        if spec["nullable"] and spec["values"] is None:
+            continue
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            # Checked once per distinct value; codes are -1 where a value is missing
+            codes, distinct = pd.factorize(values)
+            missing = codes < 0
+        else:
+            codes, distinct = None, None
+            missing = np.isnan(values) if values.dtype.kind == "f" else np.zeros(len(values), dtype=bool)
+        if not spec["nullable"] and missing.any():
+            violations.append("{}: missing on rows {}".format(column, np.flatnonzero(missing)[:limit].tolist()))
+        if spec["values"] is not None:
+            unexpected = ~pd.Index(distinct).isin(spec["values"])
+            if unexpected.any():
+                rows = np.flatnonzero(unexpected[codes] & ~missing)[:limit]
+                violations.append("{}: unexpected values {} on rows {}".format(
+                    column, values[rows].tolist(), rows.tolist()))
+    return violations
+
+
+def _parse_csv(name, path):
+    schema = table_schema(name)
+    try:
+        return pd.read_csv(path, dtype={column: spec["dtype"] for column, spec in schema.items()},
+                           na_values={column: spec["nulls"] for column, spec in schema.items() if spec["nulls"]})
+    except ValueError as e:
+        # Values that don't parse as their column's dtype, rows with too many fields, etc.
+        raise SchemaError("{}: {}".format(name, e)) from e
+
+
+def read_csv_table(name, path=None):
+    '''
+    Reads a table straight from its CSV file (the slow path the columnar store replaces), with the dtypes and missing
+    values of its schema (see table_schema()) rather than inferred ones.
+
+    :param name: Table name (str)
+    :param path: Path of the CSV (defaults to the table's file in Tables/), ie. a mirrored copy of a remote table
+    :return: Pandas dataframe
+    :raises SchemaError: If a value doesn't parse as its column's dtype or the table doesn't match its schema
+    '''
+    df = _parse_csv(name, table_path(name) if path is None else path)
+    violations = validate_table(name, df)
+    if violations:
+        raise SchemaError("{}: {}".format(name, "; ".join(violations)))
+    return df
+
+
+def validate_tables(names=None):
+    '''
+    Reads the tables from their CSVs and reports the ones that don't match their schema.
+
+    :param names: Table names (defaults to every table in Tables/)
+    :return: Dict of table name -> list of violations, for the tables with any
+    '''
+    names = table_names() if names is None else names
+    report = {}
+    for name in names:
+        try:
+            violations = validate_table(name, _parse_csv(name, table_path(name)))
+        except SchemaError as e:
+            violations = [str(e)]
+        if violations:
+            report[name] = violations
+    return report
+
+
+def partition_arrays(df):
+    '''
+    Columns of a table grouped by kind, the layout of the columnar store: one 2-D array each for the float and
+    integer columns, and for the string columns a 2-D array of int32 codes (-1 for missing values) into a table-wide
+    array of distinct strings. Nothing is pickled.
+
+    :param df: Pandas dataframe
+    :return: Dict of array name -> NumPy array (columns, kinds, floats, ints, codes, strings)
+    '''
+    kinds = []
+    floats, ints, codes = [], [], []
+    strings = pd.Index([], dtype=object)
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == object:
+            column_codes, uniques = pd.factorize(series)
+            # Re-map codes from the per-column uniques onto the table-wide dictionary
+            strings = strings.append(uniques.difference(strings, sort=False))
+            mapping = strings.get_indexer(uniques)
+            # Code -1 (missing) picks the -1 appended
+            codes.append(np.append(mapping, -1)[column_codes])
+            kinds.append("s")
+        elif np.issubdtype(series.dtype, np.integer):
+            ints.append(series.to_numpy())
+            kinds.append("i")
+        else:
+            floats.append(series.to_numpy(dtype=np.float64))
+            kinds.append("f")
+
+    nrows = len(df)
+    return {"columns": np.array(df.columns, dtype=str),
+            "kinds": np.array(kinds, dtype=str),
+            "floats": np.array(floats, dtype=np.float64).reshape(len(floats), nrows),
+            "ints": np.array(ints, dtype=np.int64).reshape(len(ints), nrows),
+            "codes": np.array(codes, dtype=np.int32).reshape(len(codes), nrows),
+            "strings": np.array(strings, dtype=str)}
+
+
+def write_arrays(path, df):
+    '''
+    Writes a table to an uncompressed .npz file in the layout of partition_arrays().
+
+    :param path: File path
+    :param df: Pandas dataframe with a RangeIndex and string, integer and float columns
+    '''
+    arrays = partition_arrays(df)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so a reader never sees a half written file; the pid keeps processes writing
+    # the same file at once from clobbering each other's temporary file
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_arrays(path):
+    '''
+    Reads a table written by write_arrays().
+
+    :param path: File path
+    :return: Pandas dataframe with the same columns and dtypes as the table written
+    '''
+    with np.load(path) as npz:
+        columns = npz["columns"].tolist()
+        kinds = npz["kinds"].tolist()
+        floats = npz["floats"]
+        ints = npz["ints"]
+        codes = npz["codes"]
+        # Append NaN so that code -1 (missing) picks it up
+        strings = np.append(npz["strings"].astype(object), np.nan)[codes]
+
+    blocks = {"f": iter(floats), "i": iter(ints), "s": iter(strings)}
+    # Columns come in order from the dict; passing them again makes pandas reindex it through a Series
+    data = {column: next(blocks[kind]) for column, kind in zip(columns, kinds)}
+    return pd.DataFrame(data)
+
+
+def write_partition(name, df):
+    '''
+    Writes one table to the columnar store as an uncompressed .npz file (see partition_arrays()).
+
+    :param name: Table name (str)
+    :param df: Pandas dataframe, as returned by read_csv_table()
+    '''
+    write_arrays(partition_path(name), df)
+
+
+def read_partition(name):
+    '''
+    Reads one table back from the columnar store.
+
+    :param name: Table name (str)
+    :return: Pandas dataframe with the same columns and dtypes as read_csv_table()
+    '''
+    return read_arrays(partition_path(name))
+
+
+def partition_is_current(name):
+    store = partition_path(name)
+    return os.path.exists(store) and os.path.getmtime(store) >= os.path.getmtime(table_path(name))
+
+
+def build_store(names=None):
+    '''
+    Ingest step: converts the CSV tables into the columnar store (one partition per table).
+
+    :param names: Table names to convert (defaults to every table in Tables/)
+    :return: List of table names written
+    '''
+    if names is None:
+        names = table_names()
+
+    for name, df in load_tables(names, read=read_csv_table).items():
+        write_partition(name, df)
+
+    return list(names)
+
+
+def load_table(name):
+    '''
+    Loads a table by name, from the columnar store when its partition is up to date and from the CSV otherwise.
+
+    :param name: Table name (str), ie. "DonRate" for Tables/2018-DonRate.csv
+    :return: Pandas dataframe
+    '''
+    if partition_is_current(name):
+        return read_partition(name)
+    return read_csv_table(name)
+
+
+def load_tables(names=None, workers=None, threads=None, read=load_table):
+    '''
+    Loads several tables at once, parsing them concurrently in a pool of processes (or threads). The largest files
+    are started first so a big table isn't left running alone at the end.
+
+    :param names: Table names (defaults to every table in Tables/)
+    :param workers: Pool size (defaults to INGEST_WORKERS); with 1 the tables are read one after another
+    :param threads: Whether to use threads instead of processes, which saves sending the tables back between
+                    processes but only overlaps the parts of parsing that release the GIL. Defaults to threads when
+                    other threads are running (ie. serving requests), as a process forked then may deadlock on a lock
+                    one of them held.
+    :param read: Function name -> dataframe reading one table, module level for processes (ie. read_csv_table)
+    :return: Dict of table name -> dataframe, in the order of names; the same as reading them one by one
+    '''
+    names = table_names() if names is None else list(names)
+    workers = min(INGEST_WORKERS if workers is None else workers, len(names))
+    if workers <= 1:
+        return {name: read(name) for name in names}
+
+    if threads is None:
+        threads = threading.active_count() > 1
+    largest_first = sorted(names, key=lambda name: -os.path.getsize(table_path(name)))
+    pool = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with pool(max_workers=workers) as executor:
+        tables = dict(zip(largest_first, executor.map(read, largest_first)))
+    return {name: tables[name] for name in names}
+
+
+# Unit of each table's estimates. Rates are stored as proportions and shown as percentages; every table not listed
+# below is a rate.
+DOLLAR_TABLES = ["AvgAmtBarriers", "AvgAmtMotivations", "AvgTotDon", "DonMethAvgDon", "SubSecAvgDon",
+                 "NewCanadiansAvgDonAmt", "NewCanadiansAvgDonByCause", "NewCanadiansAvgDonByMeth",
+                 "SeniorsAvgDonAmt", "SeniorsAvgDonByCause", "SeniorsAvgDonByMeth",
+                 "YouthAvgDonAmt", "YouthAvgDonByCause", "YouthAvgDonByMeth"]
+HOURS_TABLES = ["AvgHoursVol", "AvgTotHours",
+                "NewCanadiansAvgHrs", "NewCanadiansAvgHrsByActivity", "NewCanadiansAvgHrsByCause",
+                "NewCanadiansAvgHrsCommInvolve", "NewCanadiansAvgHrsHelpDirectly",
+                "SeniorsAvgHrs", "SeniorsAvgHrsByActivity", "SeniorsAvgHrsByCause",
+                "SeniorsAvgHrsCommInvolve", "SeniorsAvgHrsHelpDirectly",
+                "YouthAvgHrs", "YouthAvgHrsByActivity", "YouthAvgHrsByCause",
+                "YouthAvgHrsCommInvolve", "YouthAvgHrsHelpDirectly"]
+COUNT_TABLES = ["AvgNumCauses", "AvgNumCausesVol", "AvgTotNumDon", "DonMethAvgNumDon", "SubSecAvgNumDon"]
+
+# Tables whose QuestionText is used as axis labels rather than for filtering, and so is wrapped like Attribute
+WRAPPED_QUESTION_TABLES = ["AvgAmtBarriers", "BarriersByCause", "BarriersToGiving", "GivingConcerns",
+                           "SolicitationConcerns", "AvgAmtMotivations", "MotivationsByCause", "ReasonsForGiving",
+                           "TopDonorsBarriersToGiving", "TopDonorsDemoLikelihoods", "TopDonorsDonRates",
+                           "TopDonorsMotivationsForGiving", "TopDonorsPercTotDonations", "TopDonorsPercTotDonors",
+                           "TopVolsBarriersToVolunteering", "TopVolsDemoLikelihoods", "TopVolsPercTotHours",
+                           "TopVolsPercTotVols", "TopVolsVolRates", "TopVolunteersMotivationsForVolunteering"]
+
+# Scaling, rounding and label format per unit kind: rates become percentages, counts keep one decimal place. Hours
+# are labelled like dollars ("$161"), as the who volunteers page always showed them; labelling them in hours is a
+# visible change of its own.
+UNITS = {"rate": {"scale": 100, "decimals": 0, "prefix": "", "suffix": "%"},
+         "dollar": {"scale": 1, "decimals": 0, "prefix": "$", "suffix": ""},
+         "hours": {"scale": 1, "decimals": 0, "prefix": "$", "suffix": ""},
+         "count": {"scale": 1, "decimals": 1, "prefix": "", "suffix": ""}}
+
+# Short attribute labels that are used as legend entries and should stay on one line
+UNWRAPPED_ATTRIBUTES = ["Regular volunteer", "Do not support cause", "Do not report barrier", "Report barrier",
+                        "Do not report motivation", "Report motivation"]
+
+# Provinces reported on their own (the larger provinces already have their own Region value)
+PROVINCE_REGIONS = ["SK", "MB", "NB", "NS", "PE", "NL"]
+
+
+def table_spec(name):
+    '''
+    Preprocessing spec of a table: unit kind, scaling, rounding, the wrap width of its label columns and which of the
+    optional cleaning steps apply.
+
+    :param name: Table name (str)
+    :return: Dict with keys "unit", "scale", "decimals", "prefix", "suffix" (for labels), "attribute_wrap" and
+             "question_wrap" (None = no wrapping), "integers" (store estimates rounded to 0 places as integers),
+             "province_regions" (report PROVINCE_REGIONS under their own Region) and "blank_unknown" (blank Group of
+             Unknown and Unable to determine rows)
+    '''
+    if name in DOLLAR_TABLES:
+        unit = "dollar"
+    elif name in HOURS_TABLES:
+        unit = "hours"
+    elif name in COUNT_TABLES:
+        unit = "count"
+    else:
+        unit = "rate"
+
+    spec = {"unit": unit, "attribute_wrap": 15, "question_wrap": 20 if name in WRAPPED_QUESTION_TABLES else None,
+            "integers": True, "province_regions": True, "blank_unknown": True}
+    spec.update(UNITS[unit])
+    return spec
+
+
+def plain_table_spec(name):
+    '''
+    Spec of a table as the who donates how much app and VIZ2 have always cleaned it: estimates stay floats (labels
+    like "68.0%" and "$571.0"), counts keep two decimal places, province codes stay regions, labels aren't wrapped and
+    Unknown rows stay in the demographic graphs.
+
+    :param name: Table name (str)
+    :return: Dict like table_spec()
+    '''
+    spec = dict(table_spec(name), attribute_wrap=None, question_wrap=None, integers=False, province_regions=False,
+                blank_unknown=False)
+    if spec["unit"] == "count":
+        spec["decimals"] = 2
+    return spec
+
+
+TABLE_SPECS = {name: table_spec(name) for name in table_names()}
+PLAIN_TABLE_SPECS = {name: plain_table_spec(name) for name in table_names()}
+
+
+def _wrap_labels(labels, widths):
+    '''
+    Wraps each label to its row's width and joins the lines with <br>. Each distinct (label, width) pair is only
+    wrapped once.
+
+    :param labels: Object array of labels (NaN for missing)
+    :param widths: Int array of wrap widths, one per row (0 = leave as is)
+    :return: Object array of wrapped labels
+    '''
+    wrapped = labels.copy()
+    for width in np.unique(widths[widths > 0]):
+        rows = np.flatnonzero(widths == width)
+        codes, uniques = pd.factorize(labels[rows])
+        wrapper = textwrap.TextWrapper(width=int(width))
+        lines = np.array(["<br>".join(wrapper.wrap(label)) for label in uniques], dtype=object)
+        wrapped[rows[codes >= 0]] = lines[codes[codes >= 0]]
+    return wrapped
+
+
+def _label(prefix, suffix, estimate, margin, marker):
+    value = prefix + estimate + suffix
+    if marker == "...":
+        return "...", "Estimate Suppressed"
+    hover = "Estimate: " + value + " ± " + prefix + margin + suffix
+    if marker == "*":
+        return value + "*", hover + "<br><b>Use with caution</b>"
+    return value, hover
+
+
+def _labels(estimate, ci_upper, integer, unit, marker):
+    '''
+    Bar and hover labels for every row. Rows share a handful of distinct (unit, estimate, margin, marker) combinations,
+    so each combination is formatted once and the result is spread back over the rows.
+
+    :param unit: Per row position of the row's unit in UNITS
+    :return: Tuple of object arrays (Text, HoverText)
+    '''
+    keys = pd.DataFrame({"unit": unit, "integer": integer, "estimate": estimate, "margin": ci_upper - estimate,
+                         "marker": np.select([marker == "*", marker == "..."], [1, 2], 0)})
+    codes = keys.groupby(list(keys), sort=False, dropna=False).ngroup().to_numpy()
+    first = np.unique(codes, return_index=True)[1]
+
+    labels = []
+    units = list(UNITS.values())
+    for unit, integer, estimate, margin, marker in keys.iloc[first].itertuples(index=False):
+        # str() of the rounded values, integers where the table is stored as integers
+        if integer:
+            estimate, margin = int(estimate), int(margin)
+        labels.append(_label(units[unit]["prefix"], units[unit]["suffix"], str(estimate), str(margin),
+                             [None, "*", "..."][marker]))
+    text, hover = np.empty((2, len(labels)), dtype=object)
+    text[:], hover[:] = zip(*labels) if labels else ((), ())
+    return text[codes], hover[codes]
+
+
+def preprocess_tables(tables, specs=None):
+    '''
+    Cleans raw tables according to their spec (see table_spec()) in one pass: the tables are concatenated, each step
+    runs once over the combined columns, and the result is split back into one dataframe per table.
+
+    - Scale rates to percentages
+    - Suppress Estimate and CI Upper where Marker is "..." (for visualizations and error bars)
+    - Report SK, MB, NB, NS, PE and NL under their own Region (province_regions)
+    - Blank Group for "Unknown" and "Unable to determine" attributes so they drop out of demographic graphs
+      (blank_unknown)
+    - Wrap Attribute (and QuestionText where the spec asks for it) with <br>
+    - Round Estimate and CI Upper to the spec's decimal places (integers when 0 and the spec has integers) and cv to
+      two places
+    - Add an Annotation column with the text for each marker
+    - Add Text (bar labels) and HoverText columns formatted for the spec's unit, ie. "78%*" and
+      "Estimate: 78% ± 3%<br><b>Use with caution</b>"
+
+    :param tables: Dict of table name -> raw dataframe (as returned by load_table())
+    :param specs: Dict of table name -> spec (defaults to TABLE_SPECS); tables missing from it get table_spec()
+    :return: Dict of table name -> cleaned dataframe
+    '''
+    names = list(tables)
+    if not names:
+        return {}
+
+    specs = [(TABLE_SPECS if specs is None else specs).get(name) or table_spec(name) for name in names]
+    lengths = [len(tables[name]) for name in names]
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    def per_row(key):
+        return np.repeat([spec[key] or 0 for spec in specs], lengths)
+
+    def column(name, dtype=object):
+        # Tables without the column (ie. Province) contribute missing values
+        return np.concatenate([tables[table][name].to_numpy(dtype=dtype) if name in tables[table]
+                               else np.full(length, np.nan, dtype=dtype)
+                               for table, length in zip(names, lengths)])
+
+    marker = column("Marker")
+    suppressed = marker == "..."
+
+    estimate = column("Estimate", np.float64) * per_row("scale")
+    ci_upper = column("CI Upper", np.float64) * per_row("scale")
+    estimate[suppressed] = 0
+    ci_upper[suppressed] = 0
+
+    decimals = per_row("decimals")
+    for places in np.unique(decimals):
+        rows = decimals == places
+        estimate[rows] = np.round(estimate[rows], places)
+        ci_upper[rows] = np.round(ci_upper[rows], places)
+    cv = np.round(column("cv", np.float64), 2)
+
+    region = column("Region")
+    province = column("Province")
+    separate = pd.Series(province).isin(PROVINCE_REGIONS).to_numpy() & per_row("province_regions").astype(bool)
+    region[separate] = province[separate]
+
+    attribute = column("Attribute")
+    group = column("Group")
+    unknown = pd.Series(attribute).isin(["Unable to determine", "Unknown"]).to_numpy()
+    group[unknown & per_row("blank_unknown").astype(bool)] = ""
+
+    keep = pd.Series(attribute).isin(UNWRAPPED_ATTRIBUTES).to_numpy()
+    attribute = np.where(keep, attribute, _wrap_labels(attribute, per_row("attribute_wrap")))
+    question = _wrap_labels(column("QuestionText"), per_row("question_wrap"))
+
+    annotation = np.select([marker == "*", suppressed, pd.isnull(marker)], values)
+
+    # Tables with decimals == 0 are stored (and labelled) as integers unless they have missing values
+    missing = np.isnan(estimate) | np.isnan(ci_upper)
+    integer = np.repeat([spec["decimals"] == 0 and spec["integers"] and not missing[offsets[i]:offsets[i + 1]].any()
+                         for i, spec in enumerate(specs)], lengths)
+    unit = np.repeat([list(UNITS).index(spec["unit"]) for spec in specs], lengths)
+    text, hover_text = _labels(estimate, ci_upper, integer, unit, marker)
+
+    processed = {}
+    for i, (name, spec) in enumerate(zip(names, specs)):
+        rows = slice(offsets[i], offsets[i + 1])
+        df = tables[name]
+        cleaned = {"Estimate": estimate[rows], "CI Upper": ci_upper[rows], "cv": cv[rows],
+                   "Region": region[rows], "Group": group[rows]}
+        if integer[rows].all():
+            cleaned["Estimate"] = estimate[rows].astype(int)
+            cleaned["CI Upper"] = ci_upper[rows].astype(int)
+        cleaned["Attribute"] = attribute[rows]
+        cleaned["QuestionText"] = question[rows]
+
+        # Build each table in one go rather than assigning column by column
+        data = {column: cleaned[column] if column in cleaned else df[column].to_numpy() for column in df.columns}
+        data["Annotation"] = annotation[rows]
+        data["Text"] = text[rows]
+        data["HoverText"] = hover_text[rows]
+        processed[name] = pd.DataFrame(data, index=df.index)
+    return processed
+
+
+def preprocess_table(name, df):
+    '''
+    Cleans a single table, see preprocess_tables().
+
+    :param name: Table name (str)
+    :param df: Raw dataframe
+    :return: Cleaned dataframe
+    '''
+    return preprocess_tables({name: df})[name]
+
+
+def preprocess_plain_tables(tables):
+    '''
+    Cleans raw tables with their plain spec (see plain_table_spec()), see preprocess_tables().
+
+    :param tables: Dict of table name -> raw dataframe
+    :return: Dict of table name -> cleaned dataframe
+    '''
+    return preprocess_tables(tables, {name: PLAIN_TABLE_SPECS.get(name) or plain_table_spec(name) for name in tables})
+
+
+# Preprocessed tables, stored by load_preprocessed() under a hash of their CSV and preprocessing rules
+SNAPSHOT_DIR = os.path.join(ROOT_DIR, "Snapshot")
+# Part of every snapshot hash: bump it when preprocess_tables() changes in a way the specs and the constants hashed
+# by preprocess_hash() don't show, so that every snapshot is rebuilt
+PREPROCESS_VERSION = 1
+
+
+def preprocess_hash(name, spec=None):
+    '''
+    :param name: Table name (str)
+    :param spec: Spec the table is preprocessed with (defaults to its spec in TABLE_SPECS, see table_spec())
+    :return: Hash (16 hex digits) of a table's CSV and of the rules preprocess_tables() applies to it
+    '''
+    rules = (PREPROCESS_VERSION, spec or TABLE_SPECS.get(name) or table_spec(name), table_schema(name),
+             UNWRAPPED_ATTRIBUTES, PROVINCE_REGIONS, values)
+    digest = hashlib.sha256(repr(rules).encode())
+    with open(table_path(name), "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def snapshot_path(name, digest, directory=SNAPSHOT_DIR):
+    return os.path.join(directory, "{}-{}.npz".format(name, digest))
+
+
+@contextmanager
+def _snapshot_lock(directory):
+    # Exclusive lock on the snapshot directory, so that workers starting at once build missing snapshots only once
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_preprocessed(names, directory=SNAPSHOT_DIR):
+    '''
+    Loads preprocessed tables from their snapshots, which skips reading the CSVs and running preprocess_tables().
+    Tables without a snapshot for their current hash (see preprocess_hash()), because they are new or their CSV or
+    preprocessing rules changed, are preprocessed together and snapshotted. One process builds the snapshots while
+    the others wait for it and then read them.
+
+    :param names: Table names (of tables in Tables/)
+    :param directory: Snapshot directory
+    :return: Dict of table name -> preprocessed dataframe, like preprocess_tables()
+    '''
+    digests = {name: preprocess_hash(name) for name in names}
+
+    def read(names):
+        found = {}
+        for name in names:
+            path = snapshot_path(name, digests[name], directory)
+            if os.path.exists(path):
+                found[name] = read_arrays(path)
+        return found
+
+    tables = read(names)
+    missing = [name for name in names if name not in tables]
+    if missing:
+        with _snapshot_lock(directory):
+            # Another process may have built them while this one waited for the lock
+            tables.update(read(missing))
+            missing = [name for name in missing if name not in tables]
+            processed = preprocess_tables(load_tables(missing))
+            for name, df in processed.items():
+                path = snapshot_path(name, digests[name], directory)
+                write_arrays(path, df)
+                # Snapshots of earlier versions of the table
+                for stale in glob.glob(snapshot_path(name, "?" * 16, directory)):
+                    if stale != path:
+                        os.remove(stale)
+            tables.update(processed)
+    return {name: tables[name] for name in names}
+
+
+# String columns with at most this many distinct values per row become categoricals in compact_tables()
+CATEGORICAL_RATIO = 0.5
+# Integer columns stored in the smallest integer type holding their values. Estimate and CI Upper keep theirs: the
+# graphs sort by Estimate, and NumPy orders ties differently for different dtypes.
+SMALL_INT_COLUMNS = ["Year"]
+# Float columns stored as float32, with the decimal places they are shown with (cv) or would be (CI Lower, a
+# proportion for rates; Unweightedn, a count); only when that changes no value by more than a hundredth of the last
+# decimal place
+FLOAT32_DECIMALS = {"cv": 2, "CI Lower": 2, "Unweightedn": 0}
+
+
+def _categories(values, dtype=None):
+    '''
+    :param values: Distinct values of a column
+    :param dtype: CategoricalDtype the column already has in other tables, or None
+    :return: CategoricalDtype with the categories of dtype and values, sorted so that comparing and sorting codes
+             orders values like strings
+    '''
+    known = [] if dtype is None else list(dtype.categories)
+    new = set(values).difference(known)
+    if not new:
+        return dtype
+    categories = known + list(new)
+    try:
+        categories = sorted(categories)
+    except TypeError:
+        # Mixed types (ie. Region, with numeric region codes next to province codes) can't be sorted; keep them in
+        # the order they were added
+        pass
+    return pd.CategoricalDtype(categories)
+
+
+def compact_tables(tables, dtypes=None):
+    '''
+    Shrinks preprocessed tables in memory:
+
+    - String columns with few distinct values (see CATEGORICAL_RATIO) become categoricals. Every table shares one
+      dictionary per column (ie. all Region columns have the same categories), kept in dtypes so that tables
+      compacted later extend it.
+    - Year uses the smallest integer type holding its values.
+    - cv, CI Lower and Unweightedn become float32 where that is lossless at the precision they are shown with (see
+      FLOAT32_DECIMALS).
+
+    Columns keep their values, so filters (df[df["Group"] == group], isin(), etc.) select the same rows.
+
+    :param tables: Dict of table name -> dataframe, as returned by preprocess_tables()
+    :param dtypes: Dict of column name -> CategoricalDtype of the tables compacted so far; updated in place
+    :return: Dict of table name -> compacted dataframe
+    '''
+    dtypes = {} if dtypes is None else dtypes
+    strings = {}
+    for name, df in tables.items():
+        for column in df.columns:
+            if df[column].dtype == object:
+                strings.setdefault(column, {})[name] = df[column].to_numpy()
+
+    # Codes of each categorical column, looked up once over every table rather than table by table
+    categorical = {}
+    for column, arrays in strings.items():
+        values = np.concatenate(list(arrays.values()))
+        distinct = pd.unique(values[pd.notnull(values)])
+        if len(distinct) <= CATEGORICAL_RATIO * len(values):
+            dtypes[column] = _categories(distinct, dtypes.get(column))
+            codes = dtypes[column].categories.get_indexer(values)
+            offsets = np.cumsum([0] + [len(array) for array in arrays.values()])
+            categorical[column] = {name: codes[start:end] for name, start, end in zip(arrays, offsets, offsets[1:])}
+
+    compacted = {}
+    for name, df in tables.items():
+        data = {}
+        for column in df.columns:
+            series = df[column]
+            if series.dtype == object and column in categorical:
+                series = pd.Series(pd.Categorical.from_codes(categorical[column][name], dtype=dtypes[column]),
+                                   index=df.index)
+            elif column in SMALL_INT_COLUMNS and np.issubdtype(series.dtype, np.integer):
+                series = pd.to_numeric(series, downcast="integer")
+            elif column in FLOAT32_DECIMALS and series.dtype == np.float64:
+                values = series.to_numpy()
+                single = values.astype(np.float32)
+                if not (np.abs(single - values) > 10.0 ** -FLOAT32_DECIMALS[column] / 100).any():
+                    series = pd.Series(single, index=df.index)
+            data[column] = series
+        compacted[name] = pd.DataFrame(data, index=df.index)
+    return compacted
+
+
+# Row positions of an empty slice
+NO_ROWS = np.array([], dtype=np.intp)
+
+
+def build_slice_index(df):
+    '''
+    Row positions of every Region, (Region, Group), (Region, QuestionText) and (Region, Group, QuestionText)
+    combination in a table, so callbacks can look a slice up instead of scanning the whole table with boolean masks.
+    QuestionText is keyed without the <br> line breaks added by preprocess_tables().
+
+    :param df: Pandas dataframe
+    :return: Dict of (region, group, question) -> array of row positions, with None for the parts not filtered on
+    '''
+    question = df["QuestionText"]
+    if question.dtype == object or isinstance(question.dtype, pd.CategoricalDtype):
+        question = question.str.replace("<br>", " ", regex=False)
+    keys = pd.DataFrame({"Region": df["Region"], "Group": df["Group"], "QuestionText": question})
+
+    index = {}
+    for columns in [["Region"], ["Region", "Group"], ["Region", "QuestionText"], ["Region", "Group", "QuestionText"]]:
+        # observed: only the combinations present, not every combination of the categories of compacted tables
+        for key, positions in keys.groupby(columns, sort=False, observed=True).indices.items():
+            key = dict(zip(columns, key if isinstance(key, tuple) else (key,)))
+            index[(key["Region"], key.get("Group"), key.get("QuestionText"))] = positions
+    return index
+
+
+class SharedTable:
+    '''
+    Preprocessed table held in memory-mapped files, in the layout of the columnar store (see partition_arrays()):
+    numeric columns as 2-D blocks and string columns as int32 codes into a dictionary of distinct strings, stored as
+    one UTF-8 buffer and offsets (categorical columns as their own codes). Processes forked after a table is shared (ie. gunicorn workers with preload_app)
+    map the same pages instead of each holding a copy; rows are decoded into a dataframe when they are taken.
+    '''
+
+    def __init__(self, df, directory):
+        '''
+        :param df: Pandas dataframe with a RangeIndex
+        :param directory: New directory to write the arrays to; it is removed once they are mapped (the mappings
+                          stay valid as long as a process uses them)
+        '''
+        # Categorical columns (see compact_tables()) keep their codes and dtype; other columns are stored by kind and
+        # cast back to their dtype when taken
+        self.dtypes = dict(df.dtypes)
+        categorical = [column for column, dtype in self.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+        arrays = partition_arrays(df.drop(columns=categorical))
+        arrays["categorical"] = np.array([df[column].cat.codes for column in categorical],
+                                         dtype=np.int32).reshape(len(categorical), len(df))
+        kinds = dict(zip(arrays.pop("columns").tolist(), arrays.pop("kinds").tolist()))
+        self.columns = list(df.columns)
+        self.kinds = [kinds.get(column, "c") for column in self.columns]
+        self.nrows = len(df)
+        # Fixed-width unicode would take 4 bytes per character of the longest string for every string
+        encoded = [string.encode() for string in arrays.pop("strings").tolist()]
+        arrays["offsets"] = np.cumsum([0] + [len(string) for string in encoded], dtype=np.int64)
+        arrays["utf8"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        os.makedirs(directory)
+        for name, array in arrays.items():
+            if array.size:
+                path = os.path.join(directory, name + ".npy")
+                mapped = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+                mapped[...] = array
+                os.remove(path)
+                # Plain array view of the mapping, so slices of it are ndarrays rather than np.memmap
+                array = np.asarray(mapped)
+            setattr(self, name, array)
+        os.rmdir(directory)
+
+    def __len__(self):
+        return self.nrows
+
+    def strings(self, codes):
+        '''
+        :param codes: Array of string codes
+        :return: Object array of the strings (NaN for code -1), each distinct string decoded once
+        '''
+        distinct, inverse = np.unique(codes, return_inverse=True)
+        decoded = np.array([self.utf8[self.offsets[code]:self.offsets[code + 1]].tobytes().decode() if code >= 0
+                            else np.nan for code in distinct.tolist()] + [None], dtype=object)[:-1]
+        return decoded[inverse].reshape(codes.shape)
+
+    def take(self, positions):
+        '''
+        :param positions: Row positions
+        :return: Pandas dataframe of the rows, like df.take(positions)
+        '''
+        blocks = {"f": iter(self.floats[:, positions]), "i": iter(self.ints[:, positions]),
+                  "s": iter(self.strings(self.codes[:, positions])), "c": iter(self.categorical[:, positions])}
+        data = {}
+        for column, kind in zip(self.columns, self.kinds):
+            values, dtype = next(blocks[kind]), self.dtypes[column]
+            if kind == "c":
+                values = pd.Categorical.from_codes(values, dtype=dtype)
+            elif values.dtype != dtype:
+                values = values.astype(dtype)
+            data[column] = values
+        # Columns come in order from the dict; passing them again makes pandas reindex it through a Series
+        return pd.DataFrame(data, index=pd.Index(positions), copy=False)
+
+    def to_frame(self):
+        '''
+        :return: The whole table as a pandas dataframe (a private copy)
+        '''
+        return self.take(np.arange(self.nrows)).set_axis(pd.RangeIndex(self.nrows), axis=0)
+
+
+# Where TableLoader.share() maps tables from; /dev/shm keeps them in memory on Linux
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+# Views of the loaders' tables pinned by the block running in each thread (see pinned_tables())
+_pins = threading.local()
+
+
+@contextmanager
+def pinned_tables():
+    '''
+    Pins the tables read in a block: the first read from a loader takes its tables as they are then, and later reads
+    in the block see those same tables even if TableLoader.reload() swaps in new ones meanwhile. Callbacks run in
+    such a block (see Utils.cache_utils.FigureCache) so one already running when a table is reloaded finishes on the
+    data it started with.
+
+    :return: Dict of (loader, key) -> version of each table read in the block, filled in as the block runs
+    '''
+    if getattr(_pins, "views", None) is not None:
+        # Nested in another block, which already pins the tables
+        yield _pins.reads
+        return
+    _pins.views, _pins.reads = {}, {}
+    try:
+        yield _pins.reads
+    finally:
+        _pins.views = _pins.reads = None
+
+
+class TableLoader:
+    '''
+    Reads, preprocesses and indexes tables, keeping each one in memory once per process. Registries built on the same
+    loader (by default every registry in the process) share its tables, so pages mounted in one app pay for a table
+    once however many of them use it.
+    '''
+
+    def __init__(self, preprocess=preprocess_tables, compact=False, snapshot=None):
+        '''
+        :param preprocess: Function (dict of name -> raw df) -> dict of name -> df applied once to the tables after
+                           they are loaded (None to keep the raw tables)
+        :param compact: Whether to store the tables with compact dtypes (see compact_tables())
+        :param snapshot: Directory of the preprocessed snapshots to load the tables of Tables/ from (see
+                         load_preprocessed()), or None to preprocess them on every start; only for preprocess_tables()
+        '''
+        self.preprocess = preprocess
+        self.compact = compact
+        self.snapshot = snapshot
+        # Categories of the compacted tables' string columns, shared by every table loaded
+        self.dtypes = {}
+        # Keyed by (name, source), source being a path or URL read with read_csv_table(), or None for load_table().
+        # reload() and share() replace these dicts rather than changing them, so views pinned by running callbacks
+        # stay as they were.
+        self._tables = {}
+        self._slices = {}
+        # Version of each table, bumped every time reload() swaps in a new one
+        self._versions = {}
+        # Functions (loader, keys) called with the tables reload() swapped in
+        self._listeners = []
+        # Dash serves callbacks from several threads; make sure a table is only loaded once
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._tables
+
+    def _view(self, key):
+        # (tables, slice indexes, versions) as seen by the calling thread (see pinned_tables())
+        views = getattr(_pins, "views", None)
+        if views is None:
+            return self._tables, self._slices, self._versions
+        with self._lock:
+            view = views.setdefault(self, (self._tables, self._slices, self._versions))
+            if key not in view[0]:
+                # Loaded since the block started
+                view = (self._tables, self._slices, self._versions)
+        _pins.reads[(self, key)] = view[2].get(key, 0)
+        return view
+
+    def _read(self, key):
+        tables, slices, _ = self._view(key)
+        return tables.get(key), slices.get(key)
+
+    def get(self, key):
+        '''
+        :param key: (name, source) tuple
+        :return: Table (pandas dataframe) or None if it isn't loaded yet
+        '''
+        return self._read(key)[0]
+
+    def _build(self, keys):
+        '''
+        Reads, preprocesses, indexes and compacts tables without adding them to the loader.
+
+        :param keys: List of (name, source) tuples
+        :return: (dict of key -> table, dict of key -> slice index)
+        '''
+        snapshots = {}
+        if self.snapshot is not None:
+            snapshots = load_preprocessed([name for name, source in keys if source is None], self.snapshot)
+            keys = [key for key in keys if key[1] is not None]
+        # Imported here, Utils.mirror_utils imports this module
+        from Utils.mirror_utils import resolve
+        # URLs are read from their local mirror (see Utils.mirror_utils)
+        tables = load_tables([name for name, source in keys if source is None])
+        raw = {key: read_csv_table(key[0], resolve(key[1])) if key[1] is not None else tables[key[0]] for key in keys}
+        if self.preprocess is not None:
+            # preprocess_tables() works on table names
+            processed = self.preprocess({name: df for (name, _), df in raw.items()})
+            raw = {key: processed[key[0]] for key in raw}
+        raw.update({(name, None): df for name, df in snapshots.items()})
+        # Indexed before compacting; grouping by plain strings is faster than by categoricals
+        slices = {key: build_slice_index(table) for key, table in raw.items()}
+        if self.compact:
+            with self._compact_lock:
+                compacted = compact_tables({name: df for (name, _), df in raw.items()}, self.dtypes)
+            raw = {key: compacted[key[0]] for key in raw}
+        return raw, slices
+
+    def load(self, keys):
+        '''
+        Loads several tables at once so they are preprocessed in a single pass.
+
+        :param keys: List of (name, source) tuples
+        '''
+        with self._lock:
+            missing = [key for key in keys if key not in self._tables]
+            if missing:
+                tables, slices = self._build(missing)
+                self._slices.update(slices)
+                self._tables.update(tables)
+
+    def reload(self, keys):
+        '''
+        Reads, preprocesses and indexes loaded tables again (ie. after their CSV changed) and swaps the new ones in all
+        at once. Callbacks already running keep reading the tables they started with (see pinned_tables()), later
+        ones read the new tables. Then calls the functions passed to subscribe(), ie. to drop the cached figures made
+        from the old tables.
+
+        :param keys: (name, source) of the tables to reload; tables that aren't loaded are skipped
+        :return: Keys of the tables reloaded
+        '''
+        with self._reload_lock:
+            keys = [key for key in keys if key in self._tables]
+            if not keys:
+                return []
+            # Built while the old tables keep serving
+            tables, slices = self._build(keys)
+            with self._lock:
+                versions = dict(self._versions)
+                for key in keys:
+                    versions[key] = versions.get(key, 0) + 1
+                self._tables = {**self._tables, **tables}
+                self._slices = {**self._slices, **slices}
+                self._versions = versions
+            for listener in list(self._listeners):
+                listener(self, keys)
+            return keys
+
+    def subscribe(self, listener):
+        '''
+        :param listener: Function (loader, keys) called after reload() swapped in new tables
+        '''
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def table_version(self, key):
+        '''
+        :return: Number of times a table was reloaded, as of the block it is called from if tables are pinned
+        '''
+        return self._view(key)[2].get(key, 0)
+
+    def slice_index(self, key):
+        return self._read(key)[1]
+
+    def share(self, directory=None):
+        '''
+        Moves the loaded tables to memory-mapped files (see SharedTable) so that worker processes forked afterwards
+        share one copy of them. Call in the master process once every table the workers use is loaded; tables loaded
+        later are held by each process as usual.
+
+        :param directory: Directory for the array files, which are removed once mapped; defaults to a temporary
+                          directory in SHARED_DIR
+        :return: Number of tables shared
+        '''
+        with self._lock:
+            temporary = directory is None
+            directory = directory or tempfile.mkdtemp(prefix="statscan-tables-", dir=SHARED_DIR)
+            tables = dict(self._tables)
+            shared = 0
+            for i, (key, table) in enumerate(tables.items()):
+                if isinstance(table, pd.DataFrame) and isinstance(table.index, pd.RangeIndex) and \
+                        table.index.equals(pd.RangeIndex(len(table))):
+                    tables[key] = SharedTable(table, os.path.join(directory, str(i)))
+                    shared += 1
+            # Swapped in like reload() does, views pinned meanwhile keep the dataframes
+            self._tables = tables
+            if temporary:
+                os.rmdir(directory)
+            return shared
+
+    def keys(self):
+        '''
+        :return: (name, source) of the tables read so far, in load order
+        '''
+        return list(self._tables)
+
+
+# Store the tables of the shared loader with compact dtypes (see compact_tables()): about half the memory, but slices
+# take several times longer to cut from categorical columns. Off unless memory is short (see wsgi.py).
+COMPACT_TABLES = os.environ.get("COMPACT_TABLES", "0") == "1"
+# Loader shared by every registry using the default preprocessing
+LOADER = TableLoader(compact=COMPACT_TABLES, snapshot=SNAPSHOT_DIR)
+# Loader shared by the registries of the pages cleaned with preprocess_plain_tables(); not snapshotted, the pages
+# read few tables
+PLAIN_LOADER = TableLoader(preprocess_plain_tables, compact=COMPACT_TABLES)
+# Shared loader of each preprocessing function
+LOADERS = {preprocess_tables: LOADER, preprocess_plain_tables: PLAIN_LOADER}
+
+# Context manager taking a phase name that times the table lookups of registries (see time_phases()), or None
+_phase_timer = None
+
+
+def time_phases(timer):
+    '''
+    Times the table lookups of every TableRegistry (reading a table, slice()) as the "filter" phase of the callback
+    running, ie. with Utils.metrics_utils.phase, which installs itself when it is imported.
+
+    :param timer: Function (phase name) -> context manager, or None to stop timing
+    '''
+    global _phase_timer
+    _phase_timer = timer
+
+
+def _phase(name):
+    return nullcontext() if _phase_timer is None else _phase_timer(name)
+
+
+class TableRegistry:
+    '''
+    Every table in Tables/ by logical name (ie. registry["DonRate"]). A table is read and preprocessed the first time
+    it is accessed and then kept in memory, so start-up only pays for the tables a page actually uses. Tables are held
+    by a TableLoader shared across registries.
+    '''
+
+    def __init__(self, names=None, sources=None, preprocess=preprocess_tables, loader=None):
+        '''
+        :param names: Table names to expose (defaults to every table in Tables/)
+        :param sources: Optional dict of table name -> path or URL of a CSV to read with read_csv_table() instead of
+                        load_table(); URLs are read from their local mirror (see Utils.mirror_utils.resolve())
+        :param preprocess: Function (dict of name -> raw df) -> dict of name -> df applied once to the tables after
+                           they are loaded (defaults to preprocess_tables(), None to keep the raw tables)
+        :param loader: TableLoader holding the tables (defaults to the process-wide loader of the preprocessing in
+                       LOADERS, a private loader for any other)
+        '''
+        if loader is None:
+            loader = LOADERS[preprocess] if preprocess in LOADERS else TableLoader(preprocess)
+        self.loader = loader
+        self.names = list(names) if names is not None else table_names()
+        self.sources = dict(sources or {})
+        self.names += [name for name in self.sources if name not in self.names]
+
+    def __getitem__(self, name):
+        key = self._key(name)
+        with _phase("filter"):
+            table = self.loader.get(key)
+            if table is None:
+                self.load([name])
+                table = self.loader.get(key)
+            return table.to_frame() if isinstance(table, SharedTable) else table
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _key(self, name):
+        if name not in self.names:
+            raise KeyError("Unknown table: {}".format(name))
+        return name, self.sources.get(name)
+
+    def versions(self):
+        '''
+        :return: Tuple of the version of each of this registry's tables (see TableLoader.reload()); in a
+                 pinned_tables() block, the tables count as read
+        '''
+        return tuple(self.loader.table_version(self._key(name)) for name in self.names)
+
+    def load(self, names=None):
+        '''
+        Loads several tables at once so they are preprocessed in a single pass.
+
+        :param names: Table names to load (defaults to every table in the registry)
+        '''
+        names = self.names if names is None else names
+        self.loader.load([self._key(name) for name in names])
+
+    def slice(self, name, region, group=None, question=None):
+        '''
+        Rows of a table for one region, optionally narrowed to a demographic group and/or question. Equivalent to
+        filtering with df[df['Region'] == region], df[df['Group'] == group], etc. but looked up in the index built
+        when the table was loaded.
+
+        :param name: Table name (str)
+        :param region: Region value (ie. "CA")
+        :param group: Group value (ie. "Age group"), or None for all groups
+        :param question: QuestionText value without line breaks, or None for all questions
+        :return: Pandas dataframe (a copy, callers are free to modify it)
+        '''
+        key = self._key(name)
+        with _phase("filter"):
+            if key not in self.loader:
+                self.load([name])
+            positions = self.loader.slice_index(key).get((region, group, question), NO_ROWS)
+            return self.loader.get(key).take(positions)
+
+    def loaded(self):
+        '''
+        :return: Names of this registry's tables read so far, in load order
+        '''
+        keys = set(self._key(name) for name in self.names)
+        return [name for name, source in self.loader.keys() if (name, source) in keys]
+
+
+class TableWatcher(threading.Thread):
+    '''
+    Polls the CSVs in Tables/ of loaders' tables and reloads the ones that changed (see TableLoader.reload()), so
+    edited tables are served without restarting the app. A file is reloaded once its size and modification time are
+    the same on two polls in a row, so one still being written isn't read half way. Tables read from a URL or another
+    path aren't watched.
+    '''
+
+    def __init__(self, loader=None, interval=5.0):
+        '''
+        :param loader: TableLoader whose tables to watch (defaults to every shared loader, see LOADERS)
+        :param interval: Seconds between polls
+        '''
+        super().__init__(name="TableWatcher", daemon=True)
+        self.loaders = [loader] if loader is not None else list(LOADERS.values())
+        self.interval = interval
+        # Signature (modification time, size) of each file as of its last reload, and of files seen changed since,
+        # by (loader, key)
+        self._seen = {}
+        self._pending = {}
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def poll(self):
+        '''
+        Checks the watched files once.
+
+        :return: Keys of the tables reloaded
+        '''
+        changed = {}
+        for loader in self.loaders:
+            for key in loader.keys():
+                name, source = key
+                if source is not None:
+                    continue
+                signature = self._signature(table_path(name))
+                watched = (loader, key)
+                if watched not in self._seen:
+                    # Loaded since the last poll; the table is as current as the file
+                    self._seen[watched] = signature
+                elif signature is None or signature == self._seen[watched]:
+                    self._pending.pop(watched, None)
+                elif self._pending.get(watched) != signature:
+                    # Changed since the last poll, wait for the next one in case it's still being written
+                    self._pending[watched] = signature
+                else:
+                    changed.setdefault(loader, []).append(key)
+        reloaded = []
+        for loader, keys in changed.items():
+            try:
+                reloaded += loader.reload(keys)
+            except Exception:
+                # Keep serving the tables loaded so far. The files stay pending and are tried again on the next poll,
+                # ie. one caught half written while its size and modification time didn't change
+                logger.exception("Reloading tables failed: %s", ", ".join(name for name, _ in keys))
+                continue
+            for key in keys:
+                self._seen[(loader, key)] = self._pending.pop((loader, key))
+        return reloaded
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                reloaded = self.poll()
+            except Exception:
+                logger.exception("Polling tables failed")
+                continue
+            if reloaded:
+                logger.info("Reloaded tables: %s", ", ".join(name for name, _ in reloaded))
+
+    def stop(self):
+        self._stopped.set()
+
+
+def watch_tables(loader=None, interval=None):
+    '''
+    Starts a TableWatcher, unless the interval is 0.
+
+    :param loader: TableLoader whose tables to watch (defaults to every shared loader, see LOADERS)
+    :param interval: Seconds between polls, defaults to the TABLE_POLL_INTERVAL environment variable or 5
+    :return: The TableWatcher started, or None
+    '''
+    if interval is None:
+        interval = float(os.environ.get("TABLE_POLL_INTERVAL", 5))
+    if interval <= 0:
+        return None
+    watcher = TableWatcher(loader, interval)
+    watcher.start()
+    return watcher
+
+
 def process_data(data):
     i = 0
     while i < len(data):
@@ -26,13 +1339,13 @@ def process_data(data):
 
 
 def get_data():
-    SubSecAvgDon_2018 = pd.read_csv("Tables/2018-SubSecAvgDon.csv")
-    SubSecDonRates_2018 = pd.read_csv("Tables/2018-SubSecDonRates.csv")
-    DonRates_2018 = pd.read_csv("Tables/2018-DonRate.csv")
-    AvgTotDon_2018 = pd.read_csv("Tables/2018-AvgTotDon.csv")
-    SubSecAvgNumDon_2018 = pd.read_csv("Tables/2018-SubSecAvgNumDon.csv")
-    AvgNumCauses_2018 = pd.read_csv("Tables/2018-AvgNumCauses.csv")
-    AvgTotNumDon_2018 = pd.read_csv("Tables/2018-AvgTotNumDon.csv")
+    SubSecAvgDon_2018 = load_table("SubSecAvgDon")
+    SubSecDonRates_2018 = load_table("SubSecDonRates")
+    DonRates_2018 = load_table("DonRate")
+    AvgTotDon_2018 = load_table("AvgTotDon")
+    SubSecAvgNumDon_2018 = load_table("SubSecAvgNumDon")
+    AvgNumCauses_2018 = load_table("AvgNumCauses")
+    AvgTotNumDon_2018 = load_table("AvgTotNumDon")
 
     DonRates_2018['Estimate'] = DonRates_2018['Estimate']*100
     DonRates_2018['CI Upper'] = DonRates_2018['CI Upper']*100
@@ -52,4 +1365,17 @@ def get_data():
 
 # def format_percentages(df):
 #     df['Estimate'] = df['Estimate']*100
-#     df['CI Upper'] = df['CI Upper']*100   
+#     df['CI Upper'] = df['CI Upper']*100
+
+
+if __name__ == "__main__":
+    # Ingest: python -m Utils.data_utils [table names...]
+    report = validate_tables(sys.argv[1:] or None)
+    for name, violations in report.items():
+        print("{}: {}".format(name, "\n    ".join(violations)), file=sys.stderr)
+    if report:
+        sys.exit("{} tables don't match their schema".format(len(report)))
+    written = build_store(sys.argv[1:] or None)
+    print("Wrote {} tables to {}".format(len(written), STORE_DIR))
+    load_preprocessed(written)
+    print("Snapshots of {} tables in {}".format(len(written), SNAPSHOT_DIR))
@@ -1,10 +1,257 @@
 # Script to store graph generating functions
 
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-from plotly.subplots import make_subplots
+import plotly.io as pio
+import re
+import threading
+from types import MappingProxyType, SimpleNamespace
+
+###################### Raw figures ######################
+
+# Figures assembled as plain dicts (with NumPy arrays for the data) instead of validated plotly objects. RawFigure,
+# raw_bar() and the raw axes implement the part of the plotly.graph_objects API the graph functions use and produce
+# the same JSON, without plotly's property validation.
+
+# Properties with an underscore in their name (any other underscore is plotly's magic underscore, ie. error_x_color
+# is error_x.color)
+UNDERSCORE_PROPERTIES = ["error_x", "error_y", "plot_bgcolor", "paper_bgcolor"]
+# String properties plotly coerces numbers to
+STRING_PROPERTIES = ["offsetgroup", "alignmentgroup", "legendgroup", "name"]
+# Properties referencing an axis; plotly names the first axes x/xaxis and y/yaxis, not x1/xaxis1
+AXIS_PROPERTIES = ["xaxis", "yaxis", "overlaying", "anchor", "matches", "scaleanchor"]
+
+_template = None
+
+
+def default_template():
+    # Added to every figure by plotly; only converted to a dict once
+    global _template
+    if _template is None:
+        _template = pio.templates[pio.templates.default].to_plotly_json()
+    return _template
+
+
+def _path(key):
+    for prop in UNDERSCORE_PROPERTIES:
+        if key == prop or key.startswith(prop + "_"):
+            return [prop] + [part for part in key[len(prop) + 1:].split("_") if part]
+    return key.split("_")
+
+
+def _value(key, value):
+    if isinstance(value, (pd.Series, pd.Index)):
+        return value.to_numpy()
+    if key == "title" and isinstance(value, str):
+        return {"text": value}
+    if key in STRING_PROPERTIES and isinstance(value, (int, float, np.number)):
+        return str(value)
+    if key in AXIS_PROPERTIES and value in ("x1", "y1"):
+        return value[0]
+    if isinstance(value, dict):
+        return _props(value)
+    if isinstance(value, (list, tuple)) and key != "args" and any(isinstance(item, dict) for item in value):
+        # Lists of compound properties (annotations, updatemenus, buttons)
+        return [_props(item) if isinstance(item, dict) else item for item in value]
+    if hasattr(value, "to_plotly_json"):
+        return _props(value.to_plotly_json())
+    return value
+
+
+def _props(props, into=None):
+    '''
+    Merges properties into a dict the way plotly's update() does: nested dicts are merged, magic underscores are
+    expanded, None values are dropped and everything else replaces the previous value.
+    '''
+    into = {} if into is None else into
+    for key, value in props.items():
+        if value is None:
+            continue
+        *parents, name = _path(key)
+        if name in ("xaxis1", "yaxis1"):
+            name = name[:-1]
+        target = into
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        value = _value(name, value)
+        if isinstance(value, dict) and isinstance(target.get(name), dict):
+            _props(value, target[name])
+        else:
+            target[name] = value
+    return into
+
+
+def raw_bar(**kwargs):
+    '''
+    :return: Bar trace as a dict, like go.Bar(**kwargs)
+    '''
+    return dict(_props(kwargs), type="bar")
+
+
+def raw_axis(**kwargs):
+    '''
+    :return: Axis as a dict, like go.layout.XAxis(**kwargs)
+    '''
+    return _props(kwargs)
+
+
+class RawFigure:
+    '''
+    Plain dict figure with the go.Figure methods used by the graph functions.
+    '''
+
+    def __init__(self):
+        self.data = []
+        self.layout = {}
+
+    def add_trace(self, trace):
+        self.data.append(trace if isinstance(trace, dict) else _props(trace.to_plotly_json()))
+        return self
+
+    def update_layout(self, dict1=None, **kwargs):
+        _props(dict(dict1 or {}, **kwargs), self.layout)
+        return self
+
+    def update_traces(self, dict1=None, **kwargs):
+        for trace in self.data:
+            _props(dict(dict1 or {}, **kwargs), trace)
+        return self
+
+    def _update_axes(self, axis, props):
+        # Like plotly, updates the first axis and every other axis of that kind already in the layout
+        self.layout.setdefault(axis, {})
+        for key in self.layout:
+            if re.fullmatch(axis + r"\d*", key):
+                _props(props, self.layout[key])
+        return self
+
+    def update_xaxes(self, dict1=None, **kwargs):
+        return self._update_axes("xaxis", dict(dict1 or {}, **kwargs))
+
+    def update_yaxes(self, dict1=None, **kwargs):
+        return self._update_axes("yaxis", dict(dict1 or {}, **kwargs))
+
+    def to_plotly_json(self):
+        return {"data": self.data, "layout": dict(self.layout, template=default_template())}
+
+    to_dict = to_plotly_json
+
+
+# Stand-in for plotly.graph_objects in the graph functions
+raw_graph_objects = SimpleNamespace(Figure=RawFigure, Bar=raw_bar,
+                                    layout=SimpleNamespace(XAxis=raw_axis, YAxis=raw_axis))
+
+
+def graph_objects(raw=False):
+    '''
+    :param raw: Whether to build plain dict figures (see RawFigure) instead of validated plotly figures
+    :return: Module or namespace to use as go in graph functions
+    '''
+    return raw_graph_objects if raw else go
+
+
+def freeze(value):
+    '''
+    :return: Read-only deep copy of a figure (or part of one): dicts become MappingProxyType, lists tuples
+    '''
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    '''
+    :return: Plain dict and list copy of a value made by freeze() (data arrays are shared, not copied)
+    '''
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+class FigureTemplate:
+    '''
+    Skeleton of a chart type: built once per variant (ie. which footnotes are shown), frozen, and cloned for every
+    figure with only the parts that depend on the data patched in.
+    '''
+
+    def __init__(self, build):
+        '''
+        :param build: Function of the variant arguments returning a figure with placeholder data
+        '''
+        self.build = build
+        self.skeletons = {}
+
+    def skeleton(self, variant):
+        skeleton = self.skeletons.get(variant)
+        if skeleton is None:
+            figure = self.build(*variant).to_plotly_json()
+            # The default template is shared by every figure (see RawFigure.to_plotly_json)
+            layout = {key: value for key, value in figure["layout"].items() if key != "template"}
+            skeleton = self.skeletons[variant] = freeze({"data": figure["data"], "layout": layout})
+        return skeleton
+
+    def render(self, variant, patch):
+        '''
+        :param variant: Tuple of arguments passed to build
+        :param patch: Dict of path (tuple of keys and list indices, ie. ("data", 1, "x")) -> value to set
+        :return: RawFigure
+        '''
+        figure = thaw(self.skeleton(variant))
+        for path, value in patch.items():
+            parent = figure
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = _value(path[-1], value)
+        raw = RawFigure()
+        raw.data, raw.layout = figure["data"], figure["layout"]
+        return raw
+
+
+class DeferredValue:
+    '''
+    Prop of a page's layout (ie. dcc.Dropdown(options=...)) computed the first time the layout is served instead of
+    when the viz is imported, and computed again once the tables it was computed from change. Serialized like the
+    value.
+    '''
+
+    def __init__(self, build, version=None):
+        '''
+        :param build: Function without arguments returning the value
+        :param version: Function returning the version of the tables it is computed from (ie. registry.versions)
+        '''
+        self.build = build
+        self.version = version or (lambda: None)
+        self._built = None
+        self._lock = threading.Lock()
+
+    def value(self):
+        version = self.version()
+        with self._lock:
+            if self._built is None or self._built[0] != version:
+                self._built = (version, self.build())
+            return self._built[1]
+
+    def to_plotly_json(self):
+        value = self.value()
+        return value.to_plotly_json() if hasattr(value, "to_plotly_json") else value
+
+
+class DeferredFigure(DeferredValue):
+    '''
+    Figure of a page's layout (ie. dcc.Graph(figure=...)) built the first time the layout is served instead of when
+    the viz is imported, and built again once the tables it was built from change (see DeferredValue).
+    '''
+
+    def figure(self):
+        return self.value()
+
+
+###################### Graph functions ######################
 
 def don_rate_avg_don(dff1, dff2, name1, name2, title):
     # Scatter plot - data frame, x label, y label
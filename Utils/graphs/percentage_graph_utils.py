@@ -0,0 +1,329 @@
+import pandas as pd
+import numpy as np
+from Utils.graph_utils import FigureTemplate, graph_objects
+
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
+# Clone frozen skeletons of the charts and patch in the data instead of building every figure (see
+# Utils.graph_utils.FigureTemplate). Only used with RAW_FIGURES.
+FIGURE_TEMPLATES = True
+
+
+###################### Graph functions ######################
+
+def build_single_vertical_percentage_graph(dff, title, by="Attribute", sort=False):
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(x=dff['CI Upper'],
+                         y=dff[by],
+                         orientation="h",
+                         error_x=None,
+                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                         showlegend=False,
+                         hoverinfo="skip",
+                         text=None,
+                         name="",
+                         textposition="outside",
+                         cliponaxis=False,
+                         offsetgroup=1
+                         ),
+                  )
+
+    fig.add_trace(go.Bar(x=dff['Estimate'],
+                         y=dff[by],
+                         orientation="h",
+                         error_x=None,
+                         hovertext=dff['HoverText'],
+                         hovertemplate="%{hovertext}",
+                         hoverlabel=dict(font=dict(color="white")),
+                         hoverinfo="text",
+                         marker=dict(color="#c8102e"),
+                         text=dff['Text'],
+                         name="",
+                         textposition='outside',
+                         cliponaxis=False,
+                         offsetgroup=1
+                         ),
+                  )
+
+    fig.update_layout(title={'text': title,
+                             'y': 0.99},
+                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
+                      height=600,
+                      plot_bgcolor='rgba(0, 0, 0, 0)',
+                      showlegend=False,
+                      updatemenus=[
+                          dict(
+                              type="buttons",
+                              xanchor='right',
+                              x=1.2,
+                              y=0.5,
+                              buttons=list([
+                                  dict(
+                                      args=[{"error_x": [None, None],
+                                             "text": [None, dff['Text']]}],
+                                      label="Reset",
+                                      method="restyle"
+                                  ),
+                                  dict(
+                                      args=[{"error_x": [None, dict(type="data", array=dff["CI Upper"] - dff["Estimate"], color="#424242", thickness=1.5)],
+                                             "text": [dff['Text'], None]}],
+                                      label="Confidence Intervals",
+                                      method="restyle"
+                                  )
+                              ]),
+                          ),
+                      ]
+                      )
+
+    fig.update_xaxes(showgrid=False,
+                     showticklabels=False,
+                     autorange=False,
+                     range=[0, 1.25 * max(dff["CI Upper"])])
+    fig.update_yaxes(autorange="reversed",
+                     ticklabelposition="outside top",
+                     tickfont=dict(size=9))
+
+    if sort:
+        fig.update_yaxes(categoryorder="total descending")
+
+    markers = dff["Marker"]
+    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
+        fig.update_layout(margin={'l': 40, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
+                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["*"]).any():
+        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
+                                       dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["..."]).any():
+        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
+                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    else:
+        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.32, x=1.2, align="left", showarrow=False)])
+
+    return fig
+
+
+def build_vertical_percentage_graph(dff, title, name1, name2):
+    dff1 = dff[dff['Attribute'] == name1]
+
+    dff2 = dff[dff['Attribute'] == name2]
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(x=dff1['CI Upper'],
+                         y=dff1['QuestionText'],
+                         orientation="h",
+                         error_x=None,
+                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                         showlegend=False,
+                         hoverinfo="skip",
+                         text=None,
+                         textposition="outside",
+                         cliponaxis=False,
+                         offsetgroup=2
+                         ),
+                  )
+
+    fig.add_trace(go.Bar(x=dff2['CI Upper'],
+                         y=dff2['QuestionText'],
+                         orientation="h",
+                         error_x=None,
+                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                         showlegend=False,
+                         hoverinfo="skip",
+                         text=None,
+                         textposition="outside",
+                         cliponaxis=False,
+                         offsetgroup=1
+                         ),
+                  )
+
+    fig.add_trace(go.Bar(x=dff1['Estimate'],
+                         y=dff1['QuestionText'],
+                         orientation="h",
+                         error_x=None,
+                         hovertext=dff1['HoverText'],
+                         hovertemplate="%{hovertext}",
+                         hoverlabel=dict(font=dict(color="white")),
+                         hoverinfo="text",
+                         marker=dict(color="#c8102e"),
+                         text=dff1['Text'],
+                         textposition='outside',
+                         cliponaxis=False,
+                         name=name1,
+                         offsetgroup=2
+                         ),
+                  )
+
+    fig.add_trace(go.Bar(x=dff2['Estimate'],
+                         y=dff2['QuestionText'],
+                         orientation="h",
+                         error_x=None,
+                         hovertext=dff2['HoverText'],
+                         hovertemplate="%{hovertext}",
+                         hoverlabel=dict(font=dict(color="white")),
+                         hoverinfo="text",
+                         marker=dict(color="#7BAFD4"),
+                         text=dff2['Text'],
+                         textposition='outside',
+                         cliponaxis=False,
+                         name=name2,
+                         offsetgroup=1
+                         ),
+                  )
+
+    fig.update_layout(title={'text': title,
+                             'y': 0.99},
+                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
+                      height=600,
+                      plot_bgcolor='rgba(0, 0, 0, 0)',
+                      bargroupgap=0.05,
+                      barmode="group",
+                      legend={'orientation': 'h', 'yanchor': "bottom"},
+                      updatemenus=[
+                          dict(
+                              type="buttons",
+                              xanchor='right',
+                              x=1.2,
+                              y=0.5,
+                              buttons=list([
+                                  dict(
+                                      args=[{"error_x": [None, None, None, None],
+                                             "text": [None, None, dff1['Text'], dff2['Text']]}],
+                                      label="Reset",
+                                      method="restyle"
+                                  ),
+                                  dict(
+                                      args=[{"error_x": [None, None, dict(type="data", array=dff1["CI Upper"] - dff1["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=dff2["CI Upper"] - dff2["Estimate"], color="#424242", thickness=1.5)],
+                                             "text": [dff1['Text'], dff2['Text'], None, None]}],
+                                      label="Confidence Intervals",
+                                      method="restyle"
+                                  )
+                              ]),
+                          ),
+                      ]
+                      )
+
+    fig.update_xaxes(showgrid=False,
+                     showticklabels=False,
+                     autorange=False,
+                     range=[0, 1.25 * max(np.concatenate([dff1["CI Upper"], dff2["CI Upper"]]))])
+    fig.update_yaxes(autorange="reversed",
+                     ticklabelposition="outside top",
+                     tickfont=dict(size=9),
+                     categoryorder='array',
+                     categoryarray=dff1.sort_values(by="Estimate", ascending=False)["QuestionText"])
+
+    markers = pd.concat([dff1["Marker"], dff2["Marker"]])
+    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
+        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
+                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["*"]).any():
+        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
+                                     dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["..."]).any():
+        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
+                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    else:
+        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False)])
+
+    return fig
+
+
+###################### Templates ######################
+
+def placeholder(by, caution, unreliable, **columns):
+    # One row per footnote the skeleton should show
+    markers = [marker for marker, shown in [("*", caution), ("...", unreliable)] if shown] or [np.nan]
+    return pd.DataFrame(dict({"Estimate": 0, "CI Upper": 0, "Text": "", "HoverText": "", "Marker": markers, by: ""},
+                             **columns))
+
+
+def footnotes(*markers):
+    # The footnote variant shown below a chart, as the variant key of its template
+    markers = np.concatenate(markers)
+    return bool((markers == "*").any()), bool((markers == "...").any())
+
+
+def columns(dff, by, rows=slice(None)):
+    # Columns of the rows shown in a chart, as NumPy arrays (cheaper to slice and patch in than Series)
+    return {name: dff[name].to_numpy()[rows] for name in ["Estimate", "CI Upper", "Text", "HoverText", "Marker", by]}
+
+
+single_vertical_percentage_template = FigureTemplate(
+    lambda by, sort, caution, unreliable: build_single_vertical_percentage_graph(
+        placeholder(by, caution, unreliable), "", by=by, sort=sort))
+
+vertical_percentage_template = FigureTemplate(
+    lambda caution, unreliable: build_vertical_percentage_graph(
+        pd.concat([placeholder("QuestionText", caution, unreliable, Attribute="1"),
+                   placeholder("QuestionText", False, False, Attribute="2")]), "", "1", "2"))
+
+
+def single_vertical_percentage_graph(dff, title, by="Attribute", sort=False):
+    if not (RAW_FIGURES and FIGURE_TEMPLATES):
+        return build_single_vertical_percentage_graph(dff, title, by=by, sort=sort)
+
+    c = columns(dff, by)
+    buttons = ("layout", "updatemenus", 0, "buttons")
+    return single_vertical_percentage_template.render((by, sort) + footnotes(c["Marker"]), {
+        ("data", 0, "x"): c["CI Upper"],
+        ("data", 0, "y"): c[by],
+        ("data", 1, "x"): c["Estimate"],
+        ("data", 1, "y"): c[by],
+        ("data", 1, "hovertext"): c["HoverText"],
+        ("data", 1, "text"): c["Text"],
+        ("layout", "title", "text"): title,
+        buttons + (0, "args", 0, "text", 1): c["Text"],
+        buttons + (1, "args", 0, "error_x", 1, "array"): c["CI Upper"] - c["Estimate"],
+        buttons + (1, "args", 0, "text", 0): c["Text"],
+        ("layout", "xaxis", "range", 1): 1.25 * max(c["CI Upper"])
+    })
+
+
+def vertical_percentage_graph(dff, title, name1, name2):
+    if not (RAW_FIGURES and FIGURE_TEMPLATES):
+        return build_vertical_percentage_graph(dff, title, name1, name2)
+
+    attribute = dff["Attribute"].to_numpy()
+    c1 = columns(dff, "QuestionText", attribute == name1)
+    c2 = columns(dff, "QuestionText", attribute == name2)
+    # Same order as dff1.sort_values(by="Estimate", ascending=False) in build_vertical_percentage_graph()
+    order = pd.Series(c1["Estimate"]).sort_values(ascending=False).index.to_numpy()
+
+    buttons = ("layout", "updatemenus", 0, "buttons")
+    return vertical_percentage_template.render(footnotes(c1["Marker"], c2["Marker"]), {
+        ("data", 0, "x"): c1["CI Upper"],
+        ("data", 0, "y"): c1["QuestionText"],
+        ("data", 1, "x"): c2["CI Upper"],
+        ("data", 1, "y"): c2["QuestionText"],
+        ("data", 2, "x"): c1["Estimate"],
+        ("data", 2, "y"): c1["QuestionText"],
+        ("data", 2, "hovertext"): c1["HoverText"],
+        ("data", 2, "text"): c1["Text"],
+        ("data", 2, "name"): name1,
+        ("data", 3, "x"): c2["Estimate"],
+        ("data", 3, "y"): c2["QuestionText"],
+        ("data", 3, "hovertext"): c2["HoverText"],
+        ("data", 3, "text"): c2["Text"],
+        ("data", 3, "name"): name2,
+        ("layout", "title", "text"): title,
+        buttons + (0, "args", 0, "text", 2): c1["Text"],
+        buttons + (0, "args", 0, "text", 3): c2["Text"],
+        buttons + (1, "args", 0, "error_x", 2, "array"): c1["CI Upper"] - c1["Estimate"],
+        buttons + (1, "args", 0, "error_x", 3, "array"): c2["CI Upper"] - c2["Estimate"],
+        buttons + (1, "args", 0, "text", 0): c1["Text"],
+        buttons + (1, "args", 0, "text", 1): c2["Text"],
+        ("layout", "xaxis", "range", 1): 1.25 * max(np.concatenate([c1["CI Upper"], c2["CI Upper"]])),
+        ("layout", "yaxis", "categoryarray"): c1["QuestionText"][order]
+    })
@@ -1,8 +1,8 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import numpy as np
-from plotly.subplots import make_subplots
+from Utils.graph_utils import graph_objects
+
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
 
 ###################### Graph functions ######################
@@ -0,0 +1,181 @@
+# Script to export the latency, payload size and cache results of Dash callbacks as Prometheus metrics
+#
+# Every metric is labelled by the callback's output component ids (ie. "DonRateAvgDonAmt-Age"; a batched callback
+# joins its outputs with "+"). Callback time is split into phases:
+#
+# - filter: looking up rows (TableRegistry.slice() and reading tables)
+# - serialize: turning the figures into the JSON response (see Utils.cache_utils.encode_callbacks)
+# - build: the rest of the callback, mostly building the figure
+#
+# Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory so /metrics adds up every worker's metrics.
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from dash.exceptions import PreventUpdate
+
+from Utils.data_utils import time_phases
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # Callbacks run uninstrumented and /metrics isn't served
+    prometheus_client = None
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+if prometheus_client is not None:
+    CALLBACK_SECONDS = prometheus_client.Histogram(
+        "dash_callback_seconds", "Wall time of Dash callbacks", ["output"], buckets=SECONDS_BUCKETS)
+    PHASE_SECONDS = prometheus_client.Histogram(
+        "dash_callback_phase_seconds", "Wall time of Dash callbacks by phase (filter, build, serialize)",
+        ["output", "phase"], buckets=SECONDS_BUCKETS)
+    RESPONSE_BYTES = prometheus_client.Histogram(
+        "dash_callback_response_bytes", "Size of Dash callback responses (JSON)", ["output"], buckets=BYTES_BUCKETS)
+    CACHE_REQUESTS = prometheus_client.Counter(
+        "dash_callback_cache_requests", "Figure cache lookups of Dash callbacks", ["output", "result"])
+    ERRORS = prometheus_client.Counter("dash_callback_errors", "Dash callbacks that raised", ["output"])
+
+# Callbacks being observed in each thread, innermost last; each a dict of phase -> seconds plus "cache" -> hit/miss
+_records = threading.local()
+
+
+def _stack():
+    if not hasattr(_records, "stack"):
+        _records.stack = []
+    return _records.stack
+
+
+@contextmanager
+def phase(name):
+    '''
+    Counts the time spent in a block towards a phase of the callbacks running in this thread (if any are observed).
+
+    :param name: "filter" or "serialize"
+    '''
+    stack = _stack()
+    if not stack:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for record in stack:
+            record[name] = record.get(name, 0) + elapsed
+
+
+# Table lookups of the registries count towards the filter phase
+time_phases(phase)
+
+
+@contextmanager
+def recorded():
+    '''
+    Records the phases of a block as if it were an observed callback (ie. to time the filtering of a callback outside
+    of Prometheus).
+
+    :return: Dict of phase -> seconds (plus "cache" -> hit/miss), filled in as the block runs
+    '''
+    stack = _stack()
+    record = {}
+    stack.append(record)
+    try:
+        yield record
+    finally:
+        stack.pop()
+
+
+def note_cache(hit):
+    '''
+    Records whether the callback running in this thread was answered from its figure cache.
+    '''
+    for record in _stack():
+        record["cache"] = "hit" if hit else "miss"
+
+
+def output_label(output_id):
+    '''
+    :param output_id: Callback output id (ie. "DonRateAvgDonAmt-Age.figure" or "..a.figure...b.figure..")
+    :return: Component ids of the outputs (ie. "DonRateAvgDonAmt-Age" or "a+b")
+    '''
+    outputs = output_id[2:-2].split("...") if output_id.startswith("..") else [output_id]
+    return "+".join(output.rsplit(".", 1)[0] for output in outputs)
+
+
+def observe(label):
+    '''
+    Decorator recording a callback's wall time by phase, response size and cache result under a label.
+
+    :param label: Value of the "output" label (see output_label())
+    '''
+    def decorator(callback):
+        if prometheus_client is None:
+            return callback
+        @wraps(callback)
+        def observed(*args, **kwargs):
+            with recorded() as record:
+                start = time.perf_counter()
+                try:
+                    response = callback(*args, **kwargs)
+                except PreventUpdate:
+                    raise
+                except Exception:
+                    ERRORS.labels(label).inc()
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - start
+            CALLBACK_SECONDS.labels(label).observe(elapsed)
+            filtered, serialized = record.get("filter", 0), record.get("serialize", 0)
+            PHASE_SECONDS.labels(label, "filter").observe(filtered)
+            PHASE_SECONDS.labels(label, "serialize").observe(serialized)
+            PHASE_SECONDS.labels(label, "build").observe(max(elapsed - filtered - serialized, 0))
+            if isinstance(response, str):
+                RESPONSE_BYTES.labels(label).observe(len(response))
+            if "cache" in record:
+                CACHE_REQUESTS.labels(label, record["cache"]).inc()
+            return response
+        observed.observed_label = label
+        return observed
+    return decorator
+
+
+def instrument_callbacks(app):
+    '''
+    Records metrics for every server callback of a Dash app (see observe()) and serves them on /metrics. Call once,
+    after the callbacks are defined and the other wrappers (cache_callbacks(), etc.) are applied; callbacks already
+    instrumented (ie. mounted from another app) are left as they are.
+
+    :param app: Dash app
+    '''
+    if prometheus_client is None:
+        return
+    for output_id, callback in app.callback_map.items():
+        if "callback" in callback and not hasattr(callback["callback"], "observed_label"):
+            callback["callback"] = observe(output_label(output_id))(callback["callback"])
+    serve_metrics(app.server)
+
+
+def serve_metrics(server, path="/metrics"):
+    '''
+    Serves the metrics of the process (or, with PROMETHEUS_MULTIPROC_DIR set, of every gunicorn worker) in the
+    Prometheus text format.
+
+    :param server: Flask app
+    :param path: URL path
+    '''
+    if prometheus_client is None or "metrics" in server.view_functions:
+        return
+
+    @server.route(path, endpoint="metrics")
+    def metrics():
+        registry = prometheus_client.REGISTRY
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return prometheus_client.generate_latest(registry), 200, {"Content-Type": prometheus_client.CONTENT_TYPE_LATEST}
@@ -0,0 +1,191 @@
+# Script to mirror the remote tables some pages read (raw.githubusercontent.com URLs) locally
+#
+# Usage (from the repo root): python -m Utils.mirror_utils [url ...] [--workers N] [--mirror DIR]
+#
+# Remote CSVs are stored by content hash under Mirror/objects/, and Mirror/index.json maps each URL to its current
+# object along with the ETag/Last-Modified it was served with. resolve() answers from the mirror without touching the
+# network, so pages start offline; running this script (or prefetch()) revalidates every mirrored URL with
+# conditional GETs, in parallel, and only downloads the tables that changed. URLs of this repo's own tables fall back
+# to the copy in Tables/ when they were never mirrored.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from Utils.data_utils import ROOT_DIR, TABLES_DIR
+
+MIRROR_DIR = os.path.join(ROOT_DIR, "Mirror")
+# Remote copies of this repo's Tables/, used for URLs that were never mirrored
+REPO_TABLES_URL = "https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/"
+FETCH_TIMEOUT = 10
+# Revalidate mirrored URLs on every resolve() (MIRROR_REVALIDATE=1) instead of only when prefetching
+REVALIDATE = os.environ.get("MIRROR_REVALIDATE", "0") == "1"
+
+# index.json is rewritten by the threads prefetching
+_index_lock = threading.Lock()
+
+
+def is_url(source):
+    return isinstance(source, str) and source.startswith(("http://", "https://"))
+
+
+def object_path(digest, mirror_dir=MIRROR_DIR):
+    return os.path.join(mirror_dir, "objects", digest[:2], digest)
+
+
+def read_index(mirror_dir=MIRROR_DIR):
+    '''
+    :return: Dict of URL -> {"object": content hash, "etag", "last_modified", "checked": time of the last fetch}
+    '''
+    path = os.path.join(mirror_dir, "index.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _update_index(mirror_dir, url, entry):
+    with _index_lock:
+        index = read_index(mirror_dir)
+        index[url] = entry
+        path = os.path.join(mirror_dir, "index.json")
+        temp = "{}.{}.tmp".format(path, os.getpid())
+        with open(temp, "w") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(temp, path)
+
+
+def _write_object(mirror_dir, content):
+    digest = hashlib.sha256(content).hexdigest()
+    path = object_path(digest, mirror_dir)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+        with open(temp, "wb") as f:
+            f.write(content)
+        os.replace(temp, path)
+    return digest
+
+
+def fetch(url, mirror_dir=MIRROR_DIR, timeout=FETCH_TIMEOUT):
+    '''
+    Downloads a URL into the mirror, or only revalidates the mirrored copy when there is one (conditional GET: the
+    server answers 304 Not Modified without the body if it hasn't changed).
+
+    :return: (path of the mirrored copy, HTTP status: 200 or 304)
+    '''
+    entry = read_index(mirror_dir).get(url)
+    if entry is not None and not os.path.exists(object_path(entry["object"], mirror_dir)):
+        entry = None
+    request = urllib.request.Request(url)
+    if entry is not None:
+        if entry.get("etag"):
+            request.add_header("If-None-Match", entry["etag"])
+        if entry.get("last_modified"):
+            request.add_header("If-Modified-Since", entry["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            content, headers = response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        if e.code != 304 or entry is None:
+            raise
+        status, headers = 304, e.headers
+
+    if status == 304:
+        entry = dict(entry, checked=time.time())
+    else:
+        entry = {"object": _write_object(mirror_dir, content), "etag": headers.get("ETag"),
+                 "last_modified": headers.get("Last-Modified"), "checked": time.time()}
+    _update_index(mirror_dir, url, entry)
+    return object_path(entry["object"], mirror_dir), status
+
+
+def resolve(source, mirror_dir=MIRROR_DIR, revalidate=None):
+    '''
+    Local path to read a table from instead of a remote URL: the mirrored copy, else (for this repo's own tables) the
+    copy in Tables/, else the URL is fetched into the mirror. Paths that aren't URLs are returned as is.
+
+    :param source: Path or URL (ie. a TableRegistry source)
+    :param revalidate: Whether to check a mirrored copy is current first; defaults to REVALIDATE. Without network the
+                       mirrored copy is used anyway.
+    :return: Path (str)
+    '''
+    if not is_url(source):
+        return source
+    revalidate = REVALIDATE if revalidate is None else revalidate
+    entry = read_index(mirror_dir).get(source)
+    if entry is not None and os.path.exists(object_path(entry["object"], mirror_dir)):
+        if not revalidate:
+            return object_path(entry["object"], mirror_dir)
+        try:
+            return fetch(source, mirror_dir)[0]
+        except (urllib.error.URLError, OSError) as e:
+            print("Using the mirrored copy of {}: {}".format(source, e), file=sys.stderr)
+            return object_path(entry["object"], mirror_dir)
+
+    if source.startswith(REPO_TABLES_URL):
+        path = os.path.join(TABLES_DIR, source[len(REPO_TABLES_URL):])
+        if os.path.exists(path):
+            return path
+    return fetch(source, mirror_dir)[0]
+
+
+def prefetch(urls=None, workers=8, mirror_dir=MIRROR_DIR):
+    '''
+    Downloads or revalidates several URLs at once.
+
+    :param urls: URLs to fetch (defaults to every URL in the mirror)
+    :param workers: Number of concurrent requests
+    :return: Dict of URL -> HTTP status (200, 304) or the exception it failed with
+    '''
+    urls = sorted(read_index(mirror_dir)) if urls is None else list(urls)
+
+    def attempt(url):
+        try:
+            return fetch(url, mirror_dir)[1]
+        except (urllib.error.URLError, OSError) as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as executor:
+        return dict(zip(urls, executor.map(attempt, urls)))
+
+
+def registry_urls():
+    '''
+    :return: URLs of the tables read by the vizzes' registries
+    '''
+    from Utils.prerender import import_viz, viz_names
+    urls = set()
+    for name in viz_names():
+        registry = getattr(import_viz(name), "registry", None)
+        if registry is not None:
+            urls.update(source for source in registry.sources.values() if is_url(source))
+    return sorted(urls)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror or revalidate the remote tables the vizzes read")
+    parser.add_argument("urls", nargs="*", help="URLs (default: every URL of the vizzes and of the mirror)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests (default: 8)")
+    parser.add_argument("--mirror", default=MIRROR_DIR, help="Mirror directory (default: Mirror/)")
+    args = parser.parse_args(argv)
+    urls = args.urls or sorted(set(registry_urls()) | set(read_index(args.mirror)))
+    failed = 0
+    for url, status in prefetch(urls, args.workers, args.mirror).items():
+        if isinstance(status, Exception):
+            failed += 1
+        print("{}: {}".format(url, "failed ({})".format(status) if isinstance(status, Exception) else status))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
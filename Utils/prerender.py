@@ -0,0 +1,315 @@
+# Script to pre-render every figure of the vizzes into a static bundle
+#
+# Usage (from the repo root): python -m Utils.prerender [viz ...] [--workers N] [--bundle DIR]
+#
+# Every dropdown combination of every figure callback is rendered once, gzipped and stored by content hash under
+# Bundle/objects/. Bundle/manifest.json maps (viz, output id, inputs) to the stored response, along with hashes of the
+# tables each viz was rendered from, of their preprocessing and of the viz's source. Apps serve from the bundle with
+# serve_bundle() and fall back to rendering when a combination is missing or any of those have changed since.
+
+import argparse
+import contextvars
+import gzip
+import hashlib
+import importlib
+import itertools
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+
+import plotly
+
+from Utils.data_utils import (PLAIN_TABLE_SPECS, ROOT_DIR, plain_table_spec, preprocess_hash, preprocess_plain_tables,
+                              table_names, table_path)
+from Utils.graph_utils import DeferredValue
+
+BUNDLE_DIR = os.path.join(ROOT_DIR, "Bundle")
+VIZES_DIR = os.path.join(ROOT_DIR, "Vizes")
+
+# Turned off by render() (in its own context) so callbacks render instead of answering from the previous bundle
+_serving_bundle = contextvars.ContextVar("serving_bundle", default=True)
+
+
+def viz_names():
+    '''
+    :return: Module names of the vizzes in Vizes/
+    '''
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(VIZES_DIR)
+                  if name.endswith(".py") and not name.startswith("_"))
+
+
+def data_hash(names):
+    '''
+    Hash of the source CSVs of a set of tables, used to tell whether a bundle was rendered from the current data.
+
+    :param names: Table names
+    :return: Hex digest (str)
+    '''
+    digest = hashlib.sha256()
+    for name in sorted(names):
+        if name in table_names():
+            with open(table_path(name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def preprocess_digest(registry):
+    '''
+    Hash of the rules a registry's tables are preprocessed with (see Utils.data_utils.preprocess_hash()), used to tell
+    whether a bundle was rendered from tables preprocessed the current way.
+
+    :param registry: TableRegistry
+    :return: Hex digest (str)
+    '''
+    preprocess = registry.loader.preprocess
+    digest = hashlib.sha256(getattr(preprocess, "__name__", repr(preprocess)).encode())
+    for name in sorted(registry.names):
+        if name in table_names():
+            spec = None
+            if preprocess is preprocess_plain_tables:
+                spec = PLAIN_TABLE_SPECS.get(name) or plain_table_spec(name)
+            digest.update(name.encode() + b"\0" + preprocess_hash(name, spec).encode())
+    return digest.hexdigest()
+
+
+def source_hash(name):
+    '''
+    :param name: Viz module name
+    :return: Hex digest (str) of the viz's source
+    '''
+    with open(os.path.join(VIZES_DIR, name + ".py"), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def object_path(bundle_dir, key):
+    return os.path.join(bundle_dir, "objects", key[:2], key + ".json.gz")
+
+
+def write_object(bundle_dir, response):
+    '''
+    Stores a gzipped callback response under its content hash (identical figures are stored once).
+
+    :return: Content hash (str)
+    '''
+    data = response.encode()
+    key = hashlib.sha256(data).hexdigest()
+    path = object_path(bundle_dir, key)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            # mtime=0 so the same figure always compresses to the same bytes
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        os.replace(tmp, path)
+    return key
+
+
+def read_object(bundle_dir, key):
+    with open(object_path(bundle_dir, key), "rb") as f:
+        return gzip.decompress(f.read()).decode()
+
+
+def read_manifest(bundle_dir=BUNDLE_DIR):
+    path = os.path.join(bundle_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(bundle_dir, manifest):
+    path = os.path.join(bundle_dir, "manifest.json")
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def input_options(layout):
+    '''
+    :param layout: Dash layout
+    :return: Dict of component id -> option values, for every component with options (dropdowns, radio items)
+    '''
+    options = {}
+    stack = [layout]
+    while stack:
+        component = stack.pop()
+        values = getattr(component, "options", None)
+        if isinstance(values, DeferredValue):
+            values = values.value()
+        if values is not None and getattr(component, "id", None) is not None:
+            options[component.id] = [option["value"] for option in values]
+        children = getattr(component, "children", None)
+        if isinstance(children, (list, tuple)):
+            stack.extend(children)
+        elif hasattr(children, "to_plotly_json"):
+            stack.append(children)
+    return options
+
+
+def figure_requests(app):
+    '''
+    Every (output id, inputs) a page can send to an app's figure callbacks.
+
+    :return: List of (output id, tuple of input values)
+    '''
+    options = input_options(app.layout)
+    requests = []
+    for output_id, callback in app.callback_map.items():
+        if ".figure" not in output_id:
+            continue
+        domains = [options.get(i["id"]) for i in callback["inputs"]]
+        if any(domain is None for domain in domains):
+            # Inputs that are not choices (ie. free text) can't be enumerated
+            continue
+        requests += [(output_id, args) for args in itertools.product(*domains)]
+    return requests
+
+
+def outputs_list(output_id):
+    # What the page sends along with the callback; multi-output ids (ie. "..a.figure...b.figure..") take a list
+    if output_id.startswith(".."):
+        return [outputs_list(output) for output in output_id[2:-2].split("...")]
+    component_id, prop = output_id.rsplit(".", 1)
+    return {"id": component_id, "property": prop}
+
+
+def import_viz(name):
+    return importlib.import_module("Vizes." + name)
+
+
+def render(name, requests, bundle_dir, from_bundle=False):
+    '''
+    Renders a batch of figure requests of one viz (runs in a worker process).
+
+    :param from_bundle: Whether callbacks may answer from the bundle being rendered (see serve_bundle()) instead of
+                        rendering
+    :return: List of (output id, inputs, content hash or None if the callback failed)
+    '''
+    # Workers share this module with the vizzes they import, not the __main__ copy the CLI runs in
+    module = importlib.import_module("Utils.prerender")
+    return contextvars.copy_context().run(module._render, name, requests, bundle_dir, from_bundle)
+
+
+def _render(name, requests, bundle_dir, from_bundle):
+    _serving_bundle.set(from_bundle)
+    viz = import_viz(name)
+    rendered = []
+    for output_id, args in requests:
+        try:
+            response = viz.app.callback_map[output_id]["callback"](*args, outputs_list=outputs_list(output_id))
+        except Exception as e:
+            print("{} {} {}: {}: {}".format(name, output_id, args, type(e).__name__, e), file=sys.stderr)
+            rendered.append((output_id, args, None))
+            continue
+        rendered.append((output_id, args, write_object(bundle_dir, response)))
+    return rendered
+
+
+def prerender(names=None, workers=None, bundle_dir=BUNDLE_DIR, batch=64):
+    '''
+    Renders every figure request of the given vizzes into the bundle and updates its manifest.
+
+    :param names: Viz module names (defaults to every viz in Vizes/)
+    :param workers: Number of worker processes (defaults to the number of CPUs)
+    :param bundle_dir: Bundle directory
+    :param batch: Requests per task sent to a worker
+    :return: The updated manifest
+    '''
+    names = names or viz_names()
+    manifest = read_manifest(bundle_dir)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        tasks = {}
+        for name in names:
+            viz = importlib.import_module("Utils.prerender").import_viz(name)
+            requests = figure_requests(viz.app)
+            tasks[name] = (viz, [pool.submit(render, name, requests[i:i + batch], bundle_dir)
+                                 for i in range(0, len(requests), batch)])
+
+        for name, (viz, futures) in tasks.items():
+            figures = {}
+            for future in futures:
+                for output_id, args, key in future.result():
+                    if key is not None:
+                        figures.setdefault(output_id, {})[json.dumps(args)] = key
+            manifest[name] = {"data": data_hash(viz.registry.names), "preprocess": preprocess_digest(viz.registry),
+                              "source": source_hash(name), "figures": figures}
+            print("{}: {} figures".format(name, sum(len(f) for f in figures.values())))
+
+    write_manifest(bundle_dir, manifest)
+    return manifest
+
+
+def serve_bundle(app, name, registry, bundle_dir=BUNDLE_DIR):
+    '''
+    Answers an app's figure callbacks from the pre-rendered bundle, falling back to rendering for combinations that
+    are missing. Nothing is served if the bundle was rendered from other data than the registry's tables, preprocessed
+    another way or by another version of the viz, or once one of the tables is reloaded (see
+    Utils.data_utils.TableLoader.reload()). Call once, after the callbacks are defined (and before cache_callbacks() so
+    bundle hits are cached too).
+
+    :param app: Dash app
+    :param name: Viz module name (ie. "how_canadians_donate")
+    :param registry: TableRegistry of the viz
+    :param bundle_dir: Bundle directory
+    '''
+    entry = read_manifest(bundle_dir).get(name)
+    if (entry is None or entry["data"] != data_hash(registry.names)
+            or entry.get("preprocess") != preprocess_digest(registry) or entry.get("source") != source_hash(name)):
+        return
+
+    versions = registry.versions()
+    for output_id, callback in app.callback_map.items():
+        figures = entry["figures"].get(output_id)
+        if figures:
+            callback["callback"] = _bundled(callback["callback"], figures, bundle_dir, registry, versions)
+
+
+def _bundled(callback, figures, bundle_dir, registry, versions):
+    @wraps(callback)
+    def bundled(*args, **kwargs):
+        key = figures.get(json.dumps(args))
+        # registry.versions() also marks the tables as read, so cached bundle figures are dropped on reload
+        if key is None or registry.versions() != versions or not _serving_bundle.get():
+            return callback(*args, **kwargs)
+        return read_object(bundle_dir, key)
+    return bundled
+
+
+def warm_up(vizzes, background=False):
+    '''
+    Loads the tables of vizzes and builds the figures of their layouts (see Utils.graph_utils.DeferredFigure), which
+    importing a viz leaves to the first request.
+
+    :param vizzes: Viz modules
+    :param background: Whether to warm up in a daemon thread instead of before returning
+    :return: The thread, if background
+    '''
+    def run():
+        for viz in vizzes:
+            viz.registry.load()
+            json.dumps(viz.app.layout, cls=plotly.utils.PlotlyJSONEncoder)
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-render every figure of the vizzes into a static bundle")
+    parser.add_argument("vizzes", nargs="*", help="Viz module names (default: every viz in Vizes/)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--bundle", default=BUNDLE_DIR, help="Bundle directory (default: Bundle/)")
+    args = parser.parse_args(argv)
+    prerender(args.vizzes, args.workers, args.bundle)
+
+
+if __name__ == "__main__":
+    main()
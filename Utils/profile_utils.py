@@ -0,0 +1,205 @@
+# Script to profile a sample of the Dash callbacks served in production
+#
+# Opt-in: with PROFILE_RATE set (fraction of callback invocations to run under cProfile, ie. 0.01), sampled
+# invocations taking at least PROFILE_THRESHOLD seconds (default 0: all of them) are kept in a ring of the last
+# PROFILE_KEEP profiles (default 100) in PROFILE_DIR (default Profiles/), tagged with the callback's output id and
+# inputs. To catch a rare slow callback, profile every invocation (PROFILE_RATE=1) with a threshold: only the slow
+# ones are written, at the cost of running every callback under cProfile. Without PROFILE_RATE nothing is wrapped.
+#
+# /admin/profiles lists the profiles (JSON), /admin/profiles/<name> downloads one (open with pstats or snakeviz) and
+# /admin/profiles/<name>?format=text shows its top functions. The routes only answer requests carrying the
+# PROFILE_TOKEN environment variable in an X-Profile-Token header (ie. curl -H "X-Profile-Token: $PROFILE_TOKEN"), and
+# are forbidden when it isn't set.
+
+import cProfile
+import glob
+import hmac
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from functools import wraps
+
+import flask
+
+from Utils.data_utils import ROOT_DIR
+
+logger = logging.getLogger(__name__)
+
+PROFILE_RATE = float(os.environ.get("PROFILE_RATE", 0))
+PROFILE_THRESHOLD = float(os.environ.get("PROFILE_THRESHOLD", 0))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 100))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(ROOT_DIR, "Profiles"))
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN")
+# Functions listed by ?format=text
+TEXT_LIMIT = 40
+
+# Profiles written by this process, so names are unique across threads
+_sequence = itertools.count()
+_ring_lock = threading.Lock()
+
+
+class ProfileRing:
+    '''
+    Bounded directory of profiles: each is a pstats dump (<name>.prof) with its metadata (<name>.json); writing a
+    profile removes the oldest beyond keep. Names sort by time, and carry the pid so that processes sharing the
+    directory (gunicorn workers) don't collide.
+    '''
+
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def add(self, profile, metadata):
+        '''
+        :param profile: cProfile.Profile, disabled
+        :param metadata: JSON-serializable dict (output id, inputs, seconds, ...)
+        :return: Name of the profile
+        '''
+        os.makedirs(self.directory, exist_ok=True)
+        name = "{:.6f}-{}-{}".format(time.time(), os.getpid(), next(_sequence))
+        path = os.path.join(self.directory, name)
+        # Metadata last: a profile is listed once its metadata exists
+        profile.dump_stats(path + ".prof")
+        with open(path + ".json.tmp", "w") as f:
+            json.dump(dict(metadata, name=name), f)
+        os.replace(path + ".json.tmp", path + ".json")
+        self.trim()
+        return name
+
+    def trim(self):
+        with _ring_lock:
+            names = self.names()
+            for name in names[:max(len(names) - self.keep, 0)]:
+                for suffix in [".json", ".prof"]:
+                    try:
+                        os.remove(os.path.join(self.directory, name + suffix))
+                    except FileNotFoundError:
+                        # Removed by another process trimming at the same time
+                        pass
+
+    def names(self):
+        '''
+        :return: Names of the profiles, oldest first
+        '''
+        paths = glob.glob(os.path.join(self.directory, "*.json"))
+        return sorted((os.path.basename(path)[:-len(".json")] for path in paths), key=lambda name: float(
+            name.split("-", 1)[0]))
+
+    def list(self):
+        '''
+        :return: Metadata of the profiles, newest first
+        '''
+        listed = []
+        for name in reversed(self.names()):
+            try:
+                with open(os.path.join(self.directory, name + ".json")) as f:
+                    listed.append(json.load(f))
+            except FileNotFoundError:
+                pass
+        return listed
+
+    def path(self, name):
+        '''
+        :return: Path of a profile's pstats dump, or None if there is no such profile
+        '''
+        if name not in self.names():
+            return None
+        return os.path.join(self.directory, name + ".prof")
+
+
+def profiled(callback, output_id, ring, rate=PROFILE_RATE, threshold=PROFILE_THRESHOLD):
+    '''
+    Wraps a callback to run a fraction of its invocations under cProfile, keeping the profiles of those that take at
+    least threshold seconds in a ProfileRing. On Python 3.12+, where only one profiler can be active per process,
+    invocations sampled while another thread's is being profiled run unprofiled.
+    '''
+    def keep(profile, args, elapsed):
+        # Failing to keep a profile doesn't fail the callback it profiled
+        try:
+            metadata = {"output": output_id, "inputs": json.loads(json.dumps(args, default=str)), "seconds": elapsed,
+                        "time": time.time(), "pid": os.getpid()}
+            ring.add(profile, metadata)
+        except Exception:
+            logger.exception("Couldn't keep the profile of %s", output_id)
+
+    @wraps(callback)
+    def sampled(*args, **kwargs):
+        if random.random() >= rate:
+            return callback(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process: another thread is running a sampled invocation
+            return callback(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return callback(*args, **kwargs)
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            if elapsed >= threshold:
+                keep(profile, args, elapsed)
+    return sampled
+
+
+def profile_callbacks(app, rate=PROFILE_RATE, threshold=PROFILE_THRESHOLD, ring=None):
+    '''
+    Samples the server callbacks of a Dash app under cProfile (see profiled()) and serves the profiles on
+    /admin/profiles. Does nothing unless rate > 0. Call once, after the other wrappers are applied.
+
+    :param app: Dash app
+    :param rate: Fraction of invocations to profile (defaults to PROFILE_RATE)
+    :param threshold: Seconds an invocation must take for its profile to be kept (defaults to PROFILE_THRESHOLD)
+    :param ring: ProfileRing (defaults to one in PROFILE_DIR keeping PROFILE_KEEP profiles)
+    :return: The ProfileRing, or None when profiling is off
+    '''
+    if rate <= 0:
+        return None
+    ring = ring or ProfileRing()
+    for output_id, callback in app.callback_map.items():
+        if "callback" in callback:
+            callback["callback"] = profiled(callback["callback"], output_id, ring, rate, threshold)
+    serve_profiles(app.server, ring)
+    return ring
+
+
+def _authorized():
+    token = flask.request.headers.get("X-Profile-Token", "")
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def serve_profiles(server, ring, path="/admin/profiles"):
+    '''
+    Lists (JSON) and downloads the profiles of a ProfileRing.
+
+    :param server: Flask app
+    :param ring: ProfileRing
+    :param path: URL path of the listing
+    '''
+    @server.route(path, endpoint="profiles")
+    def profiles():
+        if not _authorized():
+            flask.abort(403)
+        return flask.jsonify(ring.list())
+
+    @server.route(path + "/<name>", endpoint="profile")
+    def profile(name):
+        if not _authorized():
+            flask.abort(403)
+        profile_path = ring.path(name)
+        if profile_path is None:
+            flask.abort(404)
+        if flask.request.args.get("format") == "text":
+            text = io.StringIO()
+            pstats.Stats(profile_path, stream=text).sort_stats("cumulative").print_stats(TEXT_LIMIT)
+            return text.getvalue(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+        with open(profile_path, "rb") as f:
+            return f.read(), 200, {"Content-Type": "application/octet-stream",
+                                   "Content-Disposition": "attachment; filename={}.prof".format(name)}
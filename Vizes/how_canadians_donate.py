@@ -2,39 +2,26 @@ import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-import textwrap
+from Utils.data_utils import TableRegistry
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredValue, graph_objects
 
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-
-# DonMethAvgDon_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-DonMethAvgDon.csv")
-DonMethAvgDon_2018 = pd.read_csv("Tables/2018-DonMethAvgDon.csv")
-# DonMethDonRates_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-DonMethDonRates.csv")
-DonMethDonRates_2018 = pd.read_csv("Tables/2018-DonMethDonRates.csv")
-
-DonMethDonRates_2018['Estimate'] = DonMethDonRates_2018['Estimate']*100
-DonMethDonRates_2018['CI Upper'] = DonMethDonRates_2018['CI Upper']*100
-
-data = [DonMethAvgDon_2018, DonMethDonRates_2018]
-
-for i in range(len(data)):
-    data[i]["Estimate"] = np.where(data[i]["Marker"]=="...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"]=="...", 0, data[i]["CI Upper"])
-
-
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unable to determine", "", data[i]["Group"])
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unknown", "", data[i]["Group"])
-
-    data[i]["Attribute"] = data[i]["Attribute"].str.wrap(15)
-    data[i]["Attribute"] = data[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-
-    data[i]['Estimate'] = data[i]['Estimate'].round(0).astype(int)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0).astype(int)
-    data[i]['cv'] = data[i]['cv'].round(2)
+# Tables are read and cleaned (see Utils.data_utils.preprocess_tables) the first time they are used
+registry = TableRegistry(names=["DonMethAvgDon", "DonMethDonRates"])
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
 region_values = np.array(['CA', 'BC', 'AB', 'PR', 'ON', 'QC', 'AT'], dtype=object)
 region_names = np.array(['Canada',
@@ -45,7 +32,10 @@ region_names = np.array(['Canada',
                          'Quebec',
                          'Atlantic Provinces (NB, NS, PE, NL)'], dtype=str)
 
-method_names = DonMethAvgDon_2018["QuestionText"].unique()
+# Dropdown options read from the tables when the page is first served, see Utils.graph_utils.DeferredValue
+def method_names():
+    return registry["DonMethAvgDon"]["QuestionText"].unique()
+
 
 app.layout = html.Div([
     html.Div([
@@ -65,7 +55,7 @@ app.layout = html.Div([
         html.Div(["Select a method of focus:",
                   dcc.Dropdown(
                       id='method-selection',
-                      options=[{'label': i, 'value': i} for i in method_names],
+                      options=DeferredValue(lambda: [{'label': i, 'value': i} for i in method_names()], version=registry.versions),
                       value='At work',
                       style={'verticalAlgin': 'middle'}
                   ),
@@ -87,22 +77,6 @@ app.layout = html.Div([
 ])
 
 def don_rate_avg_don_by_meth(dff1, dff2, name1, name2, title):
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                             [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                   dff1["Marker"] == "...",
-                                   pd.isnull(dff1["Marker"])],
-                                  ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             ["$"+dff2.Estimate.map(str)+"*", "...", "$"+dff2.Estimate.map(str)])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)])
     dff1 = dff1[(dff1.Attribute != "Unknown")]
     dff1 = dff1[(dff1.Attribute != "Unable to<br>determine")]
     dff2 = dff2[(dff2.Attribute != "Unknown")]
@@ -248,22 +222,6 @@ def don_rate_avg_don_by_meth(dff1, dff2, name1, name2, title):
 
 
 def don_rate_avg_don(dff1, dff2, name1, name2, title):
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                             [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                   dff1["Marker"] == "...",
-                                   pd.isnull(dff1["Marker"])],
-                                  ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             ["$"+dff2.Estimate.map(str)+"*", "...", "$"+dff2.Estimate.map(str)])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)])
     dff1 = dff1[(dff1.Attribute != "Unknown") & (dff1.Attribute != "Unable to determine")]
     dff2 = dff2[(dff2.Attribute != "Unknown") & (dff2.Attribute != "Unable to determine")]
 
@@ -413,12 +371,10 @@ def don_rate_avg_don(dff1, dff2, name1, name2, title):
 
 def update_graph(region):
 
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "All"]
+    dff1 = registry.slice("DonMethDonRates", region, "All")
     name1 = "% donating"
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "All"]
+    dff2 = registry.slice("DonMethAvgDon", region, "All")
     name2 = "Average amount"
 
     title = '{}, {}'.format("Donation rate & average donation amount by method", region)
@@ -434,15 +390,11 @@ def update_graph(region):
     ])
 def update_graph(region, method):
 
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("DonMethDonRates", region, "Age group", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Age group", question=method)
     name2 = "Average amount"
 
 
@@ -459,15 +411,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("DonMethDonRates", region, "Gender", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Gender", question=method)
     name2 = "Average amount"
 
 
@@ -483,15 +431,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("DonMethDonRates", region, "Marital status", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Marital status", question=method)
     name2 = "Average amount"
 
 
@@ -508,15 +452,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("DonMethDonRates", region, "Education", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Education", question=method)
     name2 = "Average amount"
 
 
@@ -534,15 +474,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("DonMethDonRates", region, "Labour force status", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Labour force status", question=method)
     name2 = "Average amount"
 
 
@@ -559,15 +495,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("DonMethDonRates", region, "Frequency of religious attendance", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Frequency of religious attendance", question=method)
     name2 = "Average amount"
 
 
@@ -584,15 +516,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Family income category"]
+    dff1 = registry.slice("DonMethDonRates", region, "Family income category", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Family income category"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Family income category", question=method)
     name2 = "Average amount"
 
 
@@ -609,15 +537,11 @@ def update_graph(region, method):
         dash.dependencies.Input('method-selection', 'value')
     ])
 def update_graph(region, method):
-    dff1 = DonMethDonRates_2018[DonMethDonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['QuestionText'] == method]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("DonMethDonRates", region, "Immigration status", question=method)
     name1 = "% donating"
 
 
-    dff2 = DonMethAvgDon_2018[DonMethAvgDon_2018['Region'] == region]
-    dff2 = dff2[dff2['QuestionText'] == method]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("DonMethAvgDon", region, "Immigration status", question=method)
     name2 = "Average amount"
 
 
@@ -626,5 +550,7 @@ def update_graph(region, method):
 
     return don_rate_avg_don(dff1, dff2, name1, name2, title)
 
+setup_callbacks(app, "how_canadians_donate", registry, figure_cache, clientside=CLIENTSIDE_FIGURES)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
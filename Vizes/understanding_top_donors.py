@@ -2,53 +2,29 @@ import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-import textwrap
+from Utils.data_utils import TableRegistry
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import graph_objects
+from Utils.graphs.percentage_graph_utils import vertical_percentage_graph
 
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
-TopDonorsMotivations_2018 = pd.read_csv("../Tables/2018-TopDonorsMotivationsForGiving.csv")
-TopDonorsBarriers_2018 = pd.read_csv("../Tables/2018-TopDonorsBarriersToGiving.csv")
-TopDonorsPercTotDonations_2018 = pd.read_csv("../Tables/2018-TopDonorsPercTotDonations.csv")
-TopDonorsPercTotDonors_2018 = pd.read_csv("../Tables/2018-TopDonorsPercTotDonors.csv")
-TopDonorsDonRates_2018 = pd.read_csv("../Tables/2018-TopDonorsDonRates.csv")
-TopDonorsDemoLikelihoods = pd.read_csv("../Tables/2018-TopDonorsDemoLikelihoods.csv")
-
-TopDonorsMotivations_2018['Estimate'] = TopDonorsMotivations_2018['Estimate']*100
-TopDonorsMotivations_2018['CI Upper'] = TopDonorsMotivations_2018['CI Upper']*100
-TopDonorsBarriers_2018['Estimate'] = TopDonorsBarriers_2018['Estimate']*100
-TopDonorsBarriers_2018['CI Upper'] = TopDonorsBarriers_2018['CI Upper']*100
-TopDonorsPercTotDonations_2018['Estimate'] = TopDonorsPercTotDonations_2018['Estimate']*100
-TopDonorsPercTotDonations_2018['CI Upper'] = TopDonorsPercTotDonations_2018['CI Upper']*100
-TopDonorsPercTotDonors_2018['Estimate'] = TopDonorsPercTotDonors_2018['Estimate']*100
-TopDonorsPercTotDonors_2018['CI Upper'] = TopDonorsPercTotDonors_2018['CI Upper']*100
-TopDonorsDonRates_2018['Estimate'] = TopDonorsDonRates_2018['Estimate']*100
-TopDonorsDonRates_2018['CI Upper'] = TopDonorsDonRates_2018['CI Upper']*100
-TopDonorsDemoLikelihoods['Estimate'] = TopDonorsDemoLikelihoods['Estimate']*100
-TopDonorsDemoLikelihoods['CI Upper'] = TopDonorsDemoLikelihoods['CI Upper']*100
-
-data = [TopDonorsMotivations_2018, TopDonorsBarriers_2018, TopDonorsPercTotDonations_2018, TopDonorsPercTotDonors_2018, TopDonorsDonRates_2018, TopDonorsDemoLikelihoods]
-
-for i in range(len(data)):
-    data[i]["Estimate"] = np.where(data[i]["Marker"]=="...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"]=="...", 0, data[i]["CI Upper"])
-
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unable to determine", "", data[i]["Group"])
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unknown", "", data[i]["Group"])
-
-    data[i]["Attribute"] = data[i]["Attribute"].str.wrap(15)
-    data[i]["Attribute"] = data[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-
-    data[i]["QuestionText"] = data[i]["QuestionText"].str.wrap(20)
-    data[i]["QuestionText"] = data[i]["QuestionText"].replace({'\n': '<br>'}, regex=True)
-
-    data[i]['Estimate'] = data[i]['Estimate'].round(0).astype(int)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0).astype(int)
-    data[i]['cv'] = data[i]['cv'].round(2)
+# Tables are read and cleaned (see Utils.data_utils.preprocess_tables) the first time they are used
+registry = TableRegistry(names=["TopDonorsMotivationsForGiving", "TopDonorsBarriersToGiving", "TopDonorsPercTotDonations",
+                                "TopDonorsPercTotDonors", "TopDonorsDonRates", "TopDonorsDemoLikelihoods"])
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
 region_values = np.array(['CA', 'BC', 'AB', 'PR', 'ON', 'QC', 'AT'], dtype=object)
 region_names = np.array(['Canada',
@@ -95,23 +71,6 @@ app.layout = html.Div([
 ])
 
 def dist_total_donations(dff1, dff2, name1, name2, title):
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                                [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                      dff1["Marker"] == "...",
-                                      pd.isnull(dff1["Marker"])],
-                                     ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                      "Estimate Suppressed",
-                                      "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             [dff2.Estimate.map(str)+"%"+"*", "...", dff2.Estimate.map(str)+"%"])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                               pd.isnull(dff2["Marker"])],
-                              ["Estimate: "+dff2.Estimate.map(str)+"% ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                               "Estimate Suppressed",
-                               "Estimate: "+dff2.Estimate.map(str)+"% ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"%"])
     fig = go.Figure()
 
     fig.add_trace(go.Bar(x=dff2['Attribute'],
@@ -226,156 +185,7 @@ def dist_total_donations(dff1, dff2, name1, name2, title):
 
     return fig
 
-def vertical_percentage_graph(dff, title, name1, name2):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                             [dff.Estimate.map(str)+"%"+"*", "...", dff.Estimate.map(str)+"%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                   dff["Marker"] == "...",
-                                   pd.isnull(dff["Marker"])],
-                                  ["Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%"])
-
-    dff1 = dff[dff['Attribute'] == name1]
-
-    dff2 = dff[dff['Attribute'] == name2]
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(x=dff1['CI Upper'],
-                         y=dff1['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=2
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff2['CI Upper'],
-                         y=dff2['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff1['Estimate'],
-                         y=dff1['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff1['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#c8102e"),
-                         text=dff1['Text'],
-                         textposition='outside',
-                         cliponaxis=False,
-                         name=name1,
-                         offsetgroup=2
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff2['Estimate'],
-                         y=dff2['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         hovertext =dff2['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#7BAFD4"),
-                         text=dff2['Text'],
-                         textposition='outside',
-                         cliponaxis=False,
-                         name=name2,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.update_layout(title={'text': title,
-                             'y': 0.99},
-                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                      height=600,
-                      plot_bgcolor='rgba(0, 0, 0, 0)',
-                      bargroupgap=0.05,
-                      barmode="group",
-                      legend={'orientation': 'h', 'yanchor': "bottom"},
-                      updatemenus=[
-                          dict(
-                              type = "buttons",
-                              xanchor='right',
-                              x = 1.2,
-                              y = 0.5,
-                              buttons=list([
-                                  dict(
-                                      args=[{"error_x": [None, None, None, None],
-                                             "text": [None, None, dff1['Text'], dff2['Text']]}],
-                                      label="Reset",
-                                      method="restyle"
-                                  ),
-                                  dict(
-                                      args=[{"error_x": [None, None, dict(type="data", array=dff1["CI Upper"]-dff1["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=dff2["CI Upper"]-dff2["Estimate"], color="#424242", thickness=1.5)],
-                                             "text": [dff1['Text'], dff2['Text'], None, None]}],
-                                      label="Confidence Intervals",
-                                      method="restyle"
-                                  )
-                              ]),
-                          ),
-                      ]
-                      )
-
-    fig.update_xaxes(showgrid=False,
-                     showticklabels=False,
-                     autorange = False,
-                     range = [0, 1.25*max(np.concatenate([dff1["CI Upper"], dff2["CI Upper"]]))])
-    fig.update_yaxes(autorange="reversed",
-                     ticklabelposition="outside top",
-                     tickfont=dict(size=9),
-                     categoryorder='array',
-                     categoryarray=dff1.sort_values(by="Estimate", ascending=False)["QuestionText"])
-
-    markers = pd.concat([dff1["Marker"], dff2["Marker"]])
-    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["*"]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    else:
-        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False)])
-
-
-    return fig
-
 def triple_vertical_percentage_graph(dff, title):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            [dff.Estimate.map(str)+"%"+"*", "...", dff.Estimate.map(str)+"%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%"])
-
     dff1 = dff[dff['QuestionText'] == "Top donors"]
     name1 = "Top donors"
 
@@ -549,8 +359,8 @@ def triple_vertical_percentage_graph(dff, title):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff2 = TopDonorsPercTotDonors_2018[TopDonorsPercTotDonors_2018['Region'] == region]
-    dff1 = TopDonorsPercTotDonations_2018[TopDonorsPercTotDonations_2018['Region'] == region]
+    dff2 = registry.slice("TopDonorsPercTotDonors", region)
+    dff1 = registry.slice("TopDonorsPercTotDonations", region)
 
     name2 = "% donors"
     name1 = "% donation value"
@@ -565,8 +375,7 @@ def update_graph(region):
         dash.dependencies.Input('demo-selection', 'value')
     ])
 def update_graph(region, demo):
-    dff = TopDonorsDemoLikelihoods[TopDonorsDemoLikelihoods['Region'] == region]
-    dff = dff[dff['Group'] == demo]
+    dff = registry.slice("TopDonorsDemoLikelihoods", region, demo)
 
     title = '{}, {}'.format("Likelihood of being a top donor by demographic characteristic", region)
     return triple_vertical_percentage_graph(dff, title)
@@ -577,7 +386,7 @@ def update_graph(region, demo):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = TopDonorsDonRates_2018[TopDonorsDonRates_2018['Region'] == region]
+    dff = registry.slice("TopDonorsDonRates", region)
     name1 = "Top donor"
     name2 = "Regular donor"
 
@@ -590,7 +399,7 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = TopDonorsMotivations_2018[TopDonorsMotivations_2018['Region'] == region]
+    dff = registry.slice("TopDonorsMotivationsForGiving", region)
     name1 = "Top donor"
     name2 = "Regular donor"
 
@@ -603,13 +412,15 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = TopDonorsBarriers_2018[TopDonorsBarriers_2018['Region'] == region]
+    dff = registry.slice("TopDonorsBarriersToGiving", region)
     name1 = "Top donor"
     name2 = "Regular donor"
 
     title = '{}, {}'.format("Barriers to giving more, top donors vs. regular donors", region)
     return vertical_percentage_graph(dff, title, name1, name2)
 
+setup_callbacks(app, "understanding_top_donors", registry, figure_cache, clientside=CLIENTSIDE_FIGURES)
+
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -2,54 +2,38 @@ import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-import textwrap
+from Utils.data_utils import TableRegistry
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredValue, graph_objects
+from Utils.graphs.percentage_graph_utils import single_vertical_percentage_graph, vertical_percentage_graph
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
-Barriers_2018 = pd.read_csv("../Tables/2018-BarriersToGiving.csv")
-AvgAmtBarriers_2018 = pd.read_csv("../Tables/2018-AvgAmtBarriers.csv")
-GivingConcerns_2018 = pd.read_csv("../Tables/2018-GivingConcerns.csv")
-SolicitationConcerns_2018 = pd.read_csv("../Tables/2018-SolicitationConcerns.csv")
-BarriersByCause_2018 = pd.read_csv("../Tables/2018-BarriersByCause.csv")
+# Tables are read and cleaned (see Utils.data_utils.preprocess_tables) the first time they are used
+registry = TableRegistry(names=["BarriersToGiving", "AvgAmtBarriers", "GivingConcerns", "SolicitationConcerns",
+                                "BarriersByCause"])
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
-Barriers_2018['Estimate'] = Barriers_2018['Estimate'] * 100
-Barriers_2018['CI Upper'] = Barriers_2018['CI Upper'] * 100
-GivingConcerns_2018['Estimate'] = GivingConcerns_2018['Estimate'] * 100
-GivingConcerns_2018['CI Upper'] = GivingConcerns_2018['CI Upper'] * 100
-SolicitationConcerns_2018['Estimate'] = SolicitationConcerns_2018['Estimate'] * 100
-SolicitationConcerns_2018['CI Upper'] = SolicitationConcerns_2018['CI Upper'] * 100
-BarriersByCause_2018['Estimate'] = BarriersByCause_2018['Estimate'] * 100
-BarriersByCause_2018['CI Upper'] = BarriersByCause_2018['CI Upper'] * 100
+# Dropdown options read from the tables when the page is first served, see Utils.graph_utils.DeferredValue
+def cause_names():
+    return registry["BarriersByCause"]["Group"].unique()
 
-data = [Barriers_2018, AvgAmtBarriers_2018, GivingConcerns_2018, SolicitationConcerns_2018, BarriersByCause_2018]
 
-cause_names = BarriersByCause_2018["Group"].unique()
-barriers_names = Barriers_2018["QuestionText"].unique()
+def barriers_names():
+    # Dropdown labels without the line breaks added by preprocess_tables()
+    return registry["BarriersToGiving"]["QuestionText"].str.replace("<br>", " ", regex=False).unique()
 
-for i in range(len(data)):
-    data[i]["Estimate"] = np.where(data[i]["Marker"] == "...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"] == "...", 0, data[i]["CI Upper"])
-
-    data[i]["Group"] = np.where(data[i]["Attribute"] == "Unable to determine", "", data[i]["Group"])
-    data[i]["Group"] = np.where(data[i]["Attribute"] == "Unknown", "", data[i]["Group"])
-
-    if not data[i]["Attribute"].isna().all():
-        data[i]["Attribute"] = data[i]["Attribute"].str.wrap(15)
-        data[i]["Attribute"] = data[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-        data[i]["Attribute"] = np.where(data[i]["Attribute"] == "Do not support<br>cause", "Do not support cause", data[i]["Attribute"])
-        data[i]["Attribute"] = np.where(data[i]["Attribute"] == "Do not report<br>barrier", "Do not report barrier", data[i]["Attribute"])
-        data[i]["Attribute"] = np.where(data[i]["Attribute"] == "Report<br>barrier", "Report barrier", data[i]["Attribute"])
-
-    data[i]["QuestionText"] = data[i]["QuestionText"].str.wrap(20)
-    data[i]["QuestionText"] = data[i]["QuestionText"].replace({'\n': '<br>'}, regex=True)
-
-    data[i]['Estimate'] = data[i]['Estimate'].round(0).astype(int)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0).astype(int)
-    data[i]['cv'] = data[i]['cv'].round(2)
 
 region_values = np.array(['CA', 'BC', 'AB', 'PR', 'ON', 'QC', 'AT'], dtype=object)
 region_names = np.array(['Canada',
@@ -83,7 +67,7 @@ app.layout = html.Div([
             html.Div(["Select a barrier of focus:",
                       dcc.Dropdown(
                           id='barrier-selection',
-                          options=[{'label': barriers_names[i], 'value': barriers_names[i]} for i in range(len(barriers_names))],
+                          options=DeferredValue(lambda: [{'label': i, 'value': i} for i in barriers_names()], version=registry.versions),
                           value='Happy with what already given',
                           style={'verticalAlgin': 'middle'}
                       ),
@@ -102,7 +86,7 @@ app.layout = html.Div([
             html.Div(["Select a cause of focus:",
                       dcc.Dropdown(
                           id='cause-selection',
-                          options=[{'label': cause_names[i], 'value': cause_names[i]} for i in range(len(cause_names))],
+                          options=DeferredValue(lambda: [{'label': i, 'value': i} for i in cause_names()], version=registry.versions),
                           value='Arts & culture',
                           style={'verticalAlgin': 'middle'}
                       ),
@@ -115,122 +99,7 @@ app.layout = html.Div([
 ])
 
 
-def single_vertical_percentage_graph(dff, title, by="Attribute", sort=False):
-
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            [dff.Estimate.map(str) + "%" + "*", "...", dff.Estimate.map(str) + "%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%"])
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(x=dff['CI Upper'],
-                         y=dff[by],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         name="",
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff['Estimate'],
-                         y=dff[by],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#c8102e"),
-                         text=dff['Text'],
-                         name="",
-                         textposition='outside',
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.update_layout(title={'text': title,
-                             'y': 0.99},
-                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                      height=600,
-                      plot_bgcolor='rgba(0, 0, 0, 0)',
-                      showlegend=False,
-                      updatemenus=[
-                          dict(
-                              type="buttons",
-                              xanchor='right',
-                              x=1.2,
-                              y=0.5,
-                              buttons=list([
-                                  dict(
-                                      args=[{"error_x": [None, None],
-                                             "text": [None, dff['Text']]}],
-                                      label="Reset",
-                                      method="restyle"
-                                  ),
-                                  dict(
-                                      args=[{"error_x": [None, dict(type="data", array=dff["CI Upper"] - dff["Estimate"], color="#424242", thickness=1.5)],
-                                             "text": [dff['Text'], None]}],
-                                      label="Confidence Intervals",
-                                      method="restyle"
-                                  )
-                              ]),
-                          ),
-                      ]
-                      )
-
-    fig.update_xaxes(showgrid=False,
-                     showticklabels=False,
-                     autorange=False,
-                     range=[0, 1.25 * max(dff["CI Upper"])])
-    fig.update_yaxes(autorange="reversed",
-                     ticklabelposition="outside top",
-                     tickfont=dict(size=9))
-
-    if sort:
-        fig.update_yaxes(categoryorder="total descending")
-
-    markers = dff["Marker"]
-    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 40, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["*"]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    else:
-        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.32, x=1.2, align="left", showarrow=False)])
-
-    return fig
-
-
 def vertical_dollar_graph(dff, name1, name2, title):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            ["$" + dff.Estimate.map(str) + "*", "...", "$" + dff.Estimate.map(str)])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: $" + dff.Estimate.map(str) + " ± $" + (dff["CI Upper"] - dff["Estimate"]).map(str) + "<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: $" + dff.Estimate.map(str) + " ± $" + (dff["CI Upper"] - dff["Estimate"]).map(str)])
-
     dff1 = dff[dff['Attribute'] == name1]
 
     dff2 = dff[dff['Attribute'] == name2]
@@ -361,154 +230,13 @@ def vertical_dollar_graph(dff, name1, name2, title):
     return fig
 
 
-def vertical_percentage_graph(dff, title, name1, name2):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            [dff.Estimate.map(str) + "%" + "*", "...", dff.Estimate.map(str) + "%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%"])
-
-    dff1 = dff[dff['Attribute'] == name1]
-
-    dff2 = dff[dff['Attribute'] == name2]
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(x=dff1['CI Upper'],
-                         y=dff1['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=2
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff2['CI Upper'],
-                         y=dff2['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff1['Estimate'],
-                         y=dff1['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff1['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#c8102e"),
-                         text=dff1['Text'],
-                         textposition='outside',
-                         cliponaxis=False,
-                         name=name1,
-                         offsetgroup=2
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff2['Estimate'],
-                         y=dff2['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff2['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#7BAFD4"),
-                         text=dff2['Text'],
-                         textposition='outside',
-                         cliponaxis=False,
-                         name=name2,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.update_layout(title={'text': title,
-                             'y': 0.99},
-                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                      height=600,
-                      plot_bgcolor='rgba(0, 0, 0, 0)',
-                      bargroupgap=0.05,
-                      barmode="group",
-                      legend={'orientation': 'h', 'yanchor': "bottom"},
-                      updatemenus=[
-                          dict(
-                              type="buttons",
-                              xanchor='right',
-                              x=1.2,
-                              y=0.5,
-                              buttons=list([
-                                  dict(
-                                      args=[{"error_x": [None, None, None, None],
-                                             "text": [None, None, dff1['Text'], dff2['Text']]}],
-                                      label="Reset",
-                                      method="restyle"
-                                  ),
-                                  dict(
-                                      args=[{"error_x": [None, None, dict(type="data", array=dff1["CI Upper"] - dff1["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=dff2["CI Upper"] - dff2["Estimate"], color="#424242", thickness=1.5)],
-                                             "text": [dff1['Text'], dff2['Text'], None, None]}],
-                                      label="Confidence Intervals",
-                                      method="restyle"
-                                  )
-                              ]),
-                          ),
-                      ]
-                      )
-
-    fig.update_xaxes(showgrid=False,
-                     showticklabels=False,
-                     autorange=False,
-                     range=[0, 1.25 * max(np.concatenate([dff1["CI Upper"], dff2["CI Upper"]]))])
-    fig.update_yaxes(autorange="reversed",
-                     ticklabelposition="outside top",
-                     tickfont=dict(size=9),
-                     categoryorder='array',
-                     categoryarray=dff1.sort_values(by="Estimate", ascending=False)["QuestionText"])
-
-    markers = pd.concat([dff1["Marker"], dff2["Marker"]])
-    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["*"]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                     dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    else:
-        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False)])
-
-    return fig
-
-
 @app.callback(
     dash.dependencies.Output('BarriersOverall', 'figure'),
     [
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff = dff[dff["Group"] == "All"]
+    dff = registry.slice("BarriersToGiving", region, "All")
     title = '{}, {}'.format("Barriers reported by donors", region)
     return single_vertical_percentage_graph(dff, title, by="QuestionText", sort=True)
 
@@ -519,7 +247,7 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = AvgAmtBarriers_2018[AvgAmtBarriers_2018['Region'] == region]
+    dff = registry.slice("AvgAmtBarriers", region)
     name1 = "Report barrier"
     name2 = "Do not report barrier"
     title = '{}, {}'.format("Average amounts contributed by donors reporting and not reporting specific barriers", region)
@@ -532,8 +260,7 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = GivingConcerns_2018[GivingConcerns_2018['Region'] == region]
-    dff = dff[dff["Group"] == "All"]
+    dff = registry.slice("GivingConcerns", region, "All")
     title = '{}, {}'.format("Reasons for efficiency / effectiveness concerns", region)
     return single_vertical_percentage_graph(dff, title, by="QuestionText", sort=True)
 
@@ -544,8 +271,7 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = SolicitationConcerns_2018[SolicitationConcerns_2018['Region'] == region]
-    dff = dff[dff["Group"] == "All"]
+    dff = registry.slice("SolicitationConcerns", region, "All")
     title = '{}, {}'.format("Reasons for disliking solicitations", region)
     return single_vertical_percentage_graph(dff, title, by="QuestionText", sort=True)
 
@@ -557,10 +283,7 @@ def update_graph(region):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Gender"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Gender", question=barrier)
     title = '{}, {}'.format("Barriers to giving more by gender", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -572,10 +295,7 @@ def update_graph(region, barrier):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Age group"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Age group", question=barrier)
     title = '{}, {}'.format("Barriers to giving more by age", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -588,10 +308,7 @@ def update_graph(region, barrier):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Education"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Education", question=barrier)
     title = '{}, {}'.format("Barriers to giving more by formal education", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -604,10 +321,7 @@ def update_graph(region, barrier):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Family income category"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Family income category", question=barrier)
     title = '{}, {}'.format("Barriers reported by household income", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -619,10 +333,7 @@ def update_graph(region, barrier):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Frequency of religious attendance"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Frequency of religious attendance", question=barrier)
     title = '{}, {}'.format("Barriers reported by religious attendance", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -635,10 +346,7 @@ def update_graph(region, barrier):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Marital status"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Marital status", question=barrier)
     title = '{}, {}'.format("Barriers reported by marital status", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -650,10 +358,7 @@ def update_graph(region, barrier):
 
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Labour force status"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Labour force status", question=barrier)
     title = '{}, {}'.format("Barriers reported by labour force status", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -665,10 +370,7 @@ def update_graph(region, barrier):
         dash.dependencies.Input('barrier-selection', 'value')
     ])
 def update_graph(region, barrier):
-    dff = Barriers_2018[Barriers_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Immigration status"]
-    dff = dff[dff["QuestionText"] == barrier]
+    dff = registry.slice("BarriersToGiving", region, "Immigration status", question=barrier)
     title = '{}, {}'.format("Barriers reported by immigration status", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -679,13 +381,14 @@ def update_graph(region, barrier):
         dash.dependencies.Input('cause-selection', 'value')
     ])
 def update_graph(region, cause):
-    dff = BarriersByCause_2018[BarriersByCause_2018['Region'] == region]
-    dff = dff[dff["Group"] == cause]
+    dff = registry.slice("BarriersByCause", region, cause)
     name1 = "Support cause"
     name2 = "Do not support cause"
     title = '{}, {}'.format("Percentages of cause supporters and non-supporters reporting each barrier, by cause", region)
     return vertical_percentage_graph(dff, title, name1, name2)
 
+setup_callbacks(app, "what_keeps_canadians_from_giving_more", registry, figure_cache, clientside=CLIENTSIDE_FIGURES)
+
 
 if __name__ == '__main__':
     app.run_server(debug=True)
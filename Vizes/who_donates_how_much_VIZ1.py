@@ -2,93 +2,30 @@ import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-import textwrap
+from Utils.data_utils import TableRegistry
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredFigure, graph_objects
 
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
-# Reading in data from public urls
-# DonRates_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-DonRate.csv")
-DonRates_2018 = pd.read_csv("../Tables/2018-DonRate.csv")
-# AvgTotDon_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgTotDon.csv")
-AvgTotDon_2018 = pd.read_csv("../Tables/2018-AvgTotDon.csv")
-# AvgNumCauses_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgNumCauses.csv")
-AvgNumCauses_2018 = pd.read_csv("../Tables/2018-AvgNumCauses.csv")
-FormsGiving_2018 = pd.read_csv("../Tables/2018-FormsGiving.csv")
-TopCauseFocus_2018 = pd.read_csv("../Tables/2018-TopCauseFocus.csv")
-PropTotDon_2018 = pd.read_csv("../Tables/2018-PercTotDonors.csv")
-PropTotDonAmt_2018 = pd.read_csv("../Tables/2018-PercTotDonations.csv")
-
-# Format donation rates as percentage
-DonRates_2018['Estimate'] = DonRates_2018['Estimate']*100
-DonRates_2018['CI Upper'] = DonRates_2018['CI Upper']*100
-FormsGiving_2018['Estimate'] = FormsGiving_2018['Estimate']*100
-FormsGiving_2018['CI Upper'] = FormsGiving_2018['CI Upper']*100
-TopCauseFocus_2018['Estimate'] = TopCauseFocus_2018['Estimate']*100
-TopCauseFocus_2018['CI Upper'] = TopCauseFocus_2018['CI Upper']*100
-PropTotDon_2018['Estimate'] = PropTotDon_2018['Estimate']*100
-PropTotDon_2018['CI Upper'] = PropTotDon_2018['CI Upper']*100
-PropTotDonAmt_2018['Estimate'] = PropTotDonAmt_2018['Estimate']*100
-PropTotDonAmt_2018['CI Upper'] = PropTotDonAmt_2018['CI Upper']*100
-
-
-
-# Create list of dataframes for iterated cleaning
-# "data" contains estimates that are dollar amounts or rates, "data_num" contains estimates that are numbers
-data = [DonRates_2018, AvgTotDon_2018, FormsGiving_2018, TopCauseFocus_2018, PropTotDon_2018, PropTotDonAmt_2018]
-data_num = [AvgNumCauses_2018]
-
-for i in range(len(data)):
-    # Suppress Estimate and CI Upper where necessary (for visualizations and error bars)
-    data[i]["Estimate"] = np.where(data[i]["Marker"]=="...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"]=="...", 0, data[i]["CI Upper"])
-
-    data[i]["Region"] = np.select([data[i]["Province"] == "SK",
-                                   data[i]["Province"] == "MB",
-                                   data[i]["Province"] == "NB",
-                                   data[i]["Province"] == "NS",
-                                   data[i]["Province"] == "PE",
-                                   data[i]["Province"] == "NL"],
-                                  ["SK", "MB", "NB", "NS", "PE", "NL"], default=data[i]["Region"])
-
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unable to determine", "", data[i]["Group"])
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unknown", "", data[i]["Group"])
-
-    data[i]["Attribute"] = data[i]["Attribute"].str.wrap(15)
-    data[i]["Attribute"] = data[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-
-    # Round rates and dollar amounts to zero decimal places
-    data[i]['Estimate'] = data[i]['Estimate'].round(0).astype(int)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0).astype(int)
-    data[i]['cv'] = data[i]['cv'].round(2)
-
-for i in range(len(data_num)):
-    # Suppress Estimate and CI Upper where necessary (for visualizations and error bars)
-    data_num[i]["Estimate"] = np.where(data_num[i]["Marker"]=="...", 0, data_num[i]["Estimate"])
-    data_num[i]["CI Upper"] = np.where(data_num[i]["Marker"]=="...", 0, data_num[i]["CI Upper"])
-
-    data_num[i]["Region"] = np.select([data_num[i]["Province"] == "SK",
-                                       data_num[i]["Province"] == "MB",
-                                       data_num[i]["Province"] == "NB",
-                                       data_num[i]["Province"] == "NS",
-                                       data_num[i]["Province"] == "PE",
-                                       data_num[i]["Province"] == "NL"],
-                                     ["SK", "MB", "NB", "NS", "PE", "NL"], default=data_num[i]["Region"])
-
-    data_num[i]["Group"] = np.where(data_num[i]["Attribute"]=="Unable to determine", "", data_num[i]["Group"])
-    data_num[i]["Group"] = np.where(data_num[i]["Attribute"]=="Unknown", "", data_num[i]["Group"])
-
-    data_num[i]["Attribute"] = data_num[i]["Attribute"].str.wrap(15)
-    data_num[i]["Attribute"] = data_num[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-
-    # Round number amounts to two decimal places
-    data_num[i]['Estimate'] = data_num[i]['Estimate'].round(1)
-    data_num[i]["CI Upper"] = data_num[i]["CI Upper"].round(1)
-    data_num[i]['cv'] = data[i]['cv'].round(2)
+# Tables are read and cleaned (see Utils.data_utils.preprocess_tables) the first time they are used
+registry = TableRegistry(names=["DonRate", "AvgTotDon", "AvgNumCauses", "FormsGiving", "TopCauseFocus", "PercTotDonors",
+                                "PercTotDonations"])
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
+# Update every figure driven by region-selection in one request instead of one request per figure
+BATCH_REGION_CALLBACKS = True
 
 # Extract info from data for selection menus
 region_values = np.array(['CA', 'BC', 'AB', 'PR', 'SK', 'MB', 'ON', 'QC', 'AT', 'NB', 'NS', 'PE', 'NL'], dtype=object)
@@ -106,154 +43,142 @@ region_names = np.array(['Canada',
                          'Prince Edward Island',
                          'Newfoundland and Labrador'], dtype=str)
 
-fig1df1 = DonRates_2018[DonRates_2018['Group'] == "All"]
-fig1df1 = fig1df1[fig1df1.Province.notnull()]
-
-fig1df2 = AvgTotDon_2018[AvgTotDon_2018['Group'] == "All"]
-fig1df2 = fig1df2[fig1df2.Province.notnull()]
-
-
-fig1df1['Text'] = np.select([fig1df1["Marker"] == "*", fig1df1["Marker"] == "...", pd.isnull(fig1df1["Marker"])],
-                         [fig1df1.Estimate.map(str)+"%"+"*", "...", fig1df1.Estimate.map(str)+"%"])
-fig1df1['HoverText'] = np.select([fig1df1["Marker"] == "*",
-                                  fig1df1["Marker"] == "...",
-                                  pd.isnull(fig1df1["Marker"])],
-                            ["Estimate: "+fig1df1.Estimate.map(str)+"% ± "+(fig1df1["CI Upper"] - fig1df1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                             "Estimate Suppressed",
-                             "Estimate: "+fig1df1.Estimate.map(str)+"% ± "+(fig1df1["CI Upper"] - fig1df1["Estimate"]).map(str)+"%"])
-
-fig1df2['Text'] = np.select([fig1df2["Marker"] == "*", fig1df2["Marker"] == "...", pd.isnull(fig1df2["Marker"])],
-                         ["$"+fig1df2.Estimate.map(str)+"*", "...", "$"+fig1df2.Estimate.map(str)])
-fig1df2['HoverText'] = np.select([fig1df2["Marker"] == "*",
-                                  fig1df2["Marker"] == "...",
-                                  pd.isnull(fig1df2["Marker"])],
-                                 ["Estimate: $"+fig1df2.Estimate.map(str)+" ± $"+(fig1df2["CI Upper"] - fig1df2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: $"+fig1df2.Estimate.map(str)+" ± $"+(fig1df2["CI Upper"] - fig1df2["Estimate"]).map(str)])
-
-
-# Donation rate &amp; average donation amount by province
-fig1 = go.Figure()
-
-fig1.add_trace(go.Bar(x=fig1df2['Province'],
-                      y=fig1df2['CI Upper'],
-                      marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                      text=None,
-                      textposition='outside',
-                      showlegend=False,
-                      hoverinfo="skip",
-                      cliponaxis=False,
-                      offsetgroup=1,
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df1['Province'],
-                      y=fig1df1['CI Upper'],
-                      marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                      text=None,
-                      textposition='outside',
-                      hoverinfo="skip",
-                      showlegend=False,
-                      name="Donor rate",
-                      yaxis='y2',
-                      offsetgroup=2,
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df2['Province'],
-                      y=fig1df2['Estimate'],
-                      error_y=None, # need to vectorize subtraction
-                      hovertext =fig1df2['HoverText'],
-                      hovertemplate="%{hovertext}",
-                      hoverlabel=dict(font=dict(color="white")),
-                      hoverinfo="text",
-                      marker=dict(color="#7BAFD4"),
-                      text=fig1df2['Text'],
-                      textposition='outside',
-                      cliponaxis=False,
-                      name="Average donation amount",
-                      offsetgroup=1
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df1['Province'],
-                        y=fig1df1['Estimate'],
-                        error_y=None,
-                        hovertext=fig1df1['HoverText'],
-                        hovertemplate="%{hovertext}",
-                        hoverlabel=dict(font=dict(color="white")),
-                        hoverinfo="text",
-                        marker=dict(color="#c8102e"),
-                        text=fig1df1['Text'],
-                        textposition='outside',
-                        cliponaxis=False,
-                        name="Donor rate",
-                        yaxis='y2',
-                        offsetgroup=2
-                     ),
-              )
+def province_figure():
+    # Donation rate and average donation amount by province (built when the page is first served, see Utils.graph_utils.DeferredFigure)
+    fig1df1 = registry["DonRate"]
+    fig1df1 = fig1df1[fig1df1['Group'] == "All"]
+    fig1df1 = fig1df1[fig1df1.Province.notnull()]
 
+    fig1df2 = registry["AvgTotDon"]
+    fig1df2 = fig1df2[fig1df2['Group'] == "All"]
+    fig1df2 = fig1df2[fig1df2.Province.notnull()]
 
 
-y1 = go.layout.YAxis(overlaying='y', side='left', range = [0, 1.25*max(fig1df2["CI Upper"])])
-y2 = go.layout.YAxis(overlaying='y', side='right', range = [0, 1.25*max(fig1df1["CI Upper"])])
 
-fig1.update_layout(title={'text': "Donation rate & average donation amount by province",
-                         'y': 0.99},
-                   margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                   plot_bgcolor='rgba(0, 0, 0, 0)',
-                   barmode="group",
-                   yaxis1=y1,
-                   yaxis2=y2,
-                   legend={'orientation': 'h', 'yanchor': "bottom", 'xanchor': 'center', 'x': 0.5, 'y': -0.15, 'traceorder': 'reversed'},
-                   height=400,
-                   updatemenus=[
-                       dict(
-                           type = "buttons",
-                           xanchor='right',
-                           x = 1.4,
-                           y = 0.5,
-                           buttons=list([
-                               dict(
-                                   args=[{"error_y": [None, None, None, None],
-                                          "text": [None, None, fig1df2['Text'], fig1df1['Text']],
-                                          }],
-                                   label="Reset",
-                                   method="restyle"
-                               ),
-                               dict(
-                                   args=[{"error_y": [None, None, dict(type="data", array=fig1df2["CI Upper"]-fig1df2["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=fig1df1["CI Upper"]-fig1df1["Estimate"], color="#424242", thickness=1.5)],
-                                          "text": [fig1df2['Text'], fig1df1['Text'], None, None],
-                                          }],
-                                   label="Confidence Intervals",
-                                   method="restyle"
-                               )
-                           ]),
-                       ),
-                   ])
+    # Donation rate &amp; average donation amount by province
+    fig1 = go.Figure()
 
-# Aesthetics for fig
-fig1.update_xaxes(autorange="reversed", tickfont=dict(size=12))
-fig1.update_yaxes(showgrid=False,
-                 showticklabels=False,
-                 autorange = False)
-
-markers = pd.concat([fig1df1["Marker"], fig1df2["Marker"]])
-if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-    fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                      annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
-                                   dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-elif markers.isin(["*"]).any():
-    fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                      annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
-                                   dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-elif markers.isin(["..."]).any():
-    fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                      annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
-                                   dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-else:
-    fig1.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                      annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.21, x=1.4, align="left", showarrow=False)])
+    fig1.add_trace(go.Bar(x=fig1df2['Province'],
+                          y=fig1df2['CI Upper'],
+                          marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                          text=None,
+                          textposition='outside',
+                          showlegend=False,
+                          hoverinfo="skip",
+                          cliponaxis=False,
+                          offsetgroup=1,
+                          ),
+                   )
+
+    fig1.add_trace(go.Bar(x=fig1df1['Province'],
+                          y=fig1df1['CI Upper'],
+                          marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                          text=None,
+                          textposition='outside',
+                          hoverinfo="skip",
+                          showlegend=False,
+                          name="Donor rate",
+                          yaxis='y2',
+                          offsetgroup=2,
+                          ),
+                   )
+
+    fig1.add_trace(go.Bar(x=fig1df2['Province'],
+                          y=fig1df2['Estimate'],
+                          error_y=None, # need to vectorize subtraction
+                          hovertext =fig1df2['HoverText'],
+                          hovertemplate="%{hovertext}",
+                          hoverlabel=dict(font=dict(color="white")),
+                          hoverinfo="text",
+                          marker=dict(color="#7BAFD4"),
+                          text=fig1df2['Text'],
+                          textposition='outside',
+                          cliponaxis=False,
+                          name="Average donation amount",
+                          offsetgroup=1
+                          ),
+                   )
+
+    fig1.add_trace(go.Bar(x=fig1df1['Province'],
+                            y=fig1df1['Estimate'],
+                            error_y=None,
+                            hovertext=fig1df1['HoverText'],
+                            hovertemplate="%{hovertext}",
+                            hoverlabel=dict(font=dict(color="white")),
+                            hoverinfo="text",
+                            marker=dict(color="#c8102e"),
+                            text=fig1df1['Text'],
+                            textposition='outside',
+                            cliponaxis=False,
+                            name="Donor rate",
+                            yaxis='y2',
+                            offsetgroup=2
+                         ),
+                  )
+
+
+
+    y1 = go.layout.YAxis(overlaying='y', side='left', range = [0, 1.25*max(fig1df2["CI Upper"])])
+    y2 = go.layout.YAxis(overlaying='y', side='right', range = [0, 1.25*max(fig1df1["CI Upper"])])
+
+    fig1.update_layout(title={'text': "Donation rate & average donation amount by province",
+                             'y': 0.99},
+                       margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
+                       plot_bgcolor='rgba(0, 0, 0, 0)',
+                       barmode="group",
+                       yaxis1=y1,
+                       yaxis2=y2,
+                       legend={'orientation': 'h', 'yanchor': "bottom", 'xanchor': 'center', 'x': 0.5, 'y': -0.15, 'traceorder': 'reversed'},
+                       height=400,
+                       updatemenus=[
+                           dict(
+                               type = "buttons",
+                               xanchor='right',
+                               x = 1.4,
+                               y = 0.5,
+                               buttons=list([
+                                   dict(
+                                       args=[{"error_y": [None, None, None, None],
+                                              "text": [None, None, fig1df2['Text'], fig1df1['Text']],
+                                              }],
+                                       label="Reset",
+                                       method="restyle"
+                                   ),
+                                   dict(
+                                       args=[{"error_y": [None, None, dict(type="data", array=fig1df2["CI Upper"]-fig1df2["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=fig1df1["CI Upper"]-fig1df1["Estimate"], color="#424242", thickness=1.5)],
+                                              "text": [fig1df2['Text'], fig1df1['Text'], None, None],
+                                              }],
+                                       label="Confidence Intervals",
+                                       method="restyle"
+                                   )
+                               ]),
+                           ),
+                       ])
+
+    # Aesthetics for fig
+    fig1.update_xaxes(autorange="reversed", tickfont=dict(size=12))
+    fig1.update_yaxes(showgrid=False,
+                     showticklabels=False,
+                     autorange = False)
+
+    markers = pd.concat([fig1df1["Marker"], fig1df2["Marker"]])
+    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
+        fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
+                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["*"]).any():
+        fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
+                                       dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["..."]).any():
+        fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
+                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    else:
+        fig1.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
+                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.21, x=1.4, align="left", showarrow=False)])
+
+    return fig1
 
 
 ### General app layout/set up ###
@@ -282,7 +207,7 @@ app.layout = html.Div([
     html.Div([
         # Graph components!
         dcc.Graph(id='FormsGiving', style={'marginTop': 50}),
-        dcc.Graph(id='DonRateAvgDonAmt-prv', figure=fig1, style={'marginTop': 50}),
+        dcc.Graph(id='DonRateAvgDonAmt-prv', figure=DeferredFigure(province_figure, version=registry.versions), style={'marginTop': 50}),
         dcc.Graph(id='DonRateAvgDonAmt-Gndr', style={'marginTop': 50}),
         dcc.Graph(id='PercDon-Gndr', style={'marginTop': 50}),
         dcc.Graph(id='PrimCauseNumCause-Gndr', style={'marginTop': 50}),
@@ -314,15 +239,6 @@ app.layout = html.Div([
 ])
 
 def forms_of_giving(dff, title):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                             [dff.Estimate.map(str)+"%"+"*", "...", dff.Estimate.map(str)+"%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                      pd.isnull(dff["Marker"])],
-                                     ["Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                      "Estimate Suppressed",
-                                      "Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%"])
-
     fig = go.Figure()
 
     fig.add_trace(go.Bar(y=dff['CI Upper'],
@@ -424,22 +340,6 @@ def don_rate_avg_don(dff1, dff2, name1, name2, title):
     :param title: Graph title (str)
     :return: Plot.ly graph object
     '''
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                             [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                  dff1["Marker"] == "...",
-                                  pd.isnull(dff1["Marker"])],
-                                 ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             ["$"+dff2.Estimate.map(str)+"*", "...", "$"+dff2.Estimate.map(str)])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)])
 
 # Scatter plot - data frame, x label, y label
     fig = go.Figure()
@@ -595,22 +495,6 @@ def perc_don_perc_amt(dff1, dff2, name1, name2, title):
     :param title: Graph title (str)
     :return: Plot.ly graph object
     '''
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                             [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                   dff1["Marker"] == "...",
-                                   pd.isnull(dff1["Marker"])],
-                                  ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             [dff2.Estimate.map(str)+"%"+"*", "...", dff2.Estimate.map(str)+"%"])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: "+dff2.Estimate.map(str)+"% ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff2.Estimate.map(str)+"% ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"%"])
     dff1 = dff1[(dff1.Attribute != "Not in labour force")]
                 # & (dff1.Attribute != "Unknown")]
     dff2 = dff2[(dff2.Attribute != "Not in labour force")]
@@ -759,22 +643,6 @@ def prim_cause_num_cause(dff1, dff2, name1, name2, title):
    :return: Plot.ly graph object
    '''
     # Make text column - dff1.Estimate.map(str)+"%" where Marker == NA, dff1.Estimate.map(str)+"%"+"*" where Marker == *, "..." where Marker == ...
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                            [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                   dff1["Marker"] == "...",
-                                   pd.isnull(dff1["Marker"])],
-                                  ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                            [dff2.Estimate.map(str)+"*", "...", dff2.Estimate.map(str)])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: "+dff2.Estimate.map(str)+" ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff2.Estimate.map(str)+" ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)])
 
     # Scatter plot - data frame, x label, y label
     fig = go.Figure()
@@ -927,8 +795,7 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = FormsGiving_2018[FormsGiving_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "All"]
+    dff1 = registry.slice("FormsGiving", region, "All")
 
     # Format title according to dropdown input
     title = '{}, {}'.format("Forms of giving", region)
@@ -954,14 +821,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("DonRate", region, "Age group")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("AvgTotDon", region, "Age group")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -987,14 +852,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("DonRate", region, "Gender")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("AvgTotDon", region, "Gender")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1020,14 +883,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("DonRate", region, "Marital status")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("AvgTotDon", region, "Marital status")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1053,14 +914,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("DonRate", region, "Education")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("AvgTotDon", region, "Education")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1087,14 +946,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("DonRate", region, "Labour force status")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("AvgTotDon", region, "Labour force status")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1120,14 +977,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("DonRate", region, "Frequency of religious attendance")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("AvgTotDon", region, "Frequency of religious attendance")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1153,14 +1008,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Family income category"]
+    dff1 = registry.slice("DonRate", region, "Family income category")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Family income category"]
+    dff2 = registry.slice("AvgTotDon", region, "Family income category")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1186,14 +1039,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("DonRate", region, "Immigration status")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("AvgTotDon", region, "Immigration status")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -1224,14 +1075,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("PercTotDonors", region, "Age group")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("PercTotDonations", region, "Age group")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1258,14 +1107,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("PercTotDonors", region, "Gender")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("PercTotDonations", region, "Gender")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1292,14 +1139,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status (original)"]
+    dff1 = registry.slice("PercTotDonors", region, "Marital status (original)")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("PercTotDonations", region, "Marital status")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1326,14 +1171,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("PercTotDonors", region, "Education")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("PercTotDonations", region, "Education")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1360,14 +1203,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("PercTotDonors", region, "Labour force status")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("PercTotDonations", region, "Labour force status")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1394,14 +1235,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("PercTotDonors", region, "Frequency of religious attendance")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("PercTotDonations", region, "Frequency of religious attendance")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1428,14 +1267,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Family income category"]
+    dff1 = registry.slice("PercTotDonors", region, "Family income category")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Family income category"]
+    dff2 = registry.slice("PercTotDonations", region, "Family income category")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1462,14 +1299,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("PercTotDonors", region, "Immigration status")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("PercTotDonations", region, "Immigration status")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -1496,14 +1331,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("AvgNumCauses", region, "Age group")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("TopCauseFocus", region, "Age group")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1530,14 +1363,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("AvgNumCauses", region, "Gender")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("TopCauseFocus", region, "Gender")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1564,14 +1395,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("AvgNumCauses", region, "Marital status")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("TopCauseFocus", region, "Marital status")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1598,14 +1427,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("AvgNumCauses", region, "Education")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("TopCauseFocus", region, "Education")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1632,14 +1459,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("AvgNumCauses", region, "Labour force status")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("TopCauseFocus", region, "Labour force status")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1666,14 +1491,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("AvgNumCauses", region, "Frequency of religious attendance")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("TopCauseFocus", region, "Frequency of religious attendance")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1700,14 +1523,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Family income category"]
+    dff1 = registry.slice("AvgNumCauses", region, "Family income category")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Family income category"]
+    dff2 = registry.slice("TopCauseFocus", region, "Family income category")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1734,14 +1555,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("AvgNumCauses", region, "Immigration status")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("TopCauseFocus", region, "Immigration status")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -1750,6 +1569,10 @@ def update_graph(region):
     # Uses external function with dataframes, names, and title set up above
     return prim_cause_num_cause(dff2, dff1, name2, name1, title)
 
+setup_callbacks(app, "who_donates_how_much_VIZ1", registry, figure_cache,
+                batch_inputs=[dash.dependencies.Input('region-selection', 'value')] if BATCH_REGION_CALLBACKS else None,
+                clientside=CLIENTSIDE_FIGURES)
+
 
 
 if __name__ == '__main__':
@@ -1,12 +1,11 @@
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-import dash_table
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
-from plotly.subplots import make_subplots
+from Utils.data_utils import TableRegistry, preprocess_plain_tables
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredFigure, graph_objects
 
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
@@ -14,130 +13,84 @@ external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
 # Reading in data from public urls
-# DonRates_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-DonRate.csv")
-DonRates_2018 = pd.read_csv("Tables/2018-DonRate.csv")
-# AvgTotDon_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgTotDon.csv")
-AvgTotDon_2018 = pd.read_csv("Tables/2018-AvgTotDon.csv")
-AvgNumCauses_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgNumCauses.csv")
-FormsGiving_2018 = pd.read_csv("Tables/2018-FormsGiving.csv")
-TopCauseFocus_2018 = pd.read_csv("Tables/2018-TopCauseFocus.csv")
-PropTotDon_2018 = pd.read_csv("Tables/2018-PercTotDonors.csv")
-PropTotDonAmt_2018 = pd.read_csv("Tables/2018-PercTotDonations.csv")
-
-# Format donation rates as percentage
-DonRates_2018['Estimate'] = DonRates_2018['Estimate']*100
-DonRates_2018['CI Upper'] = DonRates_2018['CI Upper']*100
-FormsGiving_2018['Estimate'] = FormsGiving_2018['Estimate']*100
-FormsGiving_2018['CI Upper'] = FormsGiving_2018['CI Upper']*100
-TopCauseFocus_2018['Estimate'] = TopCauseFocus_2018['Estimate']*100
-TopCauseFocus_2018['CI Upper'] = TopCauseFocus_2018['CI Upper']*100
-PropTotDon_2018['Estimate'] = PropTotDon_2018['Estimate']*100
-PropTotDon_2018['CI Upper'] = PropTotDon_2018['CI Upper']*100
-PropTotDonAmt_2018['Estimate'] = PropTotDonAmt_2018['Estimate']*100
-PropTotDonAmt_2018['CI Upper'] = PropTotDonAmt_2018['CI Upper']*100
-
-# Create list of dataframes for iterated cleaning
-# "data" contains estimates that are dollar amounts or rates, "data_num" contains estimates that are numbers
-data = [DonRates_2018, AvgTotDon_2018, FormsGiving_2018, TopCauseFocus_2018, PropTotDon_2018, PropTotDonAmt_2018]
-data_num = [AvgNumCauses_2018]
-
-
-# Add annotation, suppress estimates/CI bounds where necessary, round estimate values according to estimate type (as above)
-# Annotation text
-values = ["Use with caution", "Estimate suppressed", ""]
-
-i = 0
-while i < len(data):
-    # Different marker values
-    conditions = [data[i]["Marker"] == "*",
-                  data[i]["Marker"] == "...",
-                  pd.isnull(data[i]["Marker"])]
-    # Assign annotation text according to marker values
-    data[i]["Annotation"] = np.select(conditions, values)
-
-    # Suppress Estimate and CI Upper where necessary (for visualizations and error bars)
-    data[i]["Estimate"] = np.where(data[i]["Marker"]=="...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"]=="...", 0, data[i]["CI Upper"])
-
-    # Round rates and dollar amounts to zero decimal places
-    data[i]['Estimate'] = data[i]['Estimate'].round(0)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0)
-    i = i + 1
-
-i = 0
-while i < len(data_num):
-    # Different marker values
-    conditions = [data_num[i]["Marker"] == "*",
-                  data_num[i]["Marker"] == "...",
-                  pd.isnull(data_num[i]["Marker"])]
-    # Assign annotation text according to marker values
-    data_num[i]["Annotation"] = np.select(conditions, values)
-
-    # Suppress Estimate and CI Upper where necessary (for visualizations and error bars)
-    data_num[i]["Estimate"] = np.where(data_num[i]["Marker"]=="...", 0, data_num[i]["Estimate"])
-    data_num[i]["CI Upper"] = np.where(data_num[i]["Marker"]=="...", 0, data_num[i]["CI Upper"])
-
-    # Round number amounts to two decimal places
-    data_num[i]['Estimate'] = data_num[i]['Estimate'].round(2)
-    data_num[i]["CI Upper"] = data_num[i]["CI Upper"].round(2)
-    i = i + 1
+sources = {"AvgNumCauses": "https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgNumCauses.csv"}
+
+# Tables are read and cleaned the first time they are used, the way this page always has (see
+# Utils.data_utils.preprocess_plain_tables)
+registry = TableRegistry(names=["DonRate", "AvgTotDon", "FormsGiving", "TopCauseFocus", "PercTotDonors", "PercTotDonations"],
+                         sources=sources, preprocess=preprocess_plain_tables)
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
 # Extract info from data for selection menus
 region_names = np.array(['CA', 'CA (without QC)', 'AB', 'AT', 'BC', 'ON', 'PR', 'QC'], dtype=object)
 demo_names = np.array(['Gender', 'Marital status', 'Labour force status', 'Frequency of religious attendance', 'Immigration status'], dtype=object)
 
-fig1df1 = DonRates_2018[DonRates_2018['Group'] == "All"]
-fig1df1 = fig1df1[fig1df1.Province.notnull()]
-
-fig1df2 = AvgTotDon_2018[AvgTotDon_2018['Group'] == "All"]
-fig1df2 = fig1df2[fig1df2.Province.notnull()]
-
-
-fig1 = go.Figure()
-
-fig1.add_trace(go.Bar(x=fig1df1['Province'],
-                      y=fig1df1['Estimate'],
-                      error_y=dict(type="data", array=fig1df1["CI Upper"]-fig1df1["Estimate"]),
-                      hovertext=fig1df1['Annotation'],
-                      marker=dict(color="#7BAFD4"),
-                      text=fig1df1.Estimate.map(str)+"%",
-                      textposition='inside',
-                      insidetextanchor='start',
-                      name="Donor rate",
-                      yaxis='y2',
-                      offsetgroup=2
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df2['Province'],
-                      y=fig1df2['Estimate'],
-                      error_y=dict(type="data", array=fig1df2["CI Upper"]-fig1df2["Estimate"]), # need to vectorize subtraction
-                      hovertext =fig1df2['Annotation'],
-                      marker=dict(color="#c8102e"),
-                      text="$"+fig1df2.Estimate.map(str),
-                      textposition='inside',
-                      insidetextanchor='start',
-                      name="Average donation amount",
-                      offsetgroup=1
-                      ),
-               )
-
-y2 = go.layout.YAxis(overlaying='y', side='right')
-
-fig1.update_layout(title={'text': "Donation rate & average donation amount by province",
-                          'y': 0.99},
-                   margin=dict(l=20, r=20, t=100, b=20),
-                   plot_bgcolor='rgba(0, 0, 0, 0)',
-                   barmode="group",
-                   yaxis2=y2,
-                   legend={'orientation': 'h', 'yanchor': "bottom", 'xanchor': 'left'}
+def province_figure():
+    # Donation rate and average donation amount by province (built when the page is first served, see Utils.graph_utils.DeferredFigure)
+    fig1df1 = registry["DonRate"]
+    fig1df1 = fig1df1[fig1df1['Group'] == "All"]
+    fig1df1 = fig1df1[fig1df1.Province.notnull()]
+
+    fig1df2 = registry["AvgTotDon"]
+    fig1df2 = fig1df2[fig1df2['Group'] == "All"]
+    fig1df2 = fig1df2[fig1df2.Province.notnull()]
+
+
+    fig1 = go.Figure()
+
+    fig1.add_trace(go.Bar(x=fig1df1['Province'],
+                          y=fig1df1['Estimate'],
+                          error_y=dict(type="data", array=fig1df1["CI Upper"]-fig1df1["Estimate"]),
+                          hovertext=fig1df1['Annotation'],
+                          marker=dict(color="#7BAFD4"),
+                          text=fig1df1.Estimate.map(str)+"%",
+                          textposition='inside',
+                          insidetextanchor='start',
+                          name="Donor rate",
+                          yaxis='y2',
+                          offsetgroup=2
+                          ),
                    )
-fig1.update_traces(error_x_color="#757575")
 
-# Aesthetics for fig
-fig1.update_yaxes(showgrid=False, showticklabels=False)
+    fig1.add_trace(go.Bar(x=fig1df2['Province'],
+                          y=fig1df2['Estimate'],
+                          error_y=dict(type="data", array=fig1df2["CI Upper"]-fig1df2["Estimate"]), # need to vectorize subtraction
+                          hovertext =fig1df2['Annotation'],
+                          marker=dict(color="#c8102e"),
+                          text="$"+fig1df2.Estimate.map(str),
+                          textposition='inside',
+                          insidetextanchor='start',
+                          name="Average donation amount",
+                          offsetgroup=1
+                          ),
+                   )
+
+    y2 = go.layout.YAxis(overlaying='y', side='right')
+
+    fig1.update_layout(title={'text': "Donation rate & average donation amount by province",
+                              'y': 0.99},
+                       margin=dict(l=20, r=20, t=100, b=20),
+                       plot_bgcolor='rgba(0, 0, 0, 0)',
+                       barmode="group",
+                       yaxis2=y2,
+                       legend={'orientation': 'h', 'yanchor': "bottom", 'xanchor': 'left'}
+                       )
+    fig1.update_traces(error_x_color="#757575")
+
+    # Aesthetics for fig
+    fig1.update_yaxes(showgrid=False, showticklabels=False)
+
+    fig1.update_layout(height=400, margin={'l': 30, 'b': 30, 'r': 10, 't': 10})
+
+    return fig1
 
-fig1.update_layout(height=400, margin={'l': 30, 'b': 30, 'r': 10, 't': 10})
 
 ### General app layout/set up ###
 app.layout = html.Div([
@@ -165,7 +118,7 @@ app.layout = html.Div([
     html.Div([
         # Graph components!
         dcc.Graph(id='FormsGiving', style={'marginTop': 50}),
-        dcc.Graph(id='DonRateAvgDonAmt-prv', figure=fig1, style={'marginTop': 50}),
+        dcc.Graph(id='DonRateAvgDonAmt-prv', figure=DeferredFigure(province_figure, version=registry.versions), style={'marginTop': 50}),
         dcc.Graph(id='DonRateAvgDonAmt-Age', style={'marginTop': 50}),
         dcc.Graph(id='DonRateAvgDonAmt-Educ', style={'marginTop': 50}),
         dcc.Graph(id='DonRateAvgDonAmt-Inc', style={'marginTop': 50}),
@@ -452,8 +405,7 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = FormsGiving_2018[FormsGiving_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "All"]
+    dff1 = registry.slice("FormsGiving", region, "All")
 
     # Format title according to dropdown input
     title = '{}, {}'.format("Forms of giving", region)
@@ -480,14 +432,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("DonRate", region, "Age group")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("AvgTotDon", region, "Age group")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -513,14 +463,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("DonRate", region, "Education")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("AvgTotDon", region, "Education")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -546,14 +494,12 @@ def update_graph(region):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Personal income category"]
+    dff1 = registry.slice("DonRate", region, "Personal income category")
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Personal income category"]
+    dff2 = registry.slice("AvgTotDon", region, "Personal income category")
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -580,14 +526,12 @@ def update_graph(region, demo):
     """
     # Donation rate data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == demo]
+    dff1 = registry.slice("DonRate", region, demo)
     name1 = "Donation rate"
 
     # Average annual donation data, filtered for selected region and demographic group (age group)
     # Corresponding name assigned
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == demo]
+    dff2 = registry.slice("AvgTotDon", region, demo)
     name2 = "Average annual donations"
 
     # Format title according to dropdown input
@@ -617,14 +561,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("PercTotDonors", region, "Age group")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("PercTotDonations", region, "Age group")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -651,14 +593,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("PercTotDonors", region, "Education")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("PercTotDonations", region, "Education")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -685,14 +625,12 @@ def update_graph(region):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Personal income category"]
+    dff1 = registry.slice("PercTotDonors", region, "Personal income category")
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Personal income category"]
+    dff2 = registry.slice("PercTotDonations", region, "Personal income category")
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -720,14 +658,12 @@ def update_graph(region, demo):
 
     # Donation rate data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == demo]
+    dff1 = registry.slice("PercTotDonors", region, demo)
     name1 = "Proportion of donors"
 
     # Average annual donation data, filtered for selected region and demographic group (education)
     # Corresponding name assigned
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == demo]
+    dff2 = registry.slice("PercTotDonations", region, demo)
     name2 = "Percentage of donation value"
 
     # Format title according to dropdown input
@@ -752,14 +688,12 @@ def update_graph(region):
         :return: Plot.ly graph object, produced by don_rate_avg_don().
     """
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("AvgNumCauses", region, "Age group")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("TopCauseFocus", region, "Age group")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -784,14 +718,12 @@ def update_graph(region):
         :return: Plot.ly graph object, produced by don_rate_avg_don().
     """
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("AvgNumCauses", region, "Education")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("TopCauseFocus", region, "Education")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -818,14 +750,12 @@ def update_graph(region):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Personal income category"]
+    dff1 = registry.slice("AvgNumCauses", region, "Personal income category")
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Personal income category"]
+    dff2 = registry.slice("TopCauseFocus", region, "Personal income category")
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -853,14 +783,12 @@ def update_graph(region, demo):
 
     # Average number of annual donations data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == demo]
+    dff1 = registry.slice("AvgNumCauses", region, demo)
     name1 = "Average number of causes"
 
     # Average number of causes supported data, filtered for selected region and demographic group
     # Corresponding name assigned
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == demo]
+    dff2 = registry.slice("TopCauseFocus", region, demo)
     name2 = "Average concentration on first cause"
 
     # Format title according to dropdown input
@@ -869,6 +797,8 @@ def update_graph(region, demo):
     # Uses external function with dataframes, names, and title set up above
     return prim_cause_num_cause(dff2, dff1, name2, name1, title)
 
+setup_callbacks(app, "who_donates_how_much_VIZ2", registry, figure_cache, clientside=CLIENTSIDE_FIGURES)
+
 
 
 
@@ -1,15 +1,14 @@
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-import dash_table
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
-from plotly.subplots import make_subplots
 import dash_bootstrap_components as dbc
 
 from Utils.graphs.who_donates_how_much_graph_utils import *
+from Utils.data_utils import TableRegistry, preprocess_plain_tables
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredFigure, graph_objects
 
 ###################### App setup ######################
 
@@ -17,89 +16,27 @@ app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
 
 # Reading in data from public urls
-
-# DonRates_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-DonRate.csv")
-DonRates_2018 = pd.read_csv("../Tables/2018-DonRate.csv")
-# AvgTotDon_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgTotDon.csv")
-AvgTotDon_2018 = pd.read_csv("../Tables/2018-AvgTotDon.csv")
-AvgNumCauses_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgNumCauses.csv")
-FormsGiving_2018 = pd.read_csv("../Tables/2018-FormsGiving.csv")
-TopCauseFocus_2018 = pd.read_csv("../Tables/2018-TopCauseFocus.csv")
-PropTotDon_2018 = pd.read_csv("../Tables/2018-PercTotDonors.csv")
-PropTotDonAmt_2018 = pd.read_csv("../Tables/2018-PercTotDonations.csv")
-
-# Format donation rates as percentage
-DonRates_2018['Estimate'] = DonRates_2018['Estimate']*100
-DonRates_2018['CI Upper'] = DonRates_2018['CI Upper']*100
-FormsGiving_2018['Estimate'] = FormsGiving_2018['Estimate']*100
-FormsGiving_2018['CI Upper'] = FormsGiving_2018['CI Upper']*100
-TopCauseFocus_2018['Estimate'] = TopCauseFocus_2018['Estimate']*100
-TopCauseFocus_2018['CI Upper'] = TopCauseFocus_2018['CI Upper']*100
-PropTotDon_2018['Estimate'] = PropTotDon_2018['Estimate']*100
-PropTotDon_2018['CI Upper'] = PropTotDon_2018['CI Upper']*100
-PropTotDonAmt_2018['Estimate'] = PropTotDonAmt_2018['Estimate']*100
-PropTotDonAmt_2018['CI Upper'] = PropTotDonAmt_2018['CI Upper']*100
-
-# Create list of dataframes for iterated cleaning
-# "data" contains estimates that are dollar amounts or rates, "data_num" contains estimates that are numbers
-data = [DonRates_2018, AvgTotDon_2018, FormsGiving_2018, TopCauseFocus_2018, PropTotDon_2018, PropTotDonAmt_2018]
-data_num = [AvgNumCauses_2018]
-
-
-# Add annotation, suppress estimates/CI bounds where necessary, round estimate values according to estimate type (as above)
-# Annotation text
-values = ["Use with caution", "Estimate suppressed", ""]
-
-i = 0
-while i < len(data):
-    # Different marker values
-    conditions = [data[i]["Marker"] == "*",
-                  data[i]["Marker"] == "...",
-                  pd.isnull(data[i]["Marker"])]
-    # Assign annotation text according to marker values
-    data[i]["Annotation"] = np.select(conditions, values)
-
-    # Suppress Estimate and CI Upper where necessary (for visualizations and error bars)
-    data[i]["Estimate"] = np.where(data[i]["Marker"]=="...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"]=="...", 0, data[i]["CI Upper"])
-
-    # Round rates and dollar amounts to zero decimal places
-    data[i]['Estimate'] = data[i]['Estimate'].round(0)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0)
-    i = i + 1
-
-i = 0
-while i < len(data_num):
-    # Different marker values
-    conditions = [data_num[i]["Marker"] == "*",
-                  data_num[i]["Marker"] == "...",
-                  pd.isnull(data_num[i]["Marker"])]
-    # Assign annotation text according to marker values
-    data_num[i]["Annotation"] = np.select(conditions, values)
-
-    # Suppress Estimate and CI Upper where necessary (for visualizations and error bars)
-    data_num[i]["Estimate"] = np.where(data_num[i]["Marker"]=="...", 0, data_num[i]["Estimate"])
-    data_num[i]["CI Upper"] = np.where(data_num[i]["Marker"]=="...", 0, data_num[i]["CI Upper"])
-
-    # Round number amounts to two decimal places
-    data_num[i]['Estimate'] = data_num[i]['Estimate'].round(2)
-    data_num[i]["CI Upper"] = data_num[i]["CI Upper"].round(2)
-    i = i + 1
+sources = {"AvgNumCauses": "https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgNumCauses.csv"}
+
+# Tables are read and cleaned the first time they are used, the way this page always has (see
+# Utils.data_utils.preprocess_plain_tables)
+registry = TableRegistry(names=["DonRate", "AvgTotDon", "FormsGiving", "TopCauseFocus", "PercTotDonors", "PercTotDonations"],
+                         sources=sources, preprocess=preprocess_plain_tables)
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
+# Update every figure driven by region-selection in one request instead of one request per figure
+BATCH_REGION_CALLBACKS = True
 
 # Extract info from data for selection menus
 region_names = np.array(['CA', 'CA (without QC)', 'AB', 'AT', 'BC', 'ON', 'PR', 'QC'], dtype=object)
 
 
-fig1df1 = DonRates_2018[DonRates_2018['Group'] == "All"]
-fig1df1 = fig1df1[fig1df1.Province.notnull()]
-
-fig1df2 = AvgTotDon_2018[AvgTotDon_2018['Group'] == "All"]
-fig1df2 = fig1df2[fig1df2.Province.notnull()]
-
-fig2df = FormsGiving_2018[FormsGiving_2018['Group'] == "All"]
-fig2df = fig2df[fig2df['Region'] == "CA"]
-
-
 # ###################### Data processing ######################
 
 # SubSecAvgDon_2018, SubSecDonRates_2018, DonRates_2018, AvgTotDon_2018,SubSecAvgNumDon_2018, AvgNumCauses_2018, AvgTotNumDon_2018 = get_data()
@@ -200,7 +137,7 @@ app.layout = html.Div([
             html.Div(
                 [
                     html.H4('Donation rate & average donation amount by province'),
-                    dcc.Graph(id='DonRateAvgDonAmt-prv', figure=don_rate_avg_don_by_prov(DonRates_2018, AvgTotDon_2018), style={'marginTop': 50}),
+                    dcc.Graph(id='DonRateAvgDonAmt-prv', figure=DeferredFigure(lambda: don_rate_avg_don_by_prov(registry["DonRate"], registry["AvgTotDon"]), version=registry.versions), style={'marginTop': 50}),
                 ], className='col-md-10 col-lg-8 mx-auto'
             ),
             # Key personal & economic characteristics
@@ -428,8 +365,7 @@ app.layout = html.Div([
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = FormsGiving_2018[FormsGiving_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "All"]
+    dff1 = registry.slice("FormsGiving", region, "All")
 
     title = '{}, {}'.format("Forms of giving", region)
 
@@ -441,12 +377,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("DonRate", region, "Age group")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("AvgTotDon", region, "Age group")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by age group", region)
@@ -459,12 +393,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("DonRate", region, "Gender")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("AvgTotDon", region, "Gender")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by gender", region)
@@ -478,12 +410,10 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("PercTotDonors", region, "Gender")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("PercTotDonations", region, "Gender")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by gender", region)
@@ -497,12 +427,10 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("AvgNumCauses", region, "Gender")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("TopCauseFocus", region, "Gender")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by gender", region)
@@ -517,12 +445,10 @@ def update_graph(region):
 
 def update_graph(region):
 
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("PercTotDonors", region, "Age group")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("PercTotDonations", region, "Age group")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by age", region)
@@ -536,12 +462,10 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("AvgNumCauses", region, "Age group")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("TopCauseFocus", region, "Age group")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by age", region)
@@ -554,12 +478,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("DonRate", region, "Education")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("AvgTotDon", region, "Education")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by education", region)
@@ -572,12 +494,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("PercTotDonors", region, "Education")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("PercTotDonations", region, "Education")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by education", region)
@@ -590,12 +510,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value'),
     ])
 def update_graph(region):
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("AvgNumCauses", region, "Education")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("TopCauseFocus", region, "Education")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by education", region)
@@ -608,12 +526,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Personal income category"]
+    dff1 = registry.slice("DonRate", region, "Personal income category")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Personal income category"]
+    dff2 = registry.slice("AvgTotDon", region, "Personal income category")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by income", region)
@@ -626,12 +542,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Personal income category"]
+    dff1 = registry.slice("PercTotDonors", region, "Personal income category")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Personal income category"]
+    dff2 = registry.slice("PercTotDonations", region, "Personal income category")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by income", region)
@@ -645,12 +559,10 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Personal income category"]
+    dff1 = registry.slice("AvgNumCauses", region, "Personal income category")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Personal income category"]
+    dff2 = registry.slice("TopCauseFocus", region, "Personal income category")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by income", region)
@@ -663,12 +575,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("DonRate", region, "Frequency of religious attendance")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("AvgTotDon", region, "Frequency of religious attendance")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by religious attendance", region)
@@ -681,12 +591,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("PercTotDonors", region, "Frequency of religious attendance")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("PercTotDonations", region, "Frequency of religious attendance")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by religious attendance", region)
@@ -699,12 +607,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value'),
     ])
 def update_graph(region):
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("AvgNumCauses", region, "Frequency of religious attendance")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("TopCauseFocus", region, "Frequency of religious attendance")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by religious attendance", region)
@@ -717,12 +623,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("DonRate", region, "Marital status")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("AvgTotDon", region, "Marital status")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by marital status", region)
@@ -735,12 +639,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("DonRate", region, "Labour force status")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("AvgTotDon", region, "Labour force status")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by employment status", region)
@@ -753,12 +655,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = DonRates_2018[DonRates_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("DonRate", region, "Immigration status")
     name1 = "Donation rate"
 
-    dff2 = AvgTotDon_2018[AvgTotDon_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("AvgTotDon", region, "Immigration status")
     name2 = "Average annual donations"
 
     title = '{}, {}'.format("Donor rate and average annual donation by immigration status", region)
@@ -771,12 +671,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("PercTotDonors", region, "Marital status")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("PercTotDonations", region, "Marital status")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by marital status", region)
@@ -789,12 +687,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("PercTotDonors", region, "Labour force status")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("PercTotDonations", region, "Labour force status")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by employment", region)
@@ -807,12 +703,10 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff1 = PropTotDon_2018[PropTotDon_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("PercTotDonors", region, "Immigration status")
     name1 = "Proportion of donors"
 
-    dff2 = PropTotDonAmt_2018[PropTotDonAmt_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("PercTotDonations", region, "Immigration status")
     name2 = "Percentage of donation value"
 
     title = '{}, {}'.format("Percentage of donors & total donation value by immigration status", region)
@@ -826,12 +720,10 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("AvgNumCauses", region, "Marital status")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("TopCauseFocus", region, "Marital status")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by marital status", region)
@@ -845,12 +737,10 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("AvgNumCauses", region, "Labour force status")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("TopCauseFocus", region, "Labour force status")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by employment status", region)
@@ -863,18 +753,20 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value'),
     ])
 def update_graph(region):
-    dff1 = AvgNumCauses_2018[AvgNumCauses_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("AvgNumCauses", region, "Immigration status")
     name1 = "Average number of causes"
 
-    dff2 = TopCauseFocus_2018[TopCauseFocus_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("TopCauseFocus", region, "Immigration status")
     name2 = "Average concentration on first cause"
 
     title = '{}, {}'.format("Focus on primary cause & average number of causes supported by immigration status", region)
 
     return prim_cause_num_cause(dff2, dff1, name2, name1, title)
 
+setup_callbacks(app, "who_donates_how_much_app", registry, figure_cache,
+                batch_inputs=[dash.dependencies.Input('region-selection', 'value')] if BATCH_REGION_CALLBACKS else None,
+                clientside=CLIENTSIDE_FIGURES)
+
 
 if __name__ == "__main__":
     app.run_server(debug=True)
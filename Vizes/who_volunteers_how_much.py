@@ -2,55 +2,26 @@ import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-import textwrap
+from Utils.data_utils import TableRegistry
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredFigure, graph_objects
 
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-
-# VolRate_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-VolRate.csv")
-VolRate_2018 = pd.read_csv("../Tables/2018-VolRate.csv")
-# AvgTotHours_2018 = pd.read_csv("https://raw.githubusercontent.com/ajah/statscan_data_portal/master/Tables/2018-AvgTotHours.csv")
-AvgTotHours_2018 = pd.read_csv("../Tables/2018-AvgTotHours.csv")
-FormsVolunteering_2018 = pd.read_csv("../Tables/2018-FormsVolunteering.csv")
-PercTotVols_2018 = pd.read_csv("../Tables/2018-PercTotVolunteers.csv")
-PercTotHours_2018 = pd.read_csv("../Tables/2018-PercTotHours.csv")
-
-VolRate_2018['Estimate'] = VolRate_2018['Estimate']*100
-VolRate_2018['CI Upper'] = VolRate_2018['CI Upper']*100
-FormsVolunteering_2018['Estimate'] = FormsVolunteering_2018['Estimate']*100
-FormsVolunteering_2018['CI Upper'] = FormsVolunteering_2018['CI Upper']*100
-PercTotVols_2018['Estimate'] = PercTotVols_2018['Estimate']*100
-PercTotVols_2018['CI Upper'] = PercTotVols_2018['CI Upper']*100
-PercTotHours_2018['Estimate'] = PercTotHours_2018['Estimate']*100
-PercTotHours_2018['CI Upper'] = PercTotHours_2018['CI Upper']*100
-
-data = [VolRate_2018, AvgTotHours_2018, PercTotVols_2018, PercTotHours_2018, FormsVolunteering_2018]
-
-for i in range(len(data)):
-    data[i]["Estimate"] = np.where(data[i]["Marker"]=="...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"]=="...", 0, data[i]["CI Upper"])
-
-    data[i]["Region"] = np.select([data[i]["Province"] == "SK",
-                                   data[i]["Province"] == "MB",
-                                   data[i]["Province"] == "NB",
-                                   data[i]["Province"] == "NS",
-                                   data[i]["Province"] == "PE",
-                                   data[i]["Province"] == "NL"],
-                                  ["SK", "MB", "NB", "NS", "PE", "NL"], default=data[i]["Region"])
-
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unable to determine", "", data[i]["Group"])
-    data[i]["Group"] = np.where(data[i]["Attribute"]=="Unknown", "", data[i]["Group"])
-
-    data[i]["Attribute"] = data[i]["Attribute"].str.wrap(15)
-    data[i]["Attribute"] = data[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-
-    data[i]['Estimate'] = data[i]['Estimate'].round(0).astype(int)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0).astype(int)
-    data[i]['cv'] = data[i]['cv'].round(2)
+# Tables are read and cleaned (see Utils.data_utils.preprocess_tables) the first time they are used
+registry = TableRegistry(names=["VolRate", "AvgTotHours", "FormsVolunteering", "PercTotVolunteers", "PercTotHours"])
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
 region_values = np.array(['CA', 'BC', 'AB', 'PR', 'SK', 'MB', 'ON', 'QC', 'AT', 'NB', 'NS', 'PE', 'NL'], dtype=object)
 region_names = np.array(['Canada',
@@ -67,149 +38,137 @@ region_names = np.array(['Canada',
                          'Prince Edward Island',
                          'Newfoundland and Labrador'], dtype=str)
 
-fig1df1 = VolRate_2018[VolRate_2018['Group'] == "All"]
-fig1df1 = fig1df1[fig1df1.Province.notnull()]
-
-fig1df2 = AvgTotHours_2018[AvgTotHours_2018['Group'] == "All"]
-fig1df2 = fig1df2[fig1df2.Province.notnull()]
-
-fig1df1['Text'] = np.select([fig1df1["Marker"] == "*", fig1df1["Marker"] == "...", pd.isnull(fig1df1["Marker"])],
-                            [fig1df1.Estimate.map(str)+"%"+"*", "...", fig1df1.Estimate.map(str)+"%"])
-fig1df1['HoverText'] = np.select([fig1df1["Marker"] == "*",
-                                  fig1df1["Marker"] == "...",
-                                  pd.isnull(fig1df1["Marker"])],
-                                 ["Estimate: "+fig1df1.Estimate.map(str)+"% ± "+(fig1df1["CI Upper"] - fig1df1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: "+fig1df1.Estimate.map(str)+"% ± "+(fig1df1["CI Upper"] - fig1df1["Estimate"]).map(str)+"%"])
-
-fig1df2['Text'] = np.select([fig1df2["Marker"] == "*", fig1df2["Marker"] == "...", pd.isnull(fig1df2["Marker"])],
-                            ["$"+fig1df2.Estimate.map(str)+"*", "...", "$"+fig1df2.Estimate.map(str)])
-fig1df2['HoverText'] = np.select([fig1df2["Marker"] == "*",
-                                  fig1df2["Marker"] == "...",
-                                  pd.isnull(fig1df2["Marker"])],
-                                 ["Estimate: $"+fig1df2.Estimate.map(str)+" ± $"+(fig1df2["CI Upper"] - fig1df2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: $"+fig1df2.Estimate.map(str)+" ± $"+(fig1df2["CI Upper"] - fig1df2["Estimate"]).map(str)])
-
-fig1 = go.Figure()
-
-fig1.add_trace(go.Bar(x=fig1df2['Province'],
-                      y=fig1df2['CI Upper'],
-                      marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                      text=None,
-                      textposition='outside',
-                      showlegend=False,
-                      hoverinfo="skip",
-                      cliponaxis=False,
-                      offsetgroup=1,
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df1['Province'],
-                      y=fig1df1['CI Upper'],
-                      marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                      text=None,
-                      textposition='outside',
-                      hoverinfo="skip",
-                      showlegend=False,
-                      name="Volunteer rate",
-                      yaxis='y2',
-                      offsetgroup=2,
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df2['Province'],
-                      y=fig1df2['Estimate'],
-                      error_y=None, # need to vectorize subtraction
-                      hovertext =fig1df2['HoverText'],
-                      hovertemplate="%{hovertext}",
-                      hoverlabel=dict(font=dict(color="white")),
-                      hoverinfo="text",
-                      marker=dict(color="#7BAFD4"),
-                      text=fig1df2['Text'],
-                      textposition='outside',
-                      cliponaxis=False,
-                      name="Average hours",
-                      offsetgroup=1
-                      ),
-               )
-
-fig1.add_trace(go.Bar(x=fig1df1['Province'],
-                      y=fig1df1['Estimate'],
-                      error_y=None,
-                      hovertext=fig1df1['HoverText'],
-                      hovertemplate="%{hovertext}",
-                      hoverlabel=dict(font=dict(color="white")),
-                      hoverinfo="text",
-                      marker=dict(color="#c8102e"),
-                      text=fig1df1['Text'],
-                      textposition='outside',
-                      cliponaxis=False,
-                      name="Volunteer rate",
-                      yaxis='y2',
-                      offsetgroup=2
-                      ),
-               )
-
-y1 = go.layout.YAxis(overlaying='y', side='left', range = [0, 1.25*max(fig1df2["CI Upper"])])
-y2 = go.layout.YAxis(overlaying='y', side='right', range = [0, 1.25*max(fig1df1["CI Upper"])])
-
-fig1.update_layout(title={'text': "Volunteer rate & average hours volunteered by province",
-                          'y': 0.99},
-                   margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                   plot_bgcolor='rgba(0, 0, 0, 0)',
-                   barmode="group",
-                   yaxis1=y1,
-                   yaxis2=y2,
-                   legend={'orientation': 'h', 'yanchor': "bottom", 'xanchor': 'center', 'x': 0.5, 'y': -0.15, 'traceorder': 'reversed'},
-                   height=400,
-                   updatemenus=[
-                       dict(
-                           type = "buttons",
-                           xanchor='right',
-                           x = 1.4,
-                           y = 0.5,
-                           buttons=list([
-                               dict(
-                                   args=[{"error_y": [None, None, None, None],
-                                          "text": [None, None, fig1df2['Text'], fig1df1['Text']],
-                                          }],
-                                   label="Reset",
-                                   method="restyle"
-                               ),
-                               dict(
-                                   args=[{"error_y": [None, None, dict(type="data", array=fig1df2["CI Upper"]-fig1df2["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=fig1df1["CI Upper"]-fig1df1["Estimate"], color="#424242", thickness=1.5)],
-                                          "text": [fig1df2['Text'], fig1df1['Text'], None, None],
-                                          }],
-                                   label="Confidence Intervals",
-                                   method="restyle"
-                               )
-                           ]),
-                       ),
-                   ])
-
-# Aesthetics for fig
-fig1.update_xaxes(autorange="reversed", tickfont=dict(size=12))
-fig1.update_yaxes(showgrid=False,
-                  showticklabels=False,
-                  autorange = False)
-
-markers = pd.concat([fig1df1["Marker"], fig1df2["Marker"]])
-if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-    fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                       annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
-                                    dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-elif markers.isin(["*"]).any():
-    fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                       annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
-                                    dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-elif markers.isin(["..."]).any():
-    fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                       annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
-                                    dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-else:
-    fig1.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                       annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.21, x=1.4, align="left", showarrow=False)])
+def province_figure():
+    # Volunteer rate and average hours volunteered by province (built when the page is first served, see Utils.graph_utils.DeferredFigure)
+    fig1df1 = registry["VolRate"]
+    fig1df1 = fig1df1[fig1df1['Group'] == "All"]
+    fig1df1 = fig1df1[fig1df1.Province.notnull()]
+
+    fig1df2 = registry["AvgTotHours"]
+    fig1df2 = fig1df2[fig1df2['Group'] == "All"]
+    fig1df2 = fig1df2[fig1df2.Province.notnull()]
+
+    fig1 = go.Figure()
+
+    fig1.add_trace(go.Bar(x=fig1df2['Province'],
+                          y=fig1df2['CI Upper'],
+                          marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                          text=None,
+                          textposition='outside',
+                          showlegend=False,
+                          hoverinfo="skip",
+                          cliponaxis=False,
+                          offsetgroup=1,
+                          ),
+                   )
+
+    fig1.add_trace(go.Bar(x=fig1df1['Province'],
+                          y=fig1df1['CI Upper'],
+                          marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
+                          text=None,
+                          textposition='outside',
+                          hoverinfo="skip",
+                          showlegend=False,
+                          name="Volunteer rate",
+                          yaxis='y2',
+                          offsetgroup=2,
+                          ),
+                   )
+
+    fig1.add_trace(go.Bar(x=fig1df2['Province'],
+                          y=fig1df2['Estimate'],
+                          error_y=None, # need to vectorize subtraction
+                          hovertext =fig1df2['HoverText'],
+                          hovertemplate="%{hovertext}",
+                          hoverlabel=dict(font=dict(color="white")),
+                          hoverinfo="text",
+                          marker=dict(color="#7BAFD4"),
+                          text=fig1df2['Text'],
+                          textposition='outside',
+                          cliponaxis=False,
+                          name="Average hours",
+                          offsetgroup=1
+                          ),
+                   )
+
+    fig1.add_trace(go.Bar(x=fig1df1['Province'],
+                          y=fig1df1['Estimate'],
+                          error_y=None,
+                          hovertext=fig1df1['HoverText'],
+                          hovertemplate="%{hovertext}",
+                          hoverlabel=dict(font=dict(color="white")),
+                          hoverinfo="text",
+                          marker=dict(color="#c8102e"),
+                          text=fig1df1['Text'],
+                          textposition='outside',
+                          cliponaxis=False,
+                          name="Volunteer rate",
+                          yaxis='y2',
+                          offsetgroup=2
+                          ),
+                   )
+
+    y1 = go.layout.YAxis(overlaying='y', side='left', range = [0, 1.25*max(fig1df2["CI Upper"])])
+    y2 = go.layout.YAxis(overlaying='y', side='right', range = [0, 1.25*max(fig1df1["CI Upper"])])
+
+    fig1.update_layout(title={'text': "Volunteer rate & average hours volunteered by province",
+                              'y': 0.99},
+                       margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
+                       plot_bgcolor='rgba(0, 0, 0, 0)',
+                       barmode="group",
+                       yaxis1=y1,
+                       yaxis2=y2,
+                       legend={'orientation': 'h', 'yanchor': "bottom", 'xanchor': 'center', 'x': 0.5, 'y': -0.15, 'traceorder': 'reversed'},
+                       height=400,
+                       updatemenus=[
+                           dict(
+                               type = "buttons",
+                               xanchor='right',
+                               x = 1.4,
+                               y = 0.5,
+                               buttons=list([
+                                   dict(
+                                       args=[{"error_y": [None, None, None, None],
+                                              "text": [None, None, fig1df2['Text'], fig1df1['Text']],
+                                              }],
+                                       label="Reset",
+                                       method="restyle"
+                                   ),
+                                   dict(
+                                       args=[{"error_y": [None, None, dict(type="data", array=fig1df2["CI Upper"]-fig1df2["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=fig1df1["CI Upper"]-fig1df1["Estimate"], color="#424242", thickness=1.5)],
+                                              "text": [fig1df2['Text'], fig1df1['Text'], None, None],
+                                              }],
+                                       label="Confidence Intervals",
+                                       method="restyle"
+                                   )
+                               ]),
+                           ),
+                       ])
+
+    # Aesthetics for fig
+    fig1.update_xaxes(autorange="reversed", tickfont=dict(size=12))
+    fig1.update_yaxes(showgrid=False,
+                      showticklabels=False,
+                      autorange = False)
+
+    markers = pd.concat([fig1df1["Marker"], fig1df2["Marker"]])
+    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
+        fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                           annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
+                                        dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["*"]).any():
+        fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                           annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
+                                        dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    elif markers.isin(["..."]).any():
+        fig1.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
+                           annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.19, x=1.4, align="left", showarrow=False),
+                                        dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.11, x=1.2, align="right", showarrow=False, font=dict(size=13))])
+    else:
+        fig1.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
+                           annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.21, x=1.4, align="left", showarrow=False)])
+
+    return fig1
 
 
 app.layout = html.Div([
@@ -236,7 +195,7 @@ app.layout = html.Div([
     ]),
     html.Div([
         dcc.Graph(id='FormsVolunteering', style={'marginTop': 50}),
-        dcc.Graph(id='VolRateAvgHours-prv', figure=fig1, style={'marginTop': 50}),
+        dcc.Graph(id='VolRateAvgHours-prv', figure=DeferredFigure(province_figure, version=registry.versions), style={'marginTop': 50}),
         dcc.Graph(id='VolRateAvgHours-Gndr', style={'marginTop': 50}),
         dcc.Graph(id='PercVolHours-Gndr', style={'marginTop': 50}),
         dcc.Graph(id='VolRateAvgHours-Age', style={'marginTop': 50}),
@@ -260,15 +219,6 @@ app.layout = html.Div([
 ])
 
 def forms_of_giving(dff, title):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            [dff.Estimate.map(str)+"%"+"*", "...", dff.Estimate.map(str)+"%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%"])
-
     fig = go.Figure()
 
     fig.add_trace(go.Bar(y=dff['CI Upper'],
@@ -354,22 +304,6 @@ def forms_of_giving(dff, title):
 
 def don_rate_avg_don(dff1, dff2, name1, name2, title):
 
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                             [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                   dff1["Marker"] == "...",
-                                   pd.isnull(dff1["Marker"])],
-                                  ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             ["$"+dff2.Estimate.map(str)+"*", "...", "$"+dff2.Estimate.map(str)])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: $"+dff2.Estimate.map(str)+" ± $"+(dff2["CI Upper"] - dff2["Estimate"]).map(str)])
     dff1 = dff1[(dff1.Attribute != "Unknown") & (dff1.Attribute != "Unable to determine")]
     dff2 = dff2[(dff2.Attribute != "Unknown") & (dff2.Attribute != "Unable to determine")]
 
@@ -511,22 +445,6 @@ def don_rate_avg_don(dff1, dff2, name1, name2, title):
     return fig
 
 def perc_don_perc_amt(dff1, dff2, name1, name2, title):
-    dff1['Text'] = np.select([dff1["Marker"] == "*", dff1["Marker"] == "...", pd.isnull(dff1["Marker"])],
-                             [dff1.Estimate.map(str)+"%"+"*", "...", dff1.Estimate.map(str)+"%"])
-    dff1['HoverText'] = np.select([dff1["Marker"] == "*",
-                                   dff1["Marker"] == "...",
-                                   pd.isnull(dff1["Marker"])],
-                                  ["Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff1.Estimate.map(str)+"% ± "+(dff1["CI Upper"] - dff1["Estimate"]).map(str)+"%"])
-    dff2['Text'] = np.select([dff2["Marker"] == "*", dff2["Marker"] == "...", pd.isnull(dff2["Marker"])],
-                             [dff2.Estimate.map(str)+"%"+"*", "...", dff2.Estimate.map(str)+"%"])
-    dff2['HoverText'] = np.select([dff2["Marker"] == "*",
-                                   dff2["Marker"] == "...",
-                                   pd.isnull(dff2["Marker"])],
-                                  ["Estimate: "+dff2.Estimate.map(str)+"% ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
-                                   "Estimate Suppressed",
-                                   "Estimate: "+dff2.Estimate.map(str)+"% ± "+(dff2["CI Upper"] - dff2["Estimate"]).map(str)+"%"])
     dff1 = dff1[(dff1.Attribute != "Not in labour force")]
     # & (dff1.Attribute != "Unknown")]
     dff2 = dff2[(dff2.Attribute != "Not in labour force")]
@@ -666,8 +584,7 @@ def perc_don_perc_amt(dff1, dff2, name1, name2, title):
     ])
 def update_graph(region):
 
-    dff1 = FormsVolunteering_2018[FormsVolunteering_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "All"]
+    dff1 = registry.slice("FormsVolunteering", region, "All")
 
     title = '{}, {}'.format("Forms of giving", region)
 
@@ -682,13 +599,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("VolRate", region, "Age group")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("AvgTotHours", region, "Age group")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by age group", region)
@@ -703,13 +618,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("VolRate", region, "Gender")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("AvgTotHours", region, "Gender")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by gender", region)
@@ -724,13 +637,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("VolRate", region, "Marital status")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("AvgTotHours", region, "Marital status")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by marital status", region)
@@ -745,13 +656,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("VolRate", region, "Education")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("AvgTotHours", region, "Education")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by education", region)
@@ -767,13 +676,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("VolRate", region, "Labour force status")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("AvgTotHours", region, "Labour force status")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by employment status", region)
@@ -788,13 +695,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("VolRate", region, "Frequency of religious attendance")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("AvgTotHours", region, "Frequency of religious attendance")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by religious attendance", region)
@@ -809,13 +714,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Family income category"]
+    dff1 = registry.slice("VolRate", region, "Family income category")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Family income category"]
+    dff2 = registry.slice("AvgTotHours", region, "Family income category")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by income", region)
@@ -830,13 +733,11 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = VolRate_2018[VolRate_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("VolRate", region, "Immigration status")
     name1 = "Volunteer rate"
 
 
-    dff2 = AvgTotHours_2018[AvgTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("AvgTotHours", region, "Immigration status")
     name2 = "Average hours"
 
     title = '{}, {}'.format("Volunteer rate & average hours volunteered by immigration status", region)
@@ -856,13 +757,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Age group"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Age group")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Age group"]
+    dff2 = registry.slice("PercTotHours", region, "Age group")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by age", region)
@@ -879,13 +778,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Gender"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Gender")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Gender"]
+    dff2 = registry.slice("PercTotHours", region, "Gender")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by gender", region)
@@ -902,13 +799,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Marital status"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Marital status")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Marital status"]
+    dff2 = registry.slice("PercTotHours", region, "Marital status")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by marital status", region)
@@ -925,13 +820,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Education"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Education")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Education"]
+    dff2 = registry.slice("PercTotHours", region, "Education")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by education", region)
@@ -948,13 +841,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Labour force status"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Labour force status")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Labour force status"]
+    dff2 = registry.slice("PercTotHours", region, "Labour force status")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by employment", region)
@@ -971,13 +862,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Frequency of religious attendance"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Frequency of religious attendance")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Frequency of religious attendance"]
+    dff2 = registry.slice("PercTotHours", region, "Frequency of religious attendance")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by religious attendance", region)
@@ -994,13 +883,11 @@ def update_graph(region):
 
 
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Family income category"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Family income category")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Family income category"]
+    dff2 = registry.slice("PercTotHours", region, "Family income category")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by income", region)
@@ -1015,18 +902,18 @@ def update_graph(region):
     ])
 def update_graph(region):
 
-    dff1 = PercTotVols_2018[PercTotVols_2018['Region'] == region]
-    dff1 = dff1[dff1['Group'] == "Immigration status"]
+    dff1 = registry.slice("PercTotVolunteers", region, "Immigration status")
     name1 = "% volunteers"
 
 
-    dff2 = PercTotHours_2018[PercTotHours_2018['Region'] == region]
-    dff2 = dff2[dff2['Group'] == "Immigration status"]
+    dff2 = registry.slice("PercTotHours", region, "Immigration status")
     name2 = "% volunteer hours"
 
     title = '{}, {}'.format("Percentage of Canadians & total hours volunteered by immigration status", region)
 
     return perc_don_perc_amt(dff1, dff2, name1, name2, title)
 
+setup_callbacks(app, "who_volunteers_how_much", registry, figure_cache, clientside=CLIENTSIDE_FIGURES)
+
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -1,49 +1,38 @@
-import math
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
 import pandas as pd
-import plotly.graph_objects as go
 import numpy as np
-import textwrap
+from Utils.data_utils import TableRegistry
+from Utils.cache_utils import FigureCache
+from Utils.callback_utils import setup_callbacks
+from Utils.graph_utils import DeferredValue, graph_objects
+from Utils.graphs.percentage_graph_utils import single_vertical_percentage_graph, vertical_percentage_graph
 
 external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
-Reasons_2018 = pd.read_csv("../Tables/2018-ReasonsForGiving.csv")
-AvgAmtReasons_2018 = pd.read_csv("../Tables/2018-AvgAmtMotivations.csv")
-MotivationsByCause_2018 = pd.read_csv("../Tables/2018-MotivationsByCause.csv")
+# Tables are read and cleaned (see Utils.data_utils.preprocess_tables) the first time they are used
+registry = TableRegistry(names=["ReasonsForGiving", "AvgAmtMotivations", "MotivationsByCause"])
+# Figures are cached per (graph, dropdown values) until the data changes
+figure_cache = FigureCache()
+# Send the figures of every dropdown combination with the page and switch between them in the browser
+# (start-up renders them all; build a bundle with python -m Utils.prerender first)
+CLIENTSIDE_FIGURES = False
+# Build figures as plain dicts instead of validated plotly objects (see Utils.graph_utils.RawFigure)
+RAW_FIGURES = True
+go = graph_objects(raw=RAW_FIGURES)
 
-Reasons_2018['Estimate'] = Reasons_2018['Estimate'] * 100
-Reasons_2018['CI Upper'] = Reasons_2018['CI Upper'] * 100
-MotivationsByCause_2018['Estimate'] = MotivationsByCause_2018['Estimate'] * 100
-MotivationsByCause_2018['CI Upper'] = MotivationsByCause_2018['CI Upper'] * 100
+# Dropdown options read from the tables when the page is first served, see Utils.graph_utils.DeferredValue
+def cause_names():
+    return registry["MotivationsByCause"]["Group"].unique()
 
-data = [Reasons_2018, AvgAmtReasons_2018, MotivationsByCause_2018]
 
-cause_names = MotivationsByCause_2018["Group"].unique()
-motivations_names = Reasons_2018["QuestionText"].unique()
+def motivations_names():
+    # Dropdown labels without the line breaks added by preprocess_tables()
+    return registry["ReasonsForGiving"]["QuestionText"].str.replace("<br>", " ", regex=False).unique()
 
-for i in range(len(data)):
-    data[i]["Estimate"] = np.where(data[i]["Marker"] == "...", 0, data[i]["Estimate"])
-    data[i]["CI Upper"] = np.where(data[i]["Marker"] == "...", 0, data[i]["CI Upper"])
-
-    data[i]["Group"] = np.where(data[i]["Attribute"] == "Unable to determine", "", data[i]["Group"])
-    data[i]["Group"] = np.where(data[i]["Attribute"] == "Unknown", "", data[i]["Group"])
-
-    data[i]["Attribute"] = data[i]["Attribute"].str.wrap(15)
-    data[i]["Attribute"] = data[i]["Attribute"].replace({'\n': '<br>'}, regex=True)
-    data[i]["Attribute"] = np.where(data[i]["Attribute"] == "Do not support<br>cause", "Do not support cause", data[i]["Attribute"])
-    data[i]["Attribute"] = np.where(data[i]["Attribute"] == "Do not report<br>motivation", "Do not report motivation", data[i]["Attribute"])
-    data[i]["Attribute"] = np.where(data[i]["Attribute"] == "Report<br>motivation", "Report motivation", data[i]["Attribute"])
-
-    data[i]["QuestionText"] = data[i]["QuestionText"].str.wrap(20)
-    data[i]["QuestionText"] = data[i]["QuestionText"].replace({'\n': '<br>'}, regex=True)
-
-    data[i]['Estimate'] = data[i]['Estimate'].round(0).astype(int)
-    data[i]["CI Upper"] = data[i]["CI Upper"].round(0).astype(int)
-    data[i]['cv'] = data[i]['cv'].round(2)
 
 region_values = np.array(['CA', 'BC', 'AB', 'PR', 'ON', 'QC', 'AT'], dtype=object)
 region_names = np.array(['Canada',
@@ -75,7 +64,7 @@ app.layout = html.Div([
             html.Div(["Select a motivation of focus:",
                       dcc.Dropdown(
                           id='motivation_selection',
-                          options=[{'label': motivations_names[i], 'value': motivations_names[i]} for i in range(len(motivations_names)) if isinstance(motivations_names[i], str)],
+                          options=DeferredValue(lambda: [{'label': i, 'value': i} for i in motivations_names() if isinstance(i, str)], version=registry.versions),
                           value='Personally affected by cause',
                           style={'verticalAlgin': 'middle'}
                       ),
@@ -94,7 +83,7 @@ app.layout = html.Div([
             html.Div(["Select a cause of focus:",
                       dcc.Dropdown(
                           id='cause-selection',
-                          options=[{'label': cause_names[i], 'value': cause_names[i]} for i in range(len(cause_names))],
+                          options=DeferredValue(lambda: [{'label': i, 'value': i} for i in cause_names()], version=registry.versions),
                           value='Arts & culture',
                           style={'verticalAlgin': 'middle'}
                       ),
@@ -107,122 +96,7 @@ app.layout = html.Div([
 ])
 
 
-def single_vertical_percentage_graph(dff, title, by="Attribute", sort=False):
-
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            [dff.Estimate.map(str) + "%" + "*", "...", dff.Estimate.map(str) + "%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%"])
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(x=dff['CI Upper'],
-                         y=dff[by],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         name="",
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff['Estimate'],
-                         y=dff[by],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#c8102e"),
-                         text=dff['Text'],
-                         name="",
-                         textposition='outside',
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.update_layout(title={'text': title,
-                             'y': 0.99},
-                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                      height=600,
-                      plot_bgcolor='rgba(0, 0, 0, 0)',
-                      showlegend=False,
-                      updatemenus=[
-                          dict(
-                              type="buttons",
-                              xanchor='right',
-                              x=1.2,
-                              y=0.5,
-                              buttons=list([
-                                  dict(
-                                      args=[{"error_x": [None, None],
-                                             "text": [None, dff['Text']]}],
-                                      label="Reset",
-                                      method="restyle"
-                                  ),
-                                  dict(
-                                      args=[{"error_x": [None, dict(type="data", array=dff["CI Upper"] - dff["Estimate"], color="#424242", thickness=1.5)],
-                                             "text": [dff['Text'], None]}],
-                                      label="Confidence Intervals",
-                                      method="restyle"
-                                  )
-                              ]),
-                          ),
-                      ]
-                      )
-
-    fig.update_xaxes(showgrid=False,
-                     showticklabels=False,
-                     autorange=False,
-                     range=[0, 1.25 * max(dff["CI Upper"])])
-    fig.update_yaxes(autorange="reversed",
-                     ticklabelposition="outside top",
-                     tickfont=dict(size=9))
-
-    if sort:
-        fig.update_yaxes(categoryorder="total descending")
-
-    markers = dff["Marker"]
-    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 40, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["*"]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    else:
-        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.32, x=1.2, align="left", showarrow=False)])
-
-    return fig
-
-
 def vertical_dollar_graph(dff, name1, name2, title):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            ["$" + dff.Estimate.map(str) + "*", "...", "$" + dff.Estimate.map(str)])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: $" + dff.Estimate.map(str) + " ± $" + (dff["CI Upper"] - dff["Estimate"]).map(str) + "<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: $" + dff.Estimate.map(str) + " ± $" + (dff["CI Upper"] - dff["Estimate"]).map(str)])
-
     dff1 = dff[dff['Attribute'] == name1]
 
     dff2 = dff[dff['Attribute'] == name2]
@@ -353,154 +227,13 @@ def vertical_dollar_graph(dff, name1, name2, title):
     return fig
 
 
-def vertical_percentage_graph(dff, title, name1, name2):
-    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
-                            [dff.Estimate.map(str) + "%" + "*", "...", dff.Estimate.map(str) + "%"])
-    dff['HoverText'] = np.select([dff["Marker"] == "*",
-                                  dff["Marker"] == "...",
-                                  pd.isnull(dff["Marker"])],
-                                 ["Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%<br><b>Use with caution</b>",
-                                  "Estimate Suppressed",
-                                  "Estimate: " + dff.Estimate.map(str) + "% ± " + (dff["CI Upper"] - dff["Estimate"]).map(str) + "%"])
-
-    dff1 = dff[dff['Attribute'] == name1]
-
-    dff2 = dff[dff['Attribute'] == name2]
-
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(x=dff1['CI Upper'],
-                         y=dff1['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=2
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff2['CI Upper'],
-                         y=dff2['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         marker=dict(color="#FFFFFF", line=dict(color="#FFFFFF")),
-                         showlegend=False,
-                         hoverinfo="skip",
-                         text=None,
-                         textposition="outside",
-                         cliponaxis=False,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff1['Estimate'],
-                         y=dff1['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff1['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#c8102e"),
-                         text=dff1['Text'],
-                         textposition='outside',
-                         cliponaxis=False,
-                         name=name1,
-                         offsetgroup=2
-                         ),
-                  )
-
-    fig.add_trace(go.Bar(x=dff2['Estimate'],
-                         y=dff2['QuestionText'],
-                         orientation="h",
-                         error_x=None,
-                         hovertext=dff2['HoverText'],
-                         hovertemplate="%{hovertext}",
-                         hoverlabel=dict(font=dict(color="white")),
-                         hoverinfo="text",
-                         marker=dict(color="#7BAFD4"),
-                         text=dff2['Text'],
-                         textposition='outside',
-                         cliponaxis=False,
-                         name=name2,
-                         offsetgroup=1
-                         ),
-                  )
-
-    fig.update_layout(title={'text': title,
-                             'y': 0.99},
-                      margin={'l': 30, 'b': 30, 'r': 10, 't': 10},
-                      height=600,
-                      plot_bgcolor='rgba(0, 0, 0, 0)',
-                      bargroupgap=0.05,
-                      barmode="group",
-                      legend={'orientation': 'h', 'yanchor': "bottom"},
-                      updatemenus=[
-                          dict(
-                              type="buttons",
-                              xanchor='right',
-                              x=1.2,
-                              y=0.5,
-                              buttons=list([
-                                  dict(
-                                      args=[{"error_x": [None, None, None, None],
-                                             "text": [None, None, dff1['Text'], dff2['Text']]}],
-                                      label="Reset",
-                                      method="restyle"
-                                  ),
-                                  dict(
-                                      args=[{"error_x": [None, None, dict(type="data", array=dff1["CI Upper"] - dff1["Estimate"], color="#424242", thickness=1.5), dict(type="data", array=dff2["CI Upper"] - dff2["Estimate"], color="#424242", thickness=1.5)],
-                                             "text": [dff1['Text'], dff2['Text'], None, None]}],
-                                      label="Confidence Intervals",
-                                      method="restyle"
-                                  )
-                              ]),
-                          ),
-                      ]
-                      )
-
-    fig.update_xaxes(showgrid=False,
-                     showticklabels=False,
-                     autorange=False,
-                     range=[0, 1.25 * max(np.concatenate([dff1["CI Upper"], dff2["CI Upper"]]))])
-    fig.update_yaxes(autorange="reversed",
-                     ticklabelposition="outside top",
-                     tickfont=dict(size=9),
-                     categoryorder='array',
-                     categoryarray=dff1.sort_values(by="Estimate", ascending=False)["QuestionText"])
-
-    markers = pd.concat([dff1["Marker"], dff2["Marker"]])
-    if markers.isin(["*"]).any() and markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution<br>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["*"]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="*<i>Use with caution</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    elif markers.isin(["..."]).any():
-        fig.update_layout(margin={'l': 30, 'b': 75, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False),
-                                       dict(text="<i>Some results too unreliable to be shown</i>", xref="paper", yref="paper", xanchor='right', yanchor="top", y=-0.08, x=1.2, align="right", showarrow=False, font=dict(size=13))])
-    else:
-        fig.update_layout(margin={'l': 30, 'b': 30, 'r': 10, 't': 40},
-                          annotations=[dict(text="<a href=\"https://www.scribbr.com/statistics/confidence-interval/\">What is this?</a>", xref="paper", yref="paper", xanchor='right', y=0.31, x=1.2, align="left", showarrow=False)])
-
-    return fig
-
-
 @app.callback(
     dash.dependencies.Output('MotivationsOverall', 'figure'),
     [
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff = dff[dff["Group"] == "All"]
+    dff = registry.slice("ReasonsForGiving", region, "All")
     title = '{}, {}'.format("Motivations reported by donors", region)
     return single_vertical_percentage_graph(dff, title, by="QuestionText", sort=True)
 
@@ -511,7 +244,7 @@ def update_graph(region):
         dash.dependencies.Input('region-selection', 'value')
     ])
 def update_graph(region):
-    dff = AvgAmtReasons_2018[AvgAmtReasons_2018['Region'] == region]
+    dff = registry.slice("AvgAmtMotivations", region)
     name1 = "Report motivation"
     name2 = "Do not report motivation"
     title = '{}, {}'.format("Average amounts contributed by donors reporting and not reporting specific motivations", region)
@@ -526,10 +259,7 @@ def update_graph(region):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Gender"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Gender", question=motivation)
     title = '{}, {}'.format("Donor motivations by gender", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -541,10 +271,7 @@ def update_graph(region, motivation):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Age group"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Age group", question=motivation)
     title = '{}, {}'.format("Donor motivations by age", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -557,10 +284,7 @@ def update_graph(region, motivation):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Education"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Education", question=motivation)
     title = '{}, {}'.format("Donor motivations by formal education", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -573,10 +297,7 @@ def update_graph(region, motivation):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Family income category"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Family income category", question=motivation)
     title = '{}, {}'.format("Donor motivations by household income", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -588,10 +309,7 @@ def update_graph(region, motivation):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Frequency of religious attendance"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Frequency of religious attendance", question=motivation)
     title = '{}, {}'.format("Donor motivations by religious attendance", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -604,10 +322,7 @@ def update_graph(region, motivation):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Marital status"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Marital status", question=motivation)
     title = '{}, {}'.format("Donor motivations by marital status", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -619,10 +334,7 @@ def update_graph(region, motivation):
 
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Labour force status"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Labour force status", question=motivation)
     title = '{}, {}'.format("Donor motivations by labour force status", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -634,10 +346,7 @@ def update_graph(region, motivation):
         dash.dependencies.Input('motivation_selection', 'value')
     ])
 def update_graph(region, motivation):
-    dff = Reasons_2018[Reasons_2018['Region'] == region]
-    dff["QuestionText"] = dff["QuestionText"].replace({'<br>': ' '}, regex=True)
-    dff = dff[dff["Group"] == "Immigration status"]
-    dff = dff[dff["QuestionText"] == motivation]
+    dff = registry.slice("ReasonsForGiving", region, "Immigration status", question=motivation)
     title = '{}, {}'.format("Donor motivations by immigration status", region)
     return single_vertical_percentage_graph(dff, title)
 
@@ -649,13 +358,14 @@ def update_graph(region, motivation):
         dash.dependencies.Input('cause-selection', 'value')
     ])
 def update_graph(region, cause):
-    dff = MotivationsByCause_2018[MotivationsByCause_2018['Region'] == region]
-    dff = dff[dff["Group"] == cause]
+    dff = registry.slice("MotivationsByCause", region, cause)
     name1 = "Support cause"
     name2 = "Do not support cause"
     title = '{}, {}'.format("Percentages of cause supporters and non-supporters reporting each motivation, by cause", region)
     return vertical_percentage_graph(dff, title, name1, name2)
 
+setup_callbacks(app, "why_do_canadians_give", registry, figure_cache, clientside=CLIENTSIDE_FIGURES)
+
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,90 @@
+# Data portal: every viz in Vizes/ as a page of one Dash app
+#
+# The vizzes resolve their tables through the process-wide loader in Utils.data_utils, so tables used by several
+# pages (ie. DonRate, AvgTotDon) are read and preprocessed once.
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import dash_bootstrap_components as dbc
+
+from Utils.cache_utils import send_compressed
+from Utils.data_utils import watch_tables
+from Utils.metrics_utils import instrument_callbacks
+from Utils.prerender import warm_up
+from Utils.profile_utils import profile_callbacks
+from Vizes import (how_canadians_donate, understanding_top_donors, understanding_top_volunteers,
+                   what_keeps_canadians_from_giving_more, who_donates_how_much_app, who_volunteers_how_much,
+                   why_do_canadians_give)
+
+# (path, title, viz module). who_donates_how_much_VIZ1/VIZ2 are earlier drafts of the who_donates_how_much_app page
+# and share its component ids, so they aren't mounted.
+PAGES = [("/", "Who donates and how much", who_donates_how_much_app),
+         ("/how-canadians-donate", "How Canadians donate", how_canadians_donate),
+         ("/why-canadians-give", "Why Canadians give", why_do_canadians_give),
+         ("/what-keeps-canadians-from-giving-more", "What keeps Canadians from giving more",
+          what_keeps_canadians_from_giving_more),
+         ("/understanding-top-donors", "Understanding top donors", understanding_top_donors),
+         ("/who-volunteers-how-much", "Who volunteers and how much", who_volunteers_how_much),
+         ("/understanding-top-volunteers", "Understanding top volunteers", understanding_top_volunteers)]
+
+external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css', dbc.themes.BOOTSTRAP]
+
+# Pages are swapped in by the router below, so callbacks of the other pages reference components that aren't in
+# the layout
+app = dash.Dash(__name__, external_stylesheets=external_stylesheets, suppress_callback_exceptions=True)
+server = app.server
+
+
+def mount(app, page):
+    '''
+    Registers the callbacks of a viz's Dash app on the portal app.
+
+    :param app: Portal Dash app
+    :param page: Dash app of the viz
+    '''
+    duplicates = set(app.callback_map) & set(page.callback_map)
+    if duplicates:
+        raise ValueError("Callback outputs defined by several pages: {}".format(", ".join(sorted(duplicates))))
+    app.callback_map.update(page.callback_map)
+    app._callback_list.extend(page._callback_list)
+    # Clientside callbacks (see Utils.callback_utils.clientside_figures)
+    app._inline_scripts.extend(page._inline_scripts)
+
+
+for _, _, viz in PAGES:
+    mount(app, viz.app)
+# Send the responses the pages' figure caches serve pre-compressed
+send_compressed(app)
+
+app.layout = html.Div([
+    dcc.Location(id='url', refresh=False),
+    html.Div([dcc.Link(title, href=path, style={'marginRight': 20}) for path, title, _ in PAGES],
+             style={'padding': 10}),
+    html.Div(id='page-content')
+])
+
+
+@app.callback(
+    dash.dependencies.Output('page-content', 'children'),
+    [
+        dash.dependencies.Input('url', 'pathname')
+    ])
+def display_page(pathname):
+    for path, _, viz in PAGES:
+        if pathname == path:
+            return viz.app.layout
+    return html.H1('Page not found')
+
+
+# The pages' callbacks are instrumented already; this adds the router and serves /metrics on the portal
+instrument_callbacks(app)
+# Opt-in sampling profiler, on with PROFILE_RATE (see Utils.profile_utils)
+profile_callbacks(app)
+
+
+if __name__ == '__main__':
+    # Serve edited tables in Tables/ without restarting (see Utils.data_utils.TableWatcher)
+    watch_tables()
+    # Load the pages' tables and layout figures while the server starts instead of on the first requests
+    warm_up([viz for _, _, viz in PAGES], background=True)
+    app.run_server(debug=True)
@@ -0,0 +1,66 @@
+# Benchmark: HTTP requests and end-to-end latency of a region change, one request per figure vs. the batched
+# region callback (see Utils.callback_utils.batch_callbacks)
+#
+# The app is served by a threaded werkzeug server and the page is simulated by a client sending the requests of a
+# region change with at most 6 at a time, like a browser does per host. The figure cache is cleared before every
+# region change.
+#
+# Usage (from the repo root): python -m benchmarks.bench_batch_callbacks [viz] [rounds]
+import importlib
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+from Utils.prerender import input_options, outputs_list
+
+BROWSER_CONNECTIONS = 6
+
+
+def post(url, output_id, region):
+    body = {"output": output_id, "outputs": outputs_list(output_id),
+            "inputs": [{"id": "region-selection", "property": "value", "value": region}],
+            "changedPropIds": ["region-selection.value"]}
+    request = urllib.request.Request(url, json.dumps(body).encode(), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return len(response.read())
+
+
+def region_change(pool, url, output_ids, region):
+    start = time.perf_counter()
+    size = sum(pool.map(lambda output_id: post(url, output_id, region), output_ids))
+    return time.perf_counter() - start, size
+
+
+def main(name="who_donates_how_much_VIZ1", rounds=3):
+    viz = importlib.import_module("Vizes." + name)
+    batched = [output_id for output_id in viz.app.callback_map if output_id.startswith("..")]
+    # The per-figure callbacks stay registered after batching
+    single = batched[0][2:-2].split("...")
+    regions = input_options(viz.app.layout)["region-selection"]
+
+    server = make_server("127.0.0.1", 0, viz.app.server, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:{}/_dash-update-component".format(server.server_port)
+
+    with ThreadPoolExecutor(BROWSER_CONNECTIONS) as pool:
+        for label, output_ids in [("per figure", single), ("batched", batched)]:
+            timings = []
+            for _ in range(rounds):
+                for region in regions:
+                    viz.figure_cache.clear()
+                    elapsed, size = region_change(pool, url, output_ids, region)
+                    timings.append(elapsed)
+            print("{:>10}: {:2} requests per region change, {:7.1f}kB, median {:6.1f}ms  max {:6.1f}ms".format(
+                label, len(output_ids), size / 1024, 1000*statistics.median(timings), 1000*max(timings)))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
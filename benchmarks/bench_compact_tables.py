@@ -0,0 +1,50 @@
+# Benchmark: memory of every preprocessed table with object strings and 64-bit numbers vs. compacted (categorical
+# string columns sharing one dictionary per column, small ints, float32; see Utils.data_utils.compact_tables)
+#
+# Memory is counted like pandas' memory_usage(deep=True), except that the categories of a categorical column are
+# shared by every table and so are counted once, in the "shared dictionaries" line, rather than per table.
+#
+# Usage (from the repo root): python -m benchmarks.bench_compact_tables [table names...]
+import sys
+
+import pandas as pd
+
+from Utils.data_utils import TableLoader, TableRegistry
+
+
+def table_memory(df):
+    '''
+    :return: Bytes held by a dataframe, categories of categorical columns excluded
+    '''
+    total = df.index.memory_usage(deep=True)
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            total += series.cat.codes.memory_usage(index=False)
+        else:
+            total += series.memory_usage(index=False, deep=True)
+    return total
+
+
+def main(names=None):
+    plain = TableRegistry(names, loader=TableLoader())
+    compact = TableRegistry(names, loader=TableLoader(compact=True))
+    plain.load()
+    compact.load()
+
+    total_before = total_after = 0
+    for name in plain:
+        before, after = table_memory(plain[name]), table_memory(compact[name])
+        total_before += before
+        total_after += after
+        print("{:>45}: {:8.1f}kB -> {:8.1f}kB".format(name, before / 1024, after / 1024))
+
+    dictionaries = sum(dtype.categories.memory_usage(deep=True) for dtype in compact.loader.dtypes.values())
+    print("{:>45}: {:>10} -> {:8.1f}kB".format("shared dictionaries", "", dictionaries / 1024))
+    total_after += dictionaries
+    print("{:>45}: {:8.1f}MB -> {:8.1f}MB ({:.1f}x smaller)".format(
+        "total", total_before / 1024 ** 2, total_after / 1024 ** 2, total_before / total_after))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
@@ -0,0 +1,91 @@
+# Benchmark: serializing figure responses with orjson vs. plotly's encoder, and serving cached responses
+# pre-compressed vs. compressed by Flask-Compress on every request (see Utils.cache_utils)
+#
+# The region-change requests of a viz are sent through the Flask test client with the figure cache warm, once with
+# the pre-compressed responses and once with Flask-Compress compressing them (gzip, as Dash configures it).
+#
+# Usage (from the repo root): python -m benchmarks.bench_compressed_responses [viz] [rounds]
+import importlib
+import json
+import statistics
+import sys
+import time
+
+import plotly
+
+from Utils.cache_utils import encode
+from Utils.prerender import figure_requests, outputs_list
+
+
+def time_encoders(viz, requests, rounds):
+    responses = []
+    for output_id, args in requests:
+        # The response dict Dash serializes, rebuilt from what the encoded callback returns
+        function = viz.app.callback_map[output_id]["callback"]
+        while hasattr(function, "__wrapped__"):
+            function = function.__wrapped__
+        value = function(*args)
+        outputs = outputs_list(output_id)
+        values, outputs = (value, outputs) if isinstance(outputs, list) else ([value], [outputs])
+        responses.append({"response": {output["id"]: {output["property"]: value}
+                                       for value, output in zip(values, outputs)}, "multi": True})
+
+    for label, encoder in [("plotly", lambda value: json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder)),
+                           ("orjson", encode)]:
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for response in responses:
+                encoder(response)
+            timings.append((time.perf_counter() - start) / len(responses))
+        print("{:>28}: {:6.2f}ms per response".format("serialize with " + label, 1e3*statistics.median(timings)))
+
+
+def post(client, callback_map, output_id, args, encoding):
+    callback = callback_map[output_id]
+    body = {"output": output_id, "outputs": outputs_list(output_id),
+            "inputs": [{"id": i["id"], "property": i["property"], "value": value}
+                       for i, value in zip(callback["inputs"], args)]}
+    response = client.post("/_dash-update-component", data=json.dumps(body), content_type="application/json",
+                           headers={"Accept-Encoding": encoding})
+    assert response.status_code == 200
+    return len(response.get_data())
+
+
+def time_requests(client, callback_map, requests, encoding, rounds):
+    timings = []
+    size = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        size = sum(post(client, callback_map, output_id, args, encoding) for output_id, args in requests)
+        timings.append((time.perf_counter() - start) / len(requests))
+    return statistics.median(timings), size / len(requests)
+
+
+def main(name="who_donates_how_much_VIZ1", rounds=3):
+    viz = importlib.import_module("Vizes." + name)
+    visible = [callback["output"] for callback in viz.app._callback_list]
+    requests = [(output_id, args) for output_id, args in figure_requests(viz.app) if output_id in visible]
+    print("{}: {} figure requests".format(name, len(requests)))
+    time_encoders(viz, requests, rounds)
+
+    client = viz.app.server.test_client()
+    # Warm the cache
+    time_requests(client, viz.app.callback_map, requests, "identity", 1)
+
+    # Flask runs the after_request hooks last registered first
+    hooks = viz.app.server.after_request_funcs[None]
+    precompressed = [hook for hook in hooks if hook.__name__ == "compressed"]
+    for encoding in ["identity", "gzip", "br"]:
+        elapsed, size = time_requests(client, viz.app.callback_map, requests, encoding, rounds)
+        print("{:>28}: {:6.2f}ms {:8.1f}kB per response".format("cache hit, " + encoding, 1e3*elapsed, size / 1024))
+        if encoding == "gzip":
+            hooks[:] = [hook for hook in hooks if hook not in precompressed]
+            elapsed, size = time_requests(client, viz.app.callback_map, requests, encoding, rounds)
+            print("{:>28}: {:6.2f}ms {:8.1f}kB per response".format("cache hit, Flask-Compress", 1e3*elapsed,
+                                                                    size / 1024))
+            hooks.extend(precompressed)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
@@ -0,0 +1,40 @@
+# Benchmark: figure callback latency on the first request for a dropdown combination (cache miss) vs. repeated
+# requests (cache hit)
+#
+# Usage (from the repo root): python -m benchmarks.bench_figure_cache [rounds]
+import itertools
+import statistics
+import sys
+import time
+
+from Vizes import how_canadians_donate as viz
+
+
+def combos(callback):
+    # Every value of the callback's dropdowns
+    domains = {"region-selection": viz.region_values, "method-selection": viz.method_names}
+    return itertools.product(*[domains[i["id"]] for i in callback["inputs"]])
+
+
+def time_requests(requests):
+    timings = []
+    for output_id, callback, args in requests:
+        start = time.perf_counter()
+        callback["callback"](*args, outputs_list={"id": output_id.split(".")[0], "property": "figure"})
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main(rounds=3):
+    requests = [(output_id, callback, args) for output_id, callback in viz.app.callback_map.items()
+                for args in combos(callback)]
+
+    miss = time_requests(requests)
+    hit = statistics.median(time_requests(requests) for _ in range(rounds))
+    print("{} callbacks, {} requests: miss {:.2f}ms  hit {:.1f}us  {:.0f}x".format(
+        len(viz.app.callback_map), len(requests), 1e3*miss, 1e6*hit, miss/hit))
+    print(viz.figure_cache.stats())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,44 @@
+# Benchmark: building the percentage graphs with the raw figure builder vs. patching their frozen templates
+# (Utils.graphs.percentage_graph_utils), and a check that both produce the same JSON
+#
+# The graph functions are called with the slices the callbacks of the vizzes using them pass (every dropdown
+# combination).
+#
+# Usage (from the repo root): python -m benchmarks.bench_figure_templates [rounds]
+import importlib
+import json
+import sys
+
+from Utils.graphs import percentage_graph_utils
+from benchmarks.bench_raw_figures import capture_calls, time_function, to_json
+
+VIZZES = ["understanding_top_donors", "understanding_top_volunteers", "what_keeps_canadians_from_giving_more",
+          "why_do_canadians_give"]
+GRAPHS = {"single_vertical_percentage_graph": percentage_graph_utils.build_single_vertical_percentage_graph,
+          "vertical_percentage_graph": percentage_graph_utils.build_vertical_percentage_graph}
+
+
+def main(rounds=3):
+    calls = {name: [] for name in GRAPHS}
+    for viz_name in VIZZES:
+        viz = importlib.import_module("Vizes." + viz_name)
+        functions = {name: getattr(viz, name) for name in GRAPHS if hasattr(viz, name)}
+        for name, viz_calls in capture_calls(viz, functions, combinations=None).items():
+            calls[name] += viz_calls
+
+    for name, build in GRAPHS.items():
+        template = getattr(percentage_graph_utils, name)
+        template(*calls[name][0][0], **calls[name][0][1])  # Builds the first skeleton
+        timings = [time_function(function, calls[name], rounds, encode)
+                   for encode in [False, True] for function in [build, template]]
+        same = all(json.loads(to_json(build(*args, **kwargs))) == json.loads(to_json(template(*args, **kwargs)))
+                   for args, kwargs in calls[name])
+        print("{} ({} calls, {} skeletons): {}".format(
+            name, len(calls[name]), len(getattr(percentage_graph_utils, name.replace("graph", "template")).skeletons),
+            "same JSON" if same else "JSON DIFFERS"))
+        for label, (built, patched) in [("figure", timings[:2]), ("figure + JSON", timings[2:])]:
+            print("{:>16}: built {:5.2f}ms  template {:5.2f}ms  {:4.1f}x".format(
+                label, 1e3*built, 1e3*patched, built / patched))
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
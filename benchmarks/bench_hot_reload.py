@@ -0,0 +1,59 @@
+# Benchmark: hot reload of an edited table (see Utils.data_utils.TableWatcher). Fills a viz's figure cache with
+# every figure it serves, marks one of its CSVs as modified, polls until the watcher reloads it, and reports how
+# long the reload took and how many cached figures were dropped (only those made from that table) vs. kept
+#
+# The CSV's content is unchanged (the snapshot is reused) and its modification time is restored afterwards.
+#
+# Usage (from the repo root): python -m benchmarks.bench_hot_reload [viz] [table]
+import os
+import sys
+import time
+import warnings
+
+from Utils.data_utils import TableWatcher, table_path
+from Utils.prerender import figure_requests, import_viz, outputs_list
+
+
+def fill(viz):
+    for output_id, args in figure_requests(viz.app):
+        try:
+            viz.app.callback_map[output_id]["callback"](*args, outputs_list=outputs_list(output_id))
+        except Exception:
+            # Combinations the page can't render (see Utils.prerender.render), nothing is cached
+            pass
+
+
+def main(name="how_canadians_donate", table=None):
+    warnings.simplefilter("ignore")
+    viz = import_viz(name)
+    viz.registry.load()
+    table = table or viz.registry.names[0]
+    fill(viz)
+    before = viz.figure_cache.stats()
+    print("{} cached figures of {}, {} tables".format(before["entries"], name, len(viz.registry)))
+
+    watcher = TableWatcher(viz.registry.loader)
+    watcher.poll()
+    path = table_path(table)
+    stat = os.stat(path)
+    try:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        watcher.poll()
+        start = time.perf_counter()
+        reloaded = watcher.poll()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    after = viz.figure_cache.stats()
+    print("{:>25}: {}".format("reloaded", ", ".join(name for name, _ in reloaded)))
+    print("{:>25}: {:.3f}s".format("reload", elapsed))
+    print("{:>25}: {}".format("figures dropped", after["invalidations"] - before["invalidations"]))
+    print("{:>25}: {}".format("figures kept", after["entries"]))
+
+    fill(viz)
+    print("{:>25}: {}".format("figures rendered again", len(viz.figure_cache) - after["entries"]))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,46 @@
+# Benchmark: parsing every CSV in Tables/ with load_tables() (see Utils.data_utils) in a pool of 1/2/4/8 processes
+# and threads, against reading them one by one with pd.read_csv's type inference; checks every pool returns the same
+# frames as reading them one by one with their schema
+#
+# Usage (from the repo root): python -m benchmarks.bench_ingest [workers...]
+import os
+import sys
+import time
+
+import pandas as pd
+
+from Utils.data_utils import load_tables, read_csv_table, table_names, table_path
+
+
+def same(tables, expected):
+    return all(tables[name].equals(df) and tables[name].dtypes.equals(df.dtypes) for name, df in expected.items())
+
+
+def timed(function, *args, repeat=3, **kwargs):
+    # Best of a few runs, the first one also warming the page cache
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(workers=(1, 2, 4, 8)):
+    names = table_names()
+    size = sum(os.path.getsize(table_path(name)) for name in names)
+    print("{} tables, {:.1f}MB, {} CPUs".format(len(names), size / 1024 ** 2, os.cpu_count()))
+
+    inferred, _ = timed(lambda: {name: pd.read_csv(table_path(name)) for name in names})
+    print("{:>30}: {:6.3f}s".format("sequential, inferred dtypes", inferred))
+    expected = {name: read_csv_table(name) for name in names}
+    for count in workers:
+        for label, threads in [("processes", False), ("threads", True)]:
+            elapsed, tables = timed(load_tables, names, count, threads, read_csv_table)
+            print("{:>30}: {:6.3f}s ({:.2f}x){}".format("{} {}".format(count, label), elapsed, inferred / elapsed,
+                                                         "" if same(tables, expected) else ", DIFFERENT FRAMES"))
+
+
+if __name__ == "__main__":
+    main(*[[int(arg) for arg in sys.argv[1:]]] if sys.argv[1:] else [])
@@ -0,0 +1,62 @@
+# Benchmark: building Text/HoverText per callback with np.select vs. reading the columns preprocess_tables() adds
+#
+# Usage (from the repo root): python -m benchmarks.bench_labels [rounds]
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from Utils.data_utils import TableRegistry
+
+# (table, group) pairs the vizzes label on every region change
+CASES = [("DonRate", "Age group"),
+         ("AvgTotDon", "Age group"),
+         ("DonMethDonRates", "Age group"),
+         ("BarriersToGiving", "Age group")]
+
+
+def select_labels(dff):
+    # What the graph functions did before, on a copy of the slice they were given
+    dff = dff.copy()
+    dff['Text'] = np.select([dff["Marker"] == "*", dff["Marker"] == "...", pd.isnull(dff["Marker"])],
+                            [dff.Estimate.map(str)+"%"+"*", "...", dff.Estimate.map(str)+"%"])
+    dff['HoverText'] = np.select([dff["Marker"] == "*",
+                                  dff["Marker"] == "...",
+                                  pd.isnull(dff["Marker"])],
+                                 ["Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%<br><b>Use with caution</b>",
+                                  "Estimate Suppressed",
+                                  "Estimate: "+dff.Estimate.map(str)+"% ± "+(dff["CI Upper"] - dff["Estimate"]).map(str)+"%"])
+    return dff['Text'], dff['HoverText']
+
+
+def read_labels(dff):
+    return dff['Text'], dff['HoverText']
+
+
+def time_labels(run, slices, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for dff in slices:
+            run(dff)
+        timings.append((time.perf_counter() - start) / len(slices))
+    return statistics.median(timings)
+
+
+def main(rounds=5):
+    registry = TableRegistry(names=[name for name, _ in CASES])
+    registry.load()
+
+    for name, group in CASES:
+        regions = registry[name]["Region"].unique()
+        slices = [registry.slice(name, region, group) for region in regions]
+        before = time_labels(select_labels, slices, rounds)
+        after = time_labels(read_labels, slices, rounds)
+        print("{:>18} ({:>3} slices): np.select {:7.1f}us  precomputed {:5.1f}us  {:6.1f}x".format(
+            name, len(slices), 1e6*before, 1e6*after, before/after))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,308 @@
+# Benchmark: how many concurrent users one server can take. Spawns a viz in a local server and replays browser
+# sessions against it from asyncio virtual users:
+#
+# - page load: the page, /_dash-layout and /_dash-dependencies, then every callback the page fires on load with the
+#   dropdowns' initial values (up to BROWSER_CONNECTIONS requests at a time, like a browser)
+# - then a random number of dropdown changes (region, demographic, method, barrier, motivation...: any dropdown a
+#   callback takes as input), each firing the callbacks of that dropdown with the page's current values, separated by
+#   a random think time
+#
+# Reports p50/p95/p99 latency, throughput and error rate per callback (labelled by output, see
+# Utils.metrics_utils.output_label) and for the page load requests. Errors are failed connections, timeouts and any
+# status but 200 and 204 (PreventUpdate). Each user's choices of dropdowns and values follow from --seed.
+#
+# The server is Flask's threaded development server by default; with --workers, gunicorn (if installed) with that
+# many worker processes and the repo's settings, which is closer to a pod.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.bench_load [viz] [--users N] [--duration S] [--think S] [--seed N] [--workers N]
+#                                   [--output PATH]
+# viz is a module of Vizes/ (default who_donates_how_much_VIZ1).
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+import warnings
+from collections import defaultdict
+
+import numpy as np
+
+from Utils.data_utils import ROOT_DIR
+from Utils.metrics_utils import output_label
+from Utils.prerender import import_viz, outputs_list
+
+# Requests a browser sends to one host at a time
+BROWSER_CONNECTIONS = 6
+# Dropdown changes per session
+CHANGES = (3, 15)
+PAGE_LABEL = "page load"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(name, port):
+    # Runs in the spawned server process
+    warnings.simplefilter("ignore")
+    server = import_viz(name).app.server
+    # Some dropdown combinations have no data and raise; they are counted as errors by the load generator
+    server.logger.disabled = True
+    logging.getLogger("werkzeug").disabled = True
+    server.run(host="127.0.0.1", port=port, threaded=True)
+
+
+def spawn(name, port, workers=None):
+    '''
+    Starts the server of a viz in a subprocess.
+
+    :param workers: gunicorn worker processes, or None for Flask's development server
+    :return: subprocess.Popen
+    '''
+    if workers:
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers),
+                   "--bind", "127.0.0.1:{}".format(port), "--log-level", "warning", "Vizes.{}:app.server".format(name)]
+    else:
+        command = [sys.executable, "-m", "benchmarks.bench_load", name, "--serve", str(port)]
+    return subprocess.Popen(command, cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+
+
+def wait_until_up(url, process, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The server exited with status {}".format(process.returncode))
+        try:
+            with urllib.request.urlopen(url + "/_dash-dependencies", timeout=5):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("The server didn't answer within {}s".format(timeout))
+
+
+def walk(component, found):
+    # Props of every component of a layout (as served by /_dash-layout) that has an id
+    if isinstance(component, list):
+        for child in component:
+            walk(child, found)
+    elif isinstance(component, dict) and "props" in component:
+        props = component["props"]
+        if "id" in props:
+            found[props["id"]] = props
+        walk(props.get("children"), found)
+    return found
+
+
+class Page:
+    '''
+    What a browser learns from loading a page: the callbacks it calls the server for, and the initial value and
+    choices of every dropdown they take as input.
+    '''
+
+    def __init__(self, layout, dependencies):
+        components = walk(layout, {})
+        self.callbacks = [callback for callback in dependencies if not callback.get("clientside_function")]
+        self.values = {(component_id, prop): value for component_id, props in components.items()
+                       for prop, value in props.items()}
+        self.choices = {}
+        for callback in self.callbacks:
+            for i in callback["inputs"]:
+                options = components.get(i["id"], {}).get("options")
+                if i["property"] == "value" and options:
+                    self.choices[i["id"]] = [option["value"] for option in options]
+
+    def body(self, callback, values, changed):
+        def props(dependencies):
+            return [dict(i, value=values.get((i["id"], i["property"]))) for i in dependencies]
+        return {"output": callback["output"], "outputs": outputs_list(callback["output"]),
+                "inputs": props(callback["inputs"]), "state": props(callback["state"]), "changedPropIds": changed}
+
+    def initial(self):
+        return [callback for callback in self.callbacks if not callback.get("prevent_initial_call")]
+
+    def triggered(self, component_id):
+        return [callback for callback in self.callbacks
+                if any(i["id"] == component_id and i["property"] == "value" for i in callback["inputs"])]
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+        self.sessions = 0
+
+    def add(self, label, seconds, status, size):
+        self.latencies[label].append(seconds)
+        self.bytes[label] += size
+        if status not in (200, 204):
+            self.errors[label] += 1
+
+    def summary(self, duration):
+        rows = {}
+        for label, latencies in self.latencies.items():
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+            rows[label] = {"requests": len(latencies), "errors": self.errors[label],
+                           "error_rate": self.errors[label] / len(latencies), "throughput": len(latencies) / duration,
+                           "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                           "mean_bytes": self.bytes[label] / len(latencies)}
+        return rows
+
+
+async def request(host, port, method, path, body=None, timeout=30):
+    '''
+    One HTTP/1.1 request on its own connection, like a browser sends with compression.
+
+    :return: (status or None if the request failed, bytes of the response body)
+    '''
+    data = json.dumps(body).encode() if body is not None else b""
+    head = ("{} {} HTTP/1.1\r\nHost: {}:{}\r\nAccept-Encoding: gzip, br\r\nConnection: close\r\n"
+            "Content-Type: application/json\r\nContent-Length: {}\r\n\r\n").format(method, path, host, port, len(data))
+
+    async def exchange():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(head.encode() + data)
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        status_line, _, rest = response.partition(b"\r\n")
+        return int(status_line.split()[1]), len(rest.partition(b"\r\n\r\n")[2])
+
+    try:
+        return await asyncio.wait_for(exchange(), timeout)
+    except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+        return None, 0
+
+
+async def timed(results, label, *args, **kwargs):
+    start = time.perf_counter()
+    status, size = await request(*args, **kwargs)
+    results.add(label, time.perf_counter() - start, status, size)
+    return status
+
+
+async def fire(results, host, port, page, callbacks, values, changed, limit):
+    async def one(callback):
+        async with limit:
+            await timed(results, output_label(callback["output"]), host, port, "POST", "/_dash-update-component",
+                        page.body(callback, values, changed))
+    await asyncio.gather(*[one(callback) for callback in callbacks])
+
+
+async def session(results, host, port, path, page, rng, think, deadline):
+    '''
+    One visit: loads the page, then changes dropdowns at random until its changes are done or time is up.
+    '''
+    limit = asyncio.Semaphore(BROWSER_CONNECTIONS)
+    for page_path in [path, "/_dash-layout", "/_dash-dependencies"]:
+        await timed(results, PAGE_LABEL, host, port, "GET", page_path)
+    values = dict(page.values)
+    await fire(results, host, port, page, page.initial(), values, [], limit)
+
+    for _ in range(rng.randint(*CHANGES)):
+        await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+        if time.monotonic() >= deadline or not page.choices:
+            return
+        component_id = rng.choice(sorted(page.choices))
+        values[(component_id, "value")] = rng.choice(page.choices[component_id])
+        await fire(results, host, port, page, page.triggered(component_id), values,
+                   ["{}.value".format(component_id)], limit)
+    results.sessions += 1
+
+
+async def user(results, host, port, path, page, seed, think, deadline):
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        await session(results, host, port, path, page, rng, think, deadline)
+
+
+async def load(host, port, path, page, users, duration, think, seed, ramp):
+    results = Results()
+    deadline = time.monotonic() + ramp + duration
+
+    async def started(index):
+        # Users arrive evenly over the ramp-up
+        await asyncio.sleep(ramp * index / users)
+        await user(results, host, port, path, page, seed * 1000003 + index, think, deadline)
+
+    start = time.monotonic()
+    await asyncio.gather(*[started(index) for index in range(users)])
+    return results, time.monotonic() - start
+
+
+def fetch_page(url):
+    def get(path):
+        with urllib.request.urlopen(url + path, timeout=30) as response:
+            return json.load(response)
+    return Page(get("/_dash-layout"), get("/_dash-dependencies"))
+
+
+def report(rows, duration, sessions):
+    print("{:>50} {:>8} {:>8} {:>9} {:>9} {:>9} {:>7}".format("", "requests", "req/s", "p50", "p95", "p99",
+                                                                "errors"))
+    for label, row in sorted(rows.items(), key=lambda item: -item[1]["p95_ms"]):
+        outputs = label.split("+")
+        # Batched callbacks (see Utils.callback_utils.batch_callbacks) by their first output
+        shown = outputs[0] if len(outputs) == 1 else "{} (+{} outputs)".format(outputs[0], len(outputs) - 1)
+        print("{:>50} {:8} {:8.1f} {:7.1f}ms {:7.1f}ms {:7.1f}ms {:6.1%}".format(
+            shown[-50:], row["requests"], row["throughput"], row["p50_ms"], row["p95_ms"], row["p99_ms"],
+            row["error_rate"]))
+    requests = sum(row["requests"] for row in rows.values())
+    errors = sum(row["errors"] for row in rows.values())
+    print("{} requests in {:.1f}s: {:.1f} req/s, {} sessions completed, {:.1%} errors".format(
+        requests, duration, requests / duration, sessions, errors / requests if requests else 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay dropdown sessions against a locally spawned viz")
+    parser.add_argument("viz", nargs="?", default="who_donates_how_much_VIZ1", help="module of Vizes/")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after the ramp-up")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which the users arrive")
+    parser.add_argument("--think", type=float, default=1, help="mean seconds between dropdown changes (0: none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="serve with gunicorn and this many workers")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.viz, args.serve)
+        return
+
+    host, port = "127.0.0.1", free_port()
+    url = "http://{}:{}".format(host, port)
+    process = spawn(args.viz, port, args.workers)
+    try:
+        wait_until_up(url, process)
+        page = fetch_page(url)
+        print("{}: {} callbacks, {} dropdowns, {} users for {}s (think {}s)".format(
+            args.viz, len(page.callbacks), len(page.choices), args.users, args.duration, args.think))
+        results, duration = asyncio.run(load(host, port, "/", page, args.users, args.duration, args.think,
+                                             args.seed, args.ramp))
+    finally:
+        process.terminate()
+        process.wait()
+
+    rows = results.summary(duration)
+    report(rows, duration, results.sessions)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"viz": args.viz, "users": args.users, "duration": duration, "think": args.think,
+                       "seed": args.seed, "workers": args.workers, "cpus": os.cpu_count(),
+                       "sessions": results.sessions, "callbacks": rows}, f, indent=1, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Benchmark: per-callback metrics (see Utils.metrics_utils). Sends every figure request of the portal's pages twice
+# through the Flask test client (cold, then from the figure cache), scrapes /metrics like Prometheus would, and lists
+# the slowest callbacks by phase along with the cost of the instrumentation itself
+#
+# Usage (from the repo root): python -m benchmarks.bench_metrics [top]
+import json
+import sys
+import time
+import warnings
+from collections import defaultdict
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from Utils.metrics_utils import observe
+from Utils.prerender import figure_requests, outputs_list
+
+
+def post(client, callback_map, output_id, args):
+    callback = callback_map[output_id]
+    body = {"output": output_id, "outputs": outputs_list(output_id),
+            "inputs": [{"id": i["id"], "property": i["property"], "value": value}
+                       for i, value in zip(callback["inputs"], args)]}
+    return client.post("/_dash-update-component", data=json.dumps(body), content_type="application/json")
+
+
+def scrape(client):
+    '''
+    :return: Dict of (metric sample name, labels as a sorted tuple) -> value
+    '''
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.status_code
+    samples = {}
+    for family in text_string_to_metric_families(response.get_data(as_text=True)):
+        for sample in family.samples:
+            samples[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return samples
+
+
+def overhead(calls=100000):
+    # Microseconds observe() adds to a callback
+    function = observe("overhead")(lambda: None)
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(top=10):
+    warnings.simplefilter("ignore")
+    import app as portal
+
+    # Some dropdown combinations have no data and raise; they are counted in dash_callback_errors
+    portal.server.logger.disabled = True
+    client = portal.server.test_client()
+    requests = [(output_id, args) for _, _, viz in portal.PAGES for output_id, args in figure_requests(viz.app)]
+    for _ in range(2):
+        for output_id, args in requests:
+            post(client, portal.app.callback_map, output_id, args)
+
+    samples = scrape(client)
+    seconds, counts, cache = defaultdict(dict), {}, defaultdict(dict)
+    for (name, labels), value in samples.items():
+        labels = dict(labels)
+        if name == "dash_callback_phase_seconds_sum":
+            seconds[labels["output"]][labels["phase"]] = value
+        elif name == "dash_callback_seconds_count":
+            counts[labels["output"]] = value
+        elif name == "dash_callback_cache_requests_total":
+            cache[labels["output"]][labels["result"]] = value
+    print("{} requests, {} callbacks with metrics".format(2 * len(requests), len(counts)))
+
+    def mean(output, phase):
+        return seconds[output].get(phase, 0) / counts[output] * 1e3
+
+    slowest = sorted(counts, key=lambda output: -sum(seconds[output].values()) / counts[output])[:top]
+    print("{:>45} {:>8} {:>8} {:>8} {:>8} {:>9}".format("output", "calls", "filter", "build", "serial.", "hit rate"))
+    for output in slowest:
+        hits, misses = cache[output].get("hit", 0), cache[output].get("miss", 0)
+        print("{:>45} {:8.0f} {:6.2f}ms {:6.2f}ms {:6.2f}ms {:8.0%}".format(
+            output[-45:], counts[output], mean(output, "filter"), mean(output, "build"), mean(output, "serialize"),
+            hits / (hits + misses) if hits + misses else 0))
+    print("instrumentation overhead: {:.1f}us per callback".format(overhead()))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,66 @@
+# Benchmark: mirroring remote tables (see Utils.mirror_utils) from a local http.server standing in for
+# raw.githubusercontent.com, with a fixed latency per request. Measures the first download of every table with one
+# request at a time vs. in parallel, revalidating them all (304 Not Modified) after one changed upstream, and
+# resolving them with the server gone, as a page starting offline would. The same behaviour is tested, with
+# assertions, by tests/test_mirror_utils.py.
+#
+# Usage (from the repo root): python -m benchmarks.bench_mirror [latency ms] [workers]
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from Utils.data_utils import TABLES_DIR
+from Utils.mirror_utils import prefetch, resolve
+from tests.helpers import serve
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def statuses(results):
+    return ", ".join("{} x{}".format(status, count) for status, count in sorted(Counter(
+        type(status).__name__ if isinstance(status, Exception) else status for status in results.values()).items()))
+
+
+def main(latency=50, workers=8):
+    with tempfile.TemporaryDirectory() as directory:
+        upstream = os.path.join(directory, "upstream")
+        shutil.copytree(TABLES_DIR, upstream)
+        server = serve(upstream, latency / 1000)
+        base = "http://127.0.0.1:{}/".format(server.server_address[1])
+        urls = [base + name for name in sorted(os.listdir(upstream))]
+        print("{} tables, {}ms per request".format(len(urls), latency))
+
+        for label, count in [("download, 1 at a time", 1), ("download, {} at a time".format(workers), workers)]:
+            elapsed, results = timed(prefetch, urls, count, os.path.join(directory, "mirror-{}".format(count)))
+            print("{:>30}: {:6.2f}s ({})".format(label, elapsed, statuses(results)))
+        mirror = os.path.join(directory, "mirror-{}".format(workers))
+
+        # One table changes upstream; conditional GETs only download that one
+        changed = os.path.join(upstream, os.path.basename(urls[0]))
+        with open(changed, "a") as f:
+            f.write("\n")
+        stat = os.stat(changed)
+        os.utime(changed, (stat.st_atime, stat.st_mtime + 2))
+        elapsed, results = timed(prefetch, urls, workers, mirror)
+        print("{:>30}: {:6.2f}s ({})".format("revalidate", elapsed, statuses(results)))
+
+        server.shutdown()
+        server.server_close()
+        elapsed, paths = timed(lambda: [resolve(url, mirror) for url in urls])
+        print("{:>30}: {:6.2f}s".format("resolve offline", elapsed))
+        current = all(hashlib.sha256(open(path, "rb").read()).digest() ==
+                      hashlib.sha256(open(os.path.join(upstream, os.path.basename(url)), "rb").read()).digest()
+                      for url, path in zip(urls, paths))
+        print("{:>30}: {}".format("mirror matches upstream", current))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
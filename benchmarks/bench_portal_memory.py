@@ -0,0 +1,53 @@
+# Benchmark: resident memory of the multi-page portal (app.py) vs. the sum of the pages run as standalone apps
+#
+# Each measurement runs in a fresh interpreter that imports the app(s) and loads every table the pages use. Tables
+# read from URLs are skipped so the report runs offline.
+#
+# Usage (from the repo root): python -m benchmarks.bench_portal_memory
+import subprocess
+import sys
+
+MEASURE = '''
+import importlib, time
+start = time.perf_counter()
+modules = [importlib.import_module(name) for name in {modules!r}]
+pages = [viz for _, _, viz in modules[0].PAGES] if {portal!r} else modules
+registries = [page.registry for page in pages]
+for registry in registries:
+    registry.load([name for name in registry.names if name not in registry.sources])
+elapsed = time.perf_counter() - start
+rss = [line for line in open("/proc/self/status") if line.startswith("VmRSS")][0].split()[1]
+print(int(rss) / 1024, elapsed)
+'''
+
+
+def measure(modules, portal=False):
+    '''
+    :param modules: Module names to import
+    :param portal: Whether modules is the portal, whose pages (app.PAGES) hold the registries to load
+    :return: (RSS in MB, start-up seconds)
+    '''
+    code = MEASURE.format(modules=modules, portal=portal)
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+    rss, elapsed = output.stdout.split()
+    return float(rss), float(elapsed)
+
+
+def main():
+    from app import PAGES
+
+    total_rss = total_time = 0
+    for _, _, viz in PAGES:
+        rss, elapsed = measure([viz.__name__])
+        total_rss += rss
+        total_time += elapsed
+        print("{:>45}: {:6.1f}MB  {:5.2f}s".format(viz.__name__, rss, elapsed))
+    print("{:>45}: {:6.1f}MB  {:5.2f}s".format("sum of standalone apps", total_rss, total_time))
+
+    rss, elapsed = measure(["app"], portal=True)
+    print("{:>45}: {:6.1f}MB  {:5.2f}s".format("app.py (all pages)", rss, elapsed))
+    print("portal uses {:.1f}x less memory".format(total_rss / rss))
+
+
+if __name__ == "__main__":
+    main()
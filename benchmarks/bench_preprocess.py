@@ -0,0 +1,70 @@
+# Benchmark: cleaning every table with the declarative pipeline vs. process_data() and the per-table loops the vizzes
+# used to run
+#
+# Usage (from the repo root): python -m benchmarks.bench_preprocess [rounds]
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from Utils.data_utils import load_table, preprocess_tables, process_data, table_names, table_spec
+
+
+def inline_loop(data):
+    # The cleaning block formerly copy-pasted into each viz module, one table at a time
+    for name, df in data.items():
+        if table_spec(name)["unit"] == "rate":
+            df['Estimate'] = df['Estimate']*100
+            df['CI Upper'] = df['CI Upper']*100
+
+        df["Estimate"] = np.where(df["Marker"]=="...", 0, df["Estimate"])
+        df["CI Upper"] = np.where(df["Marker"]=="...", 0, df["CI Upper"])
+
+        if "Province" in df:
+            df["Region"] = np.select([df["Province"] == "SK",
+                                      df["Province"] == "MB",
+                                      df["Province"] == "NB",
+                                      df["Province"] == "NS",
+                                      df["Province"] == "PE",
+                                      df["Province"] == "NL"],
+                                     ["SK", "MB", "NB", "NS", "PE", "NL"], default=df["Region"])
+
+        df["Group"] = np.where(df["Attribute"]=="Unable to determine", "", df["Group"])
+        df["Group"] = np.where(df["Attribute"]=="Unknown", "", df["Group"])
+
+        if not df["Attribute"].isna().all():
+            df["Attribute"] = df["Attribute"].str.wrap(15)
+            df["Attribute"] = df["Attribute"].replace({'\n': '<br>'}, regex=True)
+
+        df['Estimate'] = df['Estimate'].round(0).astype(int)
+        df["CI Upper"] = df["CI Upper"].round(0).astype(int)
+        df['cv'] = df['cv'].round(2)
+
+
+def time_pipeline(label, run, raw, rounds):
+    timings = []
+    for _ in range(rounds):
+        tables = {name: df.copy() for name, df in raw.items()}
+        start = time.perf_counter()
+        run(tables)
+        timings.append(time.perf_counter() - start)
+    print("{:>18}: median {:.1f}ms  min {:.1f}ms".format(label, 1000*statistics.median(timings), 1000*min(timings)))
+    return statistics.median(timings)
+
+
+def main(rounds=10):
+    raw = {name: load_table(name) for name in table_names()}
+    print("Cleaning {} tables ({} rows), {} rounds".format(len(raw), sum(len(df) for df in raw.values()), rounds))
+
+    results = {"process_data": time_pipeline("process_data", lambda tables: process_data(list(tables.values())),
+                                             raw, rounds),
+               "inline loops": time_pipeline("inline loops", inline_loop, raw, rounds),
+               "preprocess_tables": time_pipeline("preprocess_tables", preprocess_tables, raw, rounds)}
+
+    for label in ["process_data", "inline loops"]:
+        print("preprocess_tables vs {}: {:.1f}x".format(label, results[label] / results["preprocess_tables"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,75 @@
+# Benchmark: cost of the sampling profiler (see Utils.profile_utils) on the region-change requests of a page sent
+# through the Flask test client with the figure cache off: unwrapped (profiling off), wrapped but sampling none of
+# the invocations, sampling 10% and sampling all of them. Then lists the profiles kept and downloads the slowest
+# through the admin routes.
+#
+# Usage (from the repo root): python -m benchmarks.bench_profiles [viz] [rounds]
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+# Read by Utils.profile_utils at import
+os.environ.setdefault("PROFILE_TOKEN", "bench")
+
+from Utils.prerender import figure_requests, import_viz, outputs_list
+from Utils.profile_utils import ProfileRing, profiled, serve_profiles
+
+
+def post(client, callback_map, output_id, args):
+    callback = callback_map[output_id]
+    body = {"output": output_id, "outputs": outputs_list(output_id),
+            "inputs": [{"id": i["id"], "property": i["property"], "value": value}
+                       for i, value in zip(callback["inputs"], args)]}
+    return client.post("/_dash-update-component", data=json.dumps(body), content_type="application/json")
+
+
+def time_requests(client, callback_map, requests, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for output_id, args in requests:
+            post(client, callback_map, output_id, args)
+        timings.append((time.perf_counter() - start) / len(requests))
+    return statistics.median(timings) * 1e3
+
+
+def main(name="why_do_canadians_give", rounds=5):
+    warnings.simplefilter("ignore")
+    viz = import_viz(name)
+    viz.figure_cache.max_entries = 0
+    callback_map = viz.app.callback_map
+    requests = [(output_id, args) for output_id, args in figure_requests(viz.app)
+                if callback_map[output_id]["inputs"][0]["id"] == "region-selection"]
+    print("{}: {} requests".format(name, len(requests)))
+    headers = {"X-Profile-Token": os.environ["PROFILE_TOKEN"]}
+
+    with tempfile.TemporaryDirectory() as directory:
+        ring = ProfileRing(directory, keep=20)
+        unwrapped = {output_id: callback["callback"] for output_id, callback in callback_map.items()
+                     if "callback" in callback}
+        serve_profiles(viz.app.server, ring)
+        client = viz.app.server.test_client()
+        for label, rate in [("profiling off", 0), ("wrapped, 0% sampled", 1e-9), ("10% sampled", 0.1),
+                            ("100% sampled", 1)]:
+            # What profile_callbacks() does, at each rate
+            for output_id, callback in unwrapped.items():
+                callback_map[output_id]["callback"] = profiled(callback, output_id, ring, rate, 0) if rate else callback
+            print("{:>22}: {:6.2f}ms per request".format(label, time_requests(client, callback_map, requests, rounds)))
+
+        listed = client.get("/admin/profiles", headers=headers).get_json()
+        print("{:>22}: {} (ring of {}), forbidden without the token: {}".format(
+            "profiles kept", len(listed), ring.keep, client.get("/admin/profiles").status_code == 403))
+        slowest = max(listed, key=lambda entry: entry["seconds"])
+        download = client.get("/admin/profiles/" + slowest["name"], headers=headers)
+        print("{:>22}: {} {} {:.1f}ms, {} bytes".format("slowest", slowest["output"], slowest["inputs"],
+                                                         slowest["seconds"] * 1e3, len(download.get_data())))
+        text = client.get("/admin/profiles/{}?format=text".format(slowest["name"]), headers=headers)
+        print("\n".join(text.get_data(as_text=True).splitlines()[:12]))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
@@ -0,0 +1,103 @@
+# Benchmark: graph functions building validated plotly figures vs. plain dict figures (Utils.graph_utils.RawFigure),
+# and a check that both produce the same JSON
+#
+# Every graph function is called with the slices its callbacks pass it (for the first combinations of each
+# callback's dropdowns), once with plotly.graph_objects and once with Utils.graph_utils.raw_graph_objects as go.
+# Tables read from URLs come from the mirror or Tables/ (see Utils.mirror_utils), so the benchmark runs offline. The
+# JSON of every graph function the vizzes call, the shared ones included, is checked by tests/test_raw_figures.py.
+#
+# Usage (from the repo root): python -m benchmarks.bench_raw_figures [rounds]
+import importlib
+import inspect
+import json
+import statistics
+import sys
+import time
+
+import plotly
+import plotly.graph_objects as go
+
+from Utils.graph_utils import raw_graph_objects
+from Utils.prerender import figure_requests, outputs_list, viz_names
+
+# Dropdown combinations rendered per callback
+COMBINATIONS = 3
+
+
+def graph_functions(viz):
+    return {name: function for name, function in vars(viz).items()
+            if inspect.isfunction(function) and function.__module__ == viz.__name__ and
+            "go.Figure(" in inspect.getsource(function)}
+
+
+def capture_calls(viz, functions, combinations=COMBINATIONS):
+    # Runs the callbacks (for the first combinations of each, or all of them if None) with the graph functions
+    # wrapped to record their arguments
+    calls = {name: [] for name in functions}
+
+    def recorder(name, function):
+        def record(*args, **kwargs):
+            recorded = ([arg.copy() if hasattr(arg, "copy") else arg for arg in args], kwargs)
+            figure = function(*args, **kwargs)
+            calls[name].append(recorded)
+            return figure
+        return record
+
+    for name, function in functions.items():
+        setattr(viz, name, recorder(name, function))
+    seen = {}
+    for output_id, args in figure_requests(viz.app):
+        seen[output_id] = seen.get(output_id, 0) + 1
+        if combinations is None or seen[output_id] <= combinations:
+            try:
+                viz.app.callback_map[output_id]["callback"](*args, outputs_list=outputs_list(output_id))
+            except Exception:
+                # Some combinations have no data and fail the same way with either module
+                pass
+    for name, function in functions.items():
+        setattr(viz, name, function)
+    return calls
+
+
+def to_json(figure):
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def time_function(function, calls, rounds, encode=True):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for args, kwargs in calls:
+            figure = function(*args, **kwargs)
+            if encode:
+                to_json(figure)
+        timings.append((time.perf_counter() - start) / len(calls))
+    return statistics.median(timings)
+
+
+def main(rounds=3):
+    mismatches = 0
+    for name in viz_names():
+        viz = importlib.import_module("Vizes." + name)
+        functions = graph_functions(viz)
+        for function_name, calls in capture_calls(viz, functions).items():
+            if not calls:
+                continue
+            function = functions[function_name]
+            results = {}
+            for label, module in [("validated", go), ("raw", raw_graph_objects)]:
+                viz.go = module
+                results[label] = (time_function(function, calls, rounds),
+                                  [json.loads(to_json(function(*args, **kwargs))) for args, kwargs in calls])
+            viz.go = go
+
+            same = results["validated"][1] == results["raw"][1]
+            mismatches += not same
+            print("{:>38}.{:<34} {:3} calls: validated {:6.2f}ms  raw {:5.2f}ms  {:5.1f}x  {}".format(
+                name, function_name, len(calls), 1e3*results["validated"][0], 1e3*results["raw"][0],
+                results["validated"][0] / results["raw"][0], "same JSON" if same else "JSON DIFFERS"))
+    print("{} functions with different JSON".format(mismatches))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
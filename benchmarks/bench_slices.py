@@ -0,0 +1,62 @@
+# Benchmark: per-callback filter latency, chained boolean masks vs. the registry's precomputed slice index
+#
+# Usage (from the repo root): python -m benchmarks.bench_slices [rounds]
+import statistics
+import sys
+import time
+
+from Utils.data_utils import TableRegistry, table_spec
+
+# (table, filters each callback applies) for the largest tables the vizzes filter
+CASES = [("DonMethDonRates", ["Region", "QuestionText", "Group"]),
+         ("DonRate", ["Region", "Group"]),
+         ("BarriersToGiving", ["Region", "Group", "QuestionText"]),
+         ("TopDonorsDonRates", ["Region"])]
+
+
+def masks(df, keys, wrapped):
+    # What the callbacks did before: one full scan per filter (and un-wrapping QuestionText first where it is wrapped)
+    dff = df[df['Region'] == keys["Region"]]
+    if "QuestionText" in keys:
+        question = dff['QuestionText'].str.replace("<br>", " ", regex=False) if wrapped else dff['QuestionText']
+        dff = dff[question == keys["QuestionText"]]
+    if "Group" in keys:
+        dff = dff[dff['Group'] == keys["Group"]]
+    return dff
+
+
+def lookup(registry, name, keys):
+    return registry.slice(name, keys["Region"], keys.get("Group"), question=keys.get("QuestionText"))
+
+
+def time_filter(run, combos, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for keys in combos:
+            run(keys)
+        timings.append((time.perf_counter() - start) / len(combos))
+    return statistics.median(timings)
+
+
+def main(rounds=5):
+    registry = TableRegistry(names=[name for name, _ in CASES])
+    registry.load()
+
+    for name, columns in CASES:
+        df = registry[name]
+        questions = df['QuestionText'].str.replace("<br>", " ", regex=False) if "QuestionText" in columns else None
+        keys = df[[c for c in columns if c != "QuestionText"]]
+        if questions is not None:
+            keys = keys.assign(QuestionText=questions)
+        combos = [dict(zip(columns, row)) for row in keys[columns].drop_duplicates().itertuples(index=False)]
+
+        wrapped = table_spec(name)["question_wrap"] is not None
+        before = time_filter(lambda k: masks(df, k, wrapped), combos, rounds)
+        after = time_filter(lambda k: lookup(registry, name, k), combos, rounds)
+        print("{:>18} ({:>4} rows, {:>3} slices): masks {:7.1f}us  index {:6.1f}us  {:5.1f}x".format(
+            name, len(df), len(combos), 1e6*before, 1e6*after, before/after))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,56 @@
+# Benchmark: start-up time of loading every table through the loader without snapshots, with the snapshots built on
+# the first start, and with them already built (see Utils.data_utils.load_preprocessed); then several workers
+# starting at once with no snapshots, of which only one should preprocess the tables
+#
+# Each measurement runs in a fresh interpreter, with the snapshots in a temporary directory.
+#
+# Usage (from the repo root): python -m benchmarks.bench_snapshot [workers]
+import subprocess
+import sys
+import tempfile
+
+MEASURE = '''
+import time
+start = time.perf_counter()
+import Utils.data_utils as data_utils
+built = []
+preprocess_tables = data_utils.preprocess_tables
+def counted(tables):
+    built.extend(tables)
+    return preprocess_tables(tables)
+data_utils.preprocess_tables = counted
+loader = data_utils.TableLoader(counted, compact=True, snapshot={directory!r} if {snapshot!r} else None)
+data_utils.TableRegistry(loader=loader).load()
+print(time.perf_counter() - start, len(built))
+'''
+
+
+def start(directory, snapshot=True):
+    code = MEASURE.format(directory=directory, snapshot=snapshot)
+    return subprocess.Popen([sys.executable, "-W", "ignore", "-c", code], stdout=subprocess.PIPE, text=True)
+
+
+def result(process):
+    '''
+    :return: (start-up seconds, number of tables the process preprocessed)
+    '''
+    elapsed, built = process.communicate()[0].split()
+    return float(elapsed), int(built)
+
+
+def main(workers=4):
+    with tempfile.TemporaryDirectory() as directory:
+        for label, snapshot in [("no snapshot", False), ("first start (builds)", True), ("warm start", True)]:
+            elapsed, built = result(start(directory, snapshot))
+            print("{:>25}: {:5.2f}s, {} tables preprocessed".format(label, elapsed, built))
+
+    with tempfile.TemporaryDirectory() as directory:
+        processes = [start(directory) for _ in range(workers)]
+        results = [result(process) for process in processes]
+        print("{} workers starting at once:".format(workers))
+        for i, (elapsed, built) in enumerate(results):
+            print("{:>25}: {:5.2f}s, {} tables preprocessed".format("worker {}".format(i + 1), elapsed, built))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
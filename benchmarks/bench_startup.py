@@ -0,0 +1,105 @@
+# Benchmark: start-up time of every viz, checked against a budget. Each viz is imported in a fresh interpreter (the
+# time a server process takes before it can bind), a few times over, then timed serving its layout for the first time
+# (which builds the figures deferred by Utils.graph_utils.DeferredFigure and loads the tables the dropdowns need).
+#
+# One more import runs under python -X importtime; its report is parsed into a breakdown of the import time by
+# top-level package and the slowest modules.
+#
+# Exits with status 1 if the median import time of a viz is over its budget: BUDGETS, else STARTUP_BUDGET seconds
+# (default 2.5). The budget is for this machine class; set STARTUP_BUDGET where the suite runs elsewhere. The test
+# suite checks that importing a viz reads no table and builds no figure (tests/test_startup.py); this times it and
+# reports where the time goes.
+#
+# Usage (from the repo root): python -m benchmarks.bench_startup [viz ...] [--runs N] [--top N]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from Utils.data_utils import ROOT_DIR
+from Utils.prerender import viz_names
+
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET", 2.5))
+# Seconds, for vizzes that need another budget than STARTUP_BUDGET
+BUDGETS = {}
+
+# Run in the fresh interpreter: prints the import time and the first layout time as JSON
+TIMER = """
+import json, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+from Utils.prerender import import_viz
+viz = import_viz({name!r})
+imported = time.perf_counter()
+import plotly
+json.dumps(viz.app.layout, cls=plotly.utils.PlotlyJSONEncoder)
+print(json.dumps({{"import": imported - start, "layout": time.perf_counter() - imported}}))
+"""
+
+
+def run(name, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", TIMER.format(name=name)]
+    process = subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return json.loads(process.stdout.strip().splitlines()[-1]), process.stderr
+
+
+def parse_importtime(report):
+    '''
+    :param report: stderr of python -X importtime
+    :return: List of (module, self seconds, cumulative seconds, depth), in the order the imports finished
+    '''
+    modules = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return modules
+
+
+def breakdown(name, modules, top):
+    by_package = defaultdict(float)
+    for module_name, self_seconds, _, _ in modules:
+        by_package[module_name.split(".")[0]] += self_seconds
+    total = sum(by_package.values())
+    print("    {:>30} {:>9} {:>6}".format("package", "self", "share"))
+    for package, seconds in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print("    {:>30} {:7.1f}ms {:5.1%}".format(package, 1e3 * seconds, seconds / total))
+    print("    {:>30} {:>9}".format("slowest modules", "cumul."))
+    # Modules imported by the viz or the repo's Utils, with what they import
+    direct = [module for module in modules if module[3] <= 1 or module[0].startswith("Utils.")]
+    for module_name, _, cumulative, _ in sorted(direct, key=lambda module: -module[2])[:top]:
+        print("    {:>30} {:7.1f}ms".format(module_name[-30:], 1e3 * cumulative))
+    body = sum(self_seconds for module_name, self_seconds, _, _ in modules if module_name == "Vizes." + name)
+    print("    {:>30} {:7.1f}ms".format("viz module body", 1e3 * body))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the start-up of the vizzes against a budget")
+    parser.add_argument("vizzes", nargs="*", help="viz module names (default: every viz in Vizes/)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters timed per viz")
+    parser.add_argument("--top", type=int, default=8, help="packages and modules listed in the breakdown")
+    args = parser.parse_args(argv)
+
+    over = []
+    for name in args.vizzes or viz_names():
+        timings = [run(name)[0] for _ in range(args.runs)]
+        imported = statistics.median(timing["import"] for timing in timings)
+        layout = statistics.median(timing["layout"] for timing in timings)
+        budget = BUDGETS.get(name, STARTUP_BUDGET)
+        print("{}: import {:.2f}s, first layout {:.3f}s (budget {:.1f}s){}".format(
+            name, imported, layout, budget, "  OVER BUDGET" if imported > budget else ""))
+        if imported > budget:
+            over.append(name)
+        breakdown(name, parse_importtime(run(name, importtime=True)[1]), args.top)
+
+    print("{} vizzes over their start-up budget{}".format(len(over), ": " + ", ".join(over) if over else ""))
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# Benchmark: cold load of every table from the CSV files vs. the columnar store
+#
+# Usage (from the repo root): python -m benchmarks.bench_store [rounds]
+import subprocess
+import statistics
+import sys
+
+from Utils.data_utils import build_store, table_names
+
+# Each round runs in a fresh interpreter so nothing is cached between loads; pandas import time is excluded
+LOAD_SCRIPT = """
+import time
+from Utils.data_utils import table_names, read_csv_table, read_partition
+load = {loader}
+start = time.perf_counter()
+for name in table_names():
+    load(name)
+print(time.perf_counter() - start)
+"""
+
+
+def cold_load(loader, rounds):
+    timings = []
+    for _ in range(rounds):
+        out = subprocess.run([sys.executable, "-c", LOAD_SCRIPT.format(loader=loader)],
+                             check=True, capture_output=True, text=True)
+        timings.append(float(out.stdout.strip()))
+    return timings
+
+
+def main(rounds=5):
+    build_store()
+    print("Cold load of {} tables, {} rounds".format(len(table_names()), rounds))
+    results = {}
+    for label, loader in [("csv", "read_csv_table"), ("store", "read_partition")]:
+        timings = cold_load(loader, rounds)
+        results[label] = statistics.median(timings)
+        print("{:>6}: median {:.3f}s  min {:.3f}s".format(label, statistics.median(timings), min(timings)))
+    print("speedup: {:.1f}x".format(results["csv"] / results["store"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
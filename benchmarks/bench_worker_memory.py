@@ -0,0 +1,101 @@
+# Benchmark: memory of pre-forked workers serving the portal, without preload_app (every worker imports the portal and
+# loads the tables itself), with preload_app, and with preload_app and the tables in shared memory (see wsgi.py and
+# Utils.data_utils.TableLoader.share)
+#
+# Each measurement runs in a fresh interpreter that does what gunicorn does: it forks the workers, after importing the
+# portal and loading every table with preload_app (tables read from URLs are skipped so the report runs offline). Each worker
+# answers the first combinations of every figure callback and reports its memory from /proc/self/smaps_rollup: RSS
+# counts every page the worker maps, PSS splits shared pages between the processes sharing them and USS only counts
+# the worker's private pages.
+#
+# Usage (from the repo root): python -m benchmarks.bench_worker_memory [workers] [combinations]
+import subprocess
+import sys
+import textwrap
+
+# Imports the portal and loads its tables: in the master with preload_app, in every worker without
+LOAD = '''
+import app as portal
+from Utils.data_utils import LOADERS
+from Utils.prerender import figure_requests, outputs_list
+for _, _, viz in portal.PAGES:
+    viz.registry.load([name for name in viz.registry.names if name not in viz.registry.sources])
+if {shared!r}:
+    for loader in LOADERS.values():
+        loader.share()
+'''
+
+MEASURE = '''
+import gc, os, sys
+
+def memory():
+    fields = {{}}
+    for line in open("/proc/self/smaps_rollup"):
+        parts = line.split()
+        if len(parts) == 3 and parts[2] == "kB":
+            fields[parts[0][:-1]] = int(parts[1]) / 1024
+    return fields["Rss"], fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+{master}
+# Workers wait for the master to close release before exiting, so every process is measured while all of them run
+release, closed = os.pipe()
+pipes = []
+for _ in range({workers}):
+    read, write = os.pipe()
+    if os.fork() == 0:
+        os.close(read)
+{worker}
+        for _, _, viz in portal.PAGES:
+            seen = {{}}
+            for output_id, args in figure_requests(viz.app):
+                seen[output_id] = seen.get(output_id, 0) + 1
+                if seen[output_id] <= {combinations}:
+                    try:
+                        viz.app.callback_map[output_id]["callback"](*args, outputs_list=outputs_list(output_id))
+                    except Exception:
+                        pass
+        # A full collection touches the header of every tracked object, like a long-running worker eventually does
+        gc.collect()
+        os.write(write, "{{}} {{}} {{}}".format(*memory()).encode())
+        os.close(closed)
+        os.read(release, 1)
+        os._exit(0)
+    os.close(write)
+    pipes.append(read)
+
+os.close(release)
+for read in pipes:
+    print(os.read(read, 1024).decode())
+print("{{}} {{}} {{}}".format(*memory()))
+os.close(closed)
+for _ in pipes:
+    os.wait()
+'''
+
+
+def measure(preload, shared, workers, combinations):
+    '''
+    :return: List of (RSS, PSS, USS) in MB per worker, and the master's
+    '''
+    load = LOAD.format(shared=shared)
+    code = MEASURE.format(master=load if preload else "",
+                          worker="" if preload else textwrap.indent(load, " " * 8),
+                          workers=workers, combinations=combinations)
+    output = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+    rows = [tuple(float(value) for value in line.split()) for line in output.stdout.splitlines()]
+    return rows[:-1], rows[-1]
+
+
+def main(workers=4, combinations=3):
+    for label, preload, shared in [("no preload", False, False), ("preload, private tables", True, False),
+                                   ("preload, shared tables", True, True)]:
+        rows, master = measure(preload, shared, workers, combinations)
+        print("{} ({} workers):".format(label, workers))
+        print("{:>12}: RSS {:6.1f}MB  PSS {:6.1f}MB  USS {:6.1f}MB".format("master", *master))
+        for i, row in enumerate(rows):
+            print("{:>12}: RSS {:6.1f}MB  PSS {:6.1f}MB  USS {:6.1f}MB".format("worker {}".format(i + 1), *row))
+        print("{:>12}: PSS {:6.1f}MB".format("total", master[1] + sum(row[1] for row in rows)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,251 @@
+# Benchmark suite: times every stage of serving a figure on the real Tables/ data and writes the results as JSON, so
+# that runs can be compared over time (ie. before and after a change, or across commits).
+#
+# Cases, each timed over the same inputs every run:
+#
+# - ingest/<family>: parsing the CSVs of a table family with their schema (see Utils.data_utils.read_csv_table)
+# - preprocess/<family>: cleaning those tables (see Utils.data_utils.preprocess_tables)
+# - filter/<viz>/<output> and callback/<viz>/<output>: the time each figure callback spends looking up rows (see
+#   Utils.metrics_utils.phase) and in total, with the figure cache off
+# - graph/<module>.<function>: each graph function of Utils.graph_utils, Utils.graphs and the vizzes, called with the
+#   slices its callbacks and layout pass it. Graph functions no viz calls directly (ie. the plain builders behind the
+#   figure templates) borrow the arguments of a recorded function with the same parameters; layout figures without
+#   parameters (see Utils.graph_utils.DeferredFigure) are called as they are.
+#
+# Callbacks are sent SAMPLES dropdown combinations spread evenly over all of them (see tests.helpers.sample()), in the
+# order the page lists them.
+# Each case reports the min/median/mean/stdev over rounds of the seconds per call.
+#
+# Usage (from the repo root):
+#   python -m benchmarks.suite [--rounds N] [--only PATTERN ...] [--output PATH] [--baseline PATH]
+#   python -m benchmarks.suite --compare OLD.json NEW.json [--tolerance 1.25]
+# Results go to benchmarks/results/<time>-<commit>.json by default. With --baseline or --compare, cases whose median
+# is more than tolerance times the baseline's are listed as regressions and the exit status is 1.
+import argparse
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from Utils.data_utils import FAMILIES, ROOT_DIR, preprocess_tables, read_csv_table, table_family, table_names
+from Utils.metrics_utils import output_label, recorded
+from Utils.prerender import outputs_list
+from tests.helpers import SAMPLES, callback_requests, import_vizzes
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+ROUNDS = 5
+TOLERANCE = 1.25
+
+
+def stats(timings, calls):
+    '''
+    :param timings: Seconds per call of each round
+    :param calls: Calls per round
+    :return: Dict of summary statistics (seconds per call)
+    '''
+    return {"min": min(timings), "median": statistics.median(timings), "mean": statistics.mean(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0, "rounds": len(timings), "calls": calls}
+
+
+def time_calls(calls, rounds, setup=None):
+    '''
+    Times a list of calls, rounds times over.
+
+    :param calls: List of functions taking no arguments (or the value returned by setup)
+    :param setup: Function run before each call, outside of the timing; its result is passed to the call
+    :return: Seconds per call of each round
+    '''
+    timings = []
+    for _ in range(rounds):
+        elapsed = 0
+        for call in calls:
+            argument = setup() if setup else None
+            start = time.perf_counter()
+            call(argument) if setup else call()
+            elapsed += time.perf_counter() - start
+        timings.append(elapsed / len(calls))
+    return timings
+
+
+def ingest_cases(rounds):
+    names = table_names()
+    for family in FAMILIES:
+        members = [name for name in names if table_family(name) == family]
+        yield "ingest/" + family, stats(time_calls([lambda name=name: read_csv_table(name) for name in members],
+                                                   rounds), len(members))
+        raw = {name: read_csv_table(name) for name in members}
+        yield "preprocess/" + family, stats(time_calls(
+            [lambda tables: preprocess_tables(tables)], rounds,
+            setup=lambda: {name: df.copy() for name, df in raw.items()}), len(members))
+
+
+def callback_cases(name, viz, rounds):
+    for output_id, requests in callback_requests(viz).items():
+        callback = viz.app.callback_map[output_id]["callback"]
+        filtered, totals = [], []
+        for _ in range(rounds):
+            seconds, total = 0, 0
+            for args in requests:
+                with recorded() as record:
+                    start = time.perf_counter()
+                    try:
+                        callback(*args, outputs_list=outputs_list(output_id))
+                    except Exception:
+                        # Some combinations have no data and fail the same way every run
+                        pass
+                    total += time.perf_counter() - start
+                seconds += record.get("filter", 0)
+            filtered.append(seconds / len(requests))
+            totals.append(total / len(requests))
+        label = output_label(output_id)
+        yield "filter/{}/{}".format(name, label), stats(filtered, len(requests))
+        yield "callback/{}/{}".format(name, label), stats(totals, len(requests))
+
+
+def graph_cases(functions, calls, rounds):
+    parameters = {qualified: list(inspect.signature(function).parameters) for qualified, function in functions.items()}
+    for qualified, function in sorted(functions.items()):
+        if calls[qualified]:
+            recorded_calls = calls[qualified]
+        elif not parameters[qualified]:
+            # Figures of a layout (see Utils.graph_utils.DeferredFigure)
+            recorded_calls = [([], {})]
+        else:
+            # Not called by the vizzes: borrow the calls of a function with the same parameters it accepts
+            recorded_calls = []
+            for other in sorted(calls):
+                if parameters[other] == parameters[qualified] and calls[other]:
+                    recorded_calls = [call for call in calls[other] if succeeds(function, *call)]
+                    break
+        if not recorded_calls:
+            print("{}: no arguments to call it with".format(qualified), file=sys.stderr)
+            continue
+        yield "graph/" + qualified, stats(time_calls(
+            [lambda args=args, kwargs=kwargs: function(*args, **kwargs) for args, kwargs in recorded_calls], rounds),
+            len(recorded_calls))
+
+
+def succeeds(function, args, kwargs):
+    try:
+        function(*args, **kwargs)
+    except Exception:
+        return False
+    return True
+
+
+def run(rounds=ROUNDS, patterns=None):
+    '''
+    :param patterns: fnmatch patterns of the cases to run (ie. "graph/*"); all of them if None
+    :return: Dict of case -> statistics
+    '''
+    def wanted(case):
+        return not patterns or any(fnmatch.fnmatch(case, pattern) for pattern in patterns)
+
+    def prefixes(*kinds):
+        # Whether any case of these kinds can match, to skip the setup of the others
+        return not patterns or any("/" not in pattern or fnmatch.fnmatch(kind, pattern.split("/", 1)[0])
+                                   for kind in kinds for pattern in patterns)
+
+    results = {}
+
+    def report(cases):
+        for case, result in cases:
+            if wanted(case):
+                results[case] = result
+                print("{:<90} {:9.3f}ms  (+/- {:.3f}ms)".format(case, 1e3 * result["median"], 1e3 * result["stdev"]))
+
+    if prefixes("ingest", "preprocess"):
+        report(ingest_cases(rounds))
+    if prefixes("filter", "callback", "graph"):
+        vizzes, functions, calls = import_vizzes(record=prefixes("graph"))
+        if prefixes("filter", "callback"):
+            for name, viz in vizzes.items():
+                report(callback_cases(name, viz, rounds))
+        if prefixes("graph"):
+            report(graph_cases(functions, calls, rounds))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(rounds):
+    return {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "rounds": rounds,
+            "samples": SAMPLES, "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "pandas": pd.__version__, "numpy": np.__version__, "plotly": plotly.__version__}
+
+
+def compare(baseline, results, tolerance=TOLERANCE):
+    '''
+    Prints each case's median against a baseline run.
+
+    :param baseline: Dict of case -> statistics
+    :param results: Dict of case -> statistics
+    :return: Cases slower than tolerance times the baseline
+    '''
+    regressions = []
+    for case in sorted(set(baseline) & set(results)):
+        ratio = results[case]["median"] / baseline[case]["median"] if baseline[case]["median"] else 1.0
+        slower = ratio > tolerance
+        regressions += [case] if slower else []
+        print("{:<90} {:9.3f}ms -> {:9.3f}ms  {:5.2f}x{}".format(
+            case, 1e3 * baseline[case]["median"], 1e3 * results[case]["median"], ratio,
+            "  REGRESSION" if slower else ""))
+    for case in sorted(set(baseline) ^ set(results)):
+        print("{:<90} only in the {} run".format(case, "baseline" if case in baseline else "new"))
+    print("{} of {} cases slower than {}x the baseline".format(len(regressions), len(set(baseline) & set(results)),
+                                                                tolerance))
+    return regressions
+
+
+def read_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time ingest, preprocessing, filtering and figure building")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="times each case is run")
+    parser.add_argument("--only", nargs="+", metavar="PATTERN", help="cases to run (ie. 'graph/*' 'ingest/*')")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two runs without running")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        old, new = (read_results(path)["results"] for path in args.compare)
+        return 1 if compare(old, new, args.tolerance) else 0
+
+    warnings.simplefilter("ignore")
+    results = run(args.rounds, args.only)
+    meta = environment(args.rounds)
+    output = args.output or os.path.join(RESULTS_DIR, "{}-{}.json".format(
+        time.strftime("%Y%m%d-%H%M%S"), (meta["commit"] or "unknown")[:7]))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=1, sort_keys=True)
+    print("Wrote {} cases to {}".format(len(results), output))
+
+    if args.baseline:
+        return 1 if compare(read_results(args.baseline)["results"], results, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+# gunicorn settings of the portal: gunicorn -c gunicorn.conf.py wsgi:server
+import os
+
+bind = "0.0.0.0:{}".format(os.environ.get("PORT", "8050"))
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+# Import the app and load the tables once in the master, so the workers share them (see wsgi.py)
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Threads don't survive the fork: each worker polls Tables/ for edited tables itself (see
+    # Utils.data_utils.TableWatcher); TABLE_POLL_INTERVAL=0 turns this off
+    from Utils.data_utils import watch_tables
+    watch_tables()
+
+
+def child_exit(server, worker):
+    # Multiprocess metrics (PROMETHEUS_MULTIPROC_DIR, see Utils.metrics_utils) are told when a worker exits
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
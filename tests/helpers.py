@@ -0,0 +1,127 @@
+# Helpers shared by the tests and the benchmarks: importing every viz with its graph functions recorded, the dropdown
+# combinations sampled from each figure callback, and a local http.server standing in for raw.githubusercontent.com
+import importlib
+import inspect
+import sys
+import threading
+import time
+from functools import partial, wraps
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from Utils.prerender import figure_requests, import_viz, outputs_list, viz_names, warm_up
+
+# Modules whose graph functions the vizzes import
+GRAPH_MODULES = ["Utils.graph_utils", "Utils.graphs.percentage_graph_utils",
+                 "Utils.graphs.who_donates_how_much_graph_utils"]
+# Dropdown combinations sent to each callback
+SAMPLES = 4
+
+
+def sample(requests, count=SAMPLES):
+    # Evenly spread over the combinations, so that every run sends the same ones
+    if len(requests) <= count:
+        return requests
+    return [requests[round(i * (len(requests) - 1) / (count - 1))] for i in range(count)]
+
+
+def callback_requests(viz):
+    by_output = {}
+    for output_id, args in figure_requests(viz.app):
+        by_output.setdefault(output_id, []).append(args)
+    return {output_id: sample(requests) for output_id, requests in by_output.items()}
+
+
+def graph_functions(module):
+    return {name: function for name, function in vars(module).items()
+            if inspect.isfunction(function) and function.__module__ == module.__name__ and not name.startswith("_")
+            and any(marker in inspect.getsource(function) for marker in ["go.Figure(", "template.render("])}
+
+
+def import_vizzes(record=False):
+    '''
+    Imports every viz, with the figure cache off. With record, the graph functions are wrapped to record their
+    arguments while the vizzes are imported, their layouts built and their sampled requests are run.
+
+    :return: Dict of name -> viz module, dict of qualified name -> graph function, dict of qualified name -> list of
+             (args, kwargs) recorded
+    '''
+    functions, calls = {}, {}
+
+    def recorder(qualified, function):
+        @wraps(function)
+        def record(*args, **kwargs):
+            copied = [arg.copy() if hasattr(arg, "copy") else arg for arg in args]
+            figure = function(*args, **kwargs)
+            # Only calls that succeed, so that every round makes the same ones
+            calls[qualified].append((copied, kwargs))
+            return figure
+        record.recording = True
+        return record
+
+    def wrap(module):
+        for name, function in graph_functions(module).items():
+            qualified = "{}.{}".format(module.__name__, name)
+            functions[qualified], calls[qualified] = function, []
+            if record:
+                setattr(module, name, recorder(qualified, function))
+        if record:
+            # Functions of the graph modules the module imported before they were wrapped (ie. a viz imported
+            # earlier in the same process)
+            for name, value in list(vars(module).items()):
+                for qualified, function in functions.items():
+                    if value is function and not qualified.startswith(module.__name__ + "."):
+                        setattr(module, name, recorder(qualified, function))
+
+    def unwrap(module):
+        for name, value in list(vars(module).items()):
+            if getattr(value, "recording", False):
+                setattr(module, name, value.__wrapped__)
+
+    graph_modules = [importlib.import_module(name) for name in GRAPH_MODULES]
+    for module in graph_modules:
+        wrap(module)
+    try:
+        # The vizzes import the wrapped functions of the graph modules
+        vizzes = {name: import_viz(name) for name in viz_names()}
+        for viz in vizzes.values():
+            viz.figure_cache.max_entries = 0
+            wrap(viz)
+            if not record:
+                continue
+            # Builds the figures of the layout
+            warm_up([viz])
+            for output_id, requests in callback_requests(viz).items():
+                for args in requests:
+                    try:
+                        viz.app.callback_map[output_id]["callback"](*args, outputs_list=outputs_list(output_id))
+                    except Exception:
+                        pass
+    finally:
+        for module in graph_modules + [sys.modules["Vizes." + name] for name in viz_names()
+                                       if "Vizes." + name in sys.modules]:
+            unwrap(module)
+    return vizzes, functions, calls
+
+
+class SlowHandler(SimpleHTTPRequestHandler):
+    latency = 0.05
+
+    def send_head(self):
+        time.sleep(self.latency)
+        return super().send_head()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, latency):
+    '''
+    Serves the files of a directory over HTTP on a free local port, from a daemon thread.
+
+    :param latency: Seconds each request waits before it is answered
+    :return: The server (ThreadingHTTPServer); call shutdown() and server_close() to stop it
+    '''
+    handler = type("Handler", (SlowHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
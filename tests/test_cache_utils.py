@@ -0,0 +1,120 @@
+# Tests of the cache of figure callback responses and of their pre-compressed encodings (see Utils.cache_utils)
+import gzip
+import json
+
+import pytest
+
+from Utils import cache_utils
+from Utils.cache_utils import FigureCache, Response
+from Utils.data_utils import TableLoader, TableRegistry
+from Utils.prerender import figure_requests, import_viz, outputs_list
+
+
+def test_least_recently_used_evicted_first():
+    cache = FigureCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    # b was used least recently
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert len(cache) == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_bytes_bound():
+    cache = FigureCache(max_bytes=10)
+    cache.put("a", "x" * 4)
+    cache.put("b", "x" * 4)
+    cache.put("c", "x" * 4)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+    # Responses larger than the whole cache aren't stored
+    cache.put("d", "x" * 11)
+    assert cache.get("d") is None
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_counters():
+    cache = FigureCache()
+    assert cache.get("a") is None
+    cache.put("a", "1")
+    assert isinstance(cache.get("a"), Response)
+    cache.get("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (2, 1, 1, 1)
+
+
+def test_reloaded_table_invalidates_its_figures():
+    registry = TableRegistry(names=["DonRate", "AvgTotDon"], preprocess=None, loader=TableLoader(preprocess=None))
+    cache = FigureCache()
+    calls = []
+
+    def figure(name):
+        calls.append(name)
+        return '{{"rows": {}}}'.format(len(registry[name]))
+
+    cached = cache("graph.figure")(figure)
+    cached("DonRate")
+    cached("AvgTotDon")
+    cached("DonRate")
+    assert calls == ["DonRate", "AvgTotDon"]
+
+    registry.loader.reload([("DonRate", None)])
+    assert cache.stats()["invalidations"] == 1
+    # Only the figure made from the reloaded table is made again
+    cached("DonRate")
+    cached("AvgTotDon")
+    assert calls == ["DonRate", "AvgTotDon", "DonRate"]
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.fixture
+def figure_request(monkeypatch):
+    '''
+    :return: Flask test client of a viz and a request of one of its figures, as a page sends it
+    '''
+    viz = import_viz("why_do_canadians_give")
+    # Cached figures, even if another test turned the cache off
+    monkeypatch.setattr(viz.figure_cache, "max_entries", 2048)
+    viz.figure_cache.clear()
+    output_id, args = figure_requests(viz.app)[0]
+    callback = viz.app.callback_map[output_id]
+    body = {"output": output_id, "outputs": outputs_list(output_id), "state": [], "changedPropIds": [],
+            "inputs": [dict(i, value=value) for i, value in zip(callback["inputs"], args)]}
+    return viz.app.server.test_client(), body
+
+
+def post(client, body, accept_encoding=None):
+    headers = {} if accept_encoding is None else {"Accept-Encoding": accept_encoding}
+    response = client.post("/_dash-update-component", json=body, headers=headers)
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.parametrize("accept_encoding, encoding, decompress", [
+    pytest.param("gzip, deflate, br", "br", getattr(cache_utils.brotli, "decompress", None),
+                 marks=pytest.mark.skipif(cache_utils.brotli is None, reason="brotli isn't installed")),
+    ("gzip;q=1.0, br;q=0", "gzip", gzip.decompress),
+    ("gzip", "gzip", gzip.decompress),
+])
+def test_send_compressed(figure_request, accept_encoding, encoding, decompress):
+    client, body = figure_request
+    identity = post(client, body)
+    assert "Content-Encoding" not in identity.headers
+    expected = json.loads(identity.get_data())
+
+    for _ in range(2):  # Compressed, then sent as compressed the first time
+        response = post(client, body, accept_encoding)
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert json.loads(decompress(response.get_data())) == expected
+
+
+def test_send_compressed_without_brotli(figure_request, monkeypatch):
+    monkeypatch.setattr(cache_utils, "brotli", None)
+    client, body = figure_request
+    response = post(client, body, "br, gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.get_data())) == json.loads(post(client, body).get_data())
@@ -0,0 +1,63 @@
+# Tests of the callbacks batch_callbacks() folds into one multi-output callback (see Utils.callback_utils)
+import json
+import logging
+
+import dash
+import dash_core_components as dcc
+import dash_html_components as html
+import pytest
+from dash.dependencies import Input, Output
+
+from Utils.callback_utils import batch_callbacks
+from Utils.prerender import input_options, import_viz, outputs_list
+
+REGION = Input("region-selection", "value")
+
+
+def call(app, output_id, *args):
+    '''
+    :return: Dict of output id -> value, of the outputs the callback updated
+    '''
+    response = json.loads(app.callback_map[output_id]["callback"](*args, outputs_list=outputs_list(output_id)))
+    return {"{}.{}".format(component_id, prop): value
+            for component_id, props in response["response"].items() for prop, value in props.items()}
+
+
+@pytest.mark.parametrize("name", ["who_donates_how_much_VIZ1", "who_donates_how_much_app"])
+def test_batched_like_one_by_one(name, monkeypatch):
+    viz = import_viz(name)
+    monkeypatch.setattr(viz.figure_cache, "max_entries", 0)
+    batched = [output_id for output_id in viz.app.callback_map if output_id.startswith("..")]
+    assert len(batched) == 1
+    folded = batched[0][2:-2].split("...")
+    for region in input_options(viz.app.layout)["region-selection"]:
+        together = call(viz.app, batched[0], region)
+        assert list(together) == folded
+        for output_id in folded:
+            # The folded callbacks stay registered on their own
+            assert together[output_id] == call(viz.app, output_id, region)[output_id], (region, output_id)
+
+
+def test_failed_callback_leaves_its_output(caplog):
+    app = dash.Dash(__name__)
+    app.layout = html.Div([dcc.Dropdown(id="region-selection", value="CA"), dcc.Graph(id="a"), dcc.Graph(id="b"),
+                           dcc.Graph(id="c")])
+
+    @app.callback(Output("a", "figure"), [REGION])
+    def a(region):
+        return {"layout": {"title": region}}
+
+    @app.callback(Output("b", "figure"), [REGION])
+    def b(region):
+        raise KeyError(region)
+
+    @app.callback(Output("c", "figure"), [REGION])
+    def c(region):
+        return {"layout": {"title": region.lower()}}
+
+    output_ids = batch_callbacks(app, [REGION])
+    assert output_ids == ["a.figure", "b.figure", "c.figure"]
+    with caplog.at_level(logging.ERROR, logger="Utils.callback_utils"):
+        updated = call(app, "..a.figure...b.figure...c.figure..", "QC")
+    assert updated == {"a.figure": {"layout": {"title": "QC"}}, "c.figure": {"layout": {"title": "qc"}}}
+    assert "b.figure failed" in caplog.text and "KeyError" in caplog.text
@@ -0,0 +1,186 @@
+# Tests of reading, validating and snapshotting the tables (see Utils.data_utils)
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Utils import data_utils
+from Utils.data_utils import (INDEXED_TABLES, PROVINCIAL_TABLES, SchemaError, load_preprocessed, load_tables,
+                              read_arrays, read_csv_table, snapshot_path, table_spec, validate_table, write_arrays)
+
+TABLE = "DonRate"
+# Tables of every family, in no particular order of size
+NAMES = ["ReasonsForGiving", PROVINCIAL_TABLES[0], INDEXED_TABLES[0], "VolRate", "GivingConcerns"]
+
+
+@pytest.fixture
+def tables(tmp_path, monkeypatch):
+    '''
+    Reads the tables from a copy of one of them in another Tables/ (and Store/), so the repo's aren't touched, and
+    records the tables preprocessed.
+
+    :return: List of the lists of names preprocess_tables() was called with
+    '''
+    (tmp_path / "Tables").mkdir()
+    shutil.copy(data_utils.table_path(TABLE), tmp_path / "Tables")
+    monkeypatch.setattr(data_utils, "TABLES_DIR", str(tmp_path / "Tables"))
+    monkeypatch.setattr(data_utils, "STORE_DIR", str(tmp_path / "Store"))
+    built = []
+    preprocess = data_utils.preprocess_tables
+
+    def spy(tables, specs=None):
+        if tables:
+            built.append(sorted(tables))
+        return preprocess(tables, specs)
+
+    monkeypatch.setattr(data_utils, "preprocess_tables", spy)
+    return built
+
+
+def snapshots(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".npz"))
+
+
+def test_snapshot_read_back(tables, tmp_path):
+    directory = str(tmp_path / "Snapshot")
+    first = load_preprocessed([TABLE], directory)[TABLE]
+    assert tables == [[TABLE]]
+    assert snapshots(directory) == [os.path.basename(snapshot_path(TABLE, data_utils.preprocess_hash(TABLE)))]
+
+    pd.testing.assert_frame_equal(load_preprocessed([TABLE], directory)[TABLE], first)
+    assert tables == [[TABLE]]
+
+
+def test_changed_csv_rebuilds_snapshot(tables, tmp_path):
+    directory = str(tmp_path / "Snapshot")
+    load_preprocessed([TABLE], directory)
+    before = snapshots(directory)
+
+    df = pd.read_csv(data_utils.table_path(TABLE), keep_default_na=False)
+    df["Estimate"] = df["Estimate"] / 2
+    df.to_csv(data_utils.table_path(TABLE), index=False)
+    rebuilt = load_preprocessed([TABLE], directory)[TABLE]
+    assert tables == [[TABLE], [TABLE]]
+    pd.testing.assert_frame_equal(rebuilt, data_utils.preprocess_table(TABLE, data_utils.read_csv_table(TABLE)))
+    # The snapshot of the old CSV is removed
+    after = snapshots(directory)
+    assert len(after) == 1 and after != before
+
+
+def test_changed_spec_rebuilds_snapshot(tables, tmp_path, monkeypatch):
+    directory = str(tmp_path / "Snapshot")
+    load_preprocessed([TABLE], directory)
+    before = snapshots(directory)
+
+    monkeypatch.setitem(data_utils.TABLE_SPECS, TABLE, dict(table_spec(TABLE), attribute_wrap=10))
+    load_preprocessed([TABLE], directory)
+    assert tables == [[TABLE], [TABLE]]
+    after = snapshots(directory)
+    assert len(after) == 1 and after != before
+
+
+@pytest.mark.skipif(data_utils.fcntl is None, reason="snapshots are locked with fcntl")
+def test_one_builder(tables, tmp_path, monkeypatch):
+    directory = str(tmp_path / "Snapshot")
+    workers = 4
+    missed = threading.Barrier(workers)
+    lock = data_utils._snapshot_lock
+
+    def locked(directory):
+        # Every worker has missed the snapshot before the first one builds it
+        missed.wait(timeout=30)
+        return lock(directory)
+
+    monkeypatch.setattr(data_utils, "_snapshot_lock", locked)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(load_preprocessed([TABLE], directory)[TABLE]))
+               for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert tables == [[TABLE]]
+    assert len(results) == workers
+    for result in results[1:]:
+        pd.testing.assert_frame_equal(result, results[0])
+
+
+def test_write_arrays_is_atomic(tmp_path, monkeypatch):
+    path = str(tmp_path / "table.npz")
+    df = pd.DataFrame({"Estimate": [1.5, np.nan], "Group": ["a", "b"]})
+
+    def fail(f, **arrays):
+        f.write(b"half a table")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "savez", fail)
+    with pytest.raises(OSError):
+        write_arrays(path, df)
+    # Readers never see the half written file
+    assert not os.path.exists(path)
+
+    monkeypatch.undo()
+    write_arrays(path, df)
+    pd.testing.assert_frame_equal(read_arrays(path), df)
+
+
+def write_table(tmp_path, change):
+    '''
+    :param change: Function changing the table's rows (a dataframe of strings, as in the CSV)
+    :return: Path of the changed copy of the table
+    '''
+    df = pd.read_csv(data_utils.table_path(TABLE), dtype=str, keep_default_na=False)
+    change(df)
+    path = str(tmp_path / "table.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("column, value, violation", [
+    # Group can't be missing
+    ("Group", "", "Group: missing on rows [1]"),
+    # Marker is "*", "..." or missing
+    ("Marker", "?", "Marker: unexpected values ['?'] on rows [1]"),
+    # Unweightedn is missing where it is "-", not "x"
+    ("Unweightedn", "x", "could not convert string to float: 'x'"),
+])
+def test_schema_errors(tmp_path, column, value, violation):
+    def change(df):
+        df.loc[1, column] = value
+
+    path = write_table(tmp_path, change)
+    with pytest.raises(SchemaError, match="^{}: ".format(TABLE)) as error:
+        read_csv_table(TABLE, path)
+    assert violation in str(error.value)
+
+
+def test_schema_errors_listed(tmp_path):
+    def change(df):
+        df.loc[[0, 2], "Group"] = ""
+        df.loc[3, "Region"] = "YT"
+
+    with pytest.raises(SchemaError) as error:
+        read_csv_table(TABLE, write_table(tmp_path, change))
+    assert str(error.value) == "{}: Group: missing on rows [0, 2]; Region: unexpected values ['YT'] on rows [3]".format(
+        TABLE)
+
+
+def test_validate_dtypes():
+    df = read_csv_table(TABLE)
+    assert validate_table(TABLE, df) == []
+    df["Estimate"] = df["Estimate"].astype(str)
+    df["Year"] = df["Year"].astype(float)
+    assert validate_table(TABLE, df) == ["Year: float64 instead of int64", "Estimate: object instead of float64"]
+
+
+@pytest.mark.parametrize("threads", [False, True])
+def test_pools_read_like_one_by_one(threads):
+    sequential = load_tables(NAMES, workers=1)
+    pooled = load_tables(NAMES, workers=3, threads=threads)
+    # In the order asked for, not the largest first order they are read in
+    assert list(pooled) == NAMES
+    for name in NAMES:
+        pd.testing.assert_frame_equal(pooled[name], sequential[name])
@@ -0,0 +1,54 @@
+# Tests that the figures of a layout (Utils.graph_utils.DeferredFigure) are built again once a table they are built
+# from is reloaded (see Utils.data_utils.TableLoader.reload)
+import json
+
+import pandas as pd
+import plotly
+
+from Utils import data_utils
+from Utils.graph_utils import DeferredFigure
+from Utils.prerender import import_viz
+
+
+def layout_figure(component, graph_id):
+    # Figure of the dcc.Graph with that id
+    if getattr(component, "id", None) == graph_id:
+        return component.figure
+    children = getattr(component, "children", None)
+    for child in children if isinstance(children, list) else [children]:
+        if child is not None and not isinstance(child, str):
+            figure = layout_figure(child, graph_id)
+            if figure is not None:
+                return figure
+    return None
+
+
+def to_json(figure):
+    return json.loads(json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def test_layout_figure_rebuilt_after_reload(tmp_path, monkeypatch):
+    viz = import_viz("who_volunteers_how_much")
+    figure = layout_figure(viz.app.layout, "VolRateAvgHours-prv")
+    assert isinstance(figure, DeferredFigure)
+    before = to_json(figure)
+
+    # VolRate with every volunteer rate halved, read from another Tables/ (and Store/ and snapshot directory, so the
+    # repo's aren't touched)
+    table = pd.read_csv(data_utils.table_path("VolRate"), keep_default_na=False)
+    table["Estimate"] = table["Estimate"] / 2
+    (tmp_path / "Tables").mkdir()
+    monkeypatch.setattr(data_utils, "TABLES_DIR", str(tmp_path / "Tables"))
+    monkeypatch.setattr(data_utils, "STORE_DIR", str(tmp_path / "Store"))
+    monkeypatch.setattr(viz.registry.loader, "snapshot", str(tmp_path / "Snapshot"))
+    table.to_csv(data_utils.table_path("VolRate"), index=False)
+    key = ("VolRate", None)
+    try:
+        assert viz.registry.loader.reload([key]) == [key]
+        reloaded = to_json(figure)
+        assert reloaded != before
+        assert reloaded == to_json(figure.build())
+    finally:
+        monkeypatch.undo()
+        viz.registry.loader.reload([key])
+    assert to_json(figure) == before
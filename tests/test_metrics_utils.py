@@ -0,0 +1,56 @@
+# Tests of the callback metrics served on /metrics (see Utils.metrics_utils), scraped after requests sent to a viz
+# the way a page sends them
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from Utils.metrics_utils import output_label
+from Utils.prerender import figure_requests, import_viz, outputs_list
+
+
+def scrape(client):
+    '''
+    :return: Dict of (sample name, tuple of sorted labels) -> value
+    '''
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {(sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.get_data(as_text=True)) for sample in family.samples}
+
+
+def changes(before, after, name, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    return after.get(key, 0) - before.get(key, 0)
+
+
+@pytest.fixture
+def viz(monkeypatch):
+    viz = import_viz("why_do_canadians_give")
+    # Cached figures, even if another test turned the cache off
+    monkeypatch.setattr(viz.figure_cache, "max_entries", 2048)
+    viz.figure_cache.clear()
+    return viz
+
+
+def test_callback_metrics(viz):
+    output_id, args = figure_requests(viz.app)[0]
+    callback = viz.app.callback_map[output_id]
+    body = {"output": output_id, "outputs": outputs_list(output_id), "state": [], "changedPropIds": [],
+            "inputs": [dict(i, value=value) for i, value in zip(callback["inputs"], args)]}
+    label = output_label(output_id)
+    client = viz.app.server.test_client()
+
+    start = scrape(client)
+    assert client.post("/_dash-update-component", json=body).status_code == 200
+    first = scrape(client)
+    assert changes(start, first, "dash_callback_seconds_count", output=label) == 1
+    for phase in ["filter", "build", "serialize"]:
+        assert changes(start, first, "dash_callback_phase_seconds_count", output=label, phase=phase) == 1
+        assert changes(start, first, "dash_callback_phase_seconds_sum", output=label, phase=phase) > 0
+    assert changes(start, first, "dash_callback_cache_requests_total", output=label, result="miss") == 1
+    assert changes(start, first, "dash_callback_cache_requests_total", output=label, result="hit") == 0
+
+    assert client.post("/_dash-update-component", json=body).status_code == 200
+    second = scrape(client)
+    assert changes(first, second, "dash_callback_seconds_count", output=label) == 1
+    assert changes(first, second, "dash_callback_cache_requests_total", output=label, result="miss") == 0
+    assert changes(first, second, "dash_callback_cache_requests_total", output=label, result="hit") == 1
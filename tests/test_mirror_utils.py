@@ -0,0 +1,81 @@
+# Tests of the mirror of remote tables (see Utils.mirror_utils), against a local http.server standing in for
+# raw.githubusercontent.com
+import os
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+from Utils.data_utils import TABLES_DIR
+from Utils.mirror_utils import REPO_TABLES_URL, fetch, read_index, resolve
+from tests.helpers import serve
+
+TABLE = "2018-DonRate.csv"
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    '''
+    :return: Namespace of the server, the URL of a table on it, the path of the table it serves and a mirror directory
+    '''
+    directory = tmp_path / "upstream"
+    directory.mkdir()
+    shutil.copy(os.path.join(TABLES_DIR, TABLE), directory)
+    server = serve(str(directory), 0)
+    yield SimpleNamespace(server=server, url="http://127.0.0.1:{}/{}".format(server.server_address[1], TABLE),
+                          source=str(directory / TABLE), mirror=str(tmp_path / "mirror"))
+    stop(server)
+
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_fetch_writes_then_revalidates(upstream):
+    url, source, mirror = upstream.url, upstream.source, upstream.mirror
+    path, status = fetch(url, mirror)
+    assert status == 200
+    assert read(path) == read(source)
+    assert read_index(mirror)[url]["last_modified"]
+
+    written = os.stat(path).st_mtime_ns
+    assert fetch(url, mirror) == (path, 304)
+    assert os.stat(path).st_mtime_ns == written
+    assert read(path) == read(source)
+
+
+def test_fetch_downloads_a_changed_table(upstream):
+    url, source, mirror = upstream.url, upstream.source, upstream.mirror
+    path, _ = fetch(url, mirror)
+    with open(source, "a") as f:
+        f.write("\n")
+    stat = os.stat(source)
+    os.utime(source, (stat.st_atime, stat.st_mtime + 2))
+
+    changed, status = fetch(url, mirror)
+    assert status == 200
+    assert changed != path
+    assert read(changed) == read(source)
+
+
+def test_resolve_offline(upstream):
+    url, mirror = upstream.url, upstream.mirror
+    path, _ = fetch(url, mirror)
+    stop(upstream.server)
+    with pytest.raises(OSError):
+        fetch(url, mirror)
+
+    assert resolve(url, mirror) == path
+    # Can't revalidate, the mirrored copy is used anyway
+    assert resolve(url, mirror, revalidate=True) == path
+    assert read(path) == read(upstream.source)
+
+
+def test_resolve_repo_table_without_mirror(tmp_path):
+    assert resolve(REPO_TABLES_URL + TABLE, str(tmp_path)) == os.path.join(TABLES_DIR, TABLE)
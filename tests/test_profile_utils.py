@@ -0,0 +1,88 @@
+# Tests of the sampled callback profiles and the routes serving them (see Utils.profile_utils)
+import cProfile
+import os
+
+import flask
+import pytest
+
+from Utils import profile_utils
+from Utils.profile_utils import ProfileRing, profiled, serve_profiles
+
+TOKEN = "secret"
+
+
+def profile():
+    profile = cProfile.Profile()
+    profile.enable()
+    sum(range(1000))
+    profile.disable()
+    return profile
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    '''
+    :return: Flask test client serving a ring of 3 profiles (keeping 2)
+    '''
+    monkeypatch.setattr(profile_utils, "PROFILE_TOKEN", TOKEN)
+    ring = ProfileRing(str(tmp_path), keep=2)
+    for i in range(3):
+        ring.add(profile(), {"output": "graph-{}.figure".format(i)})
+    server = flask.Flask(__name__)
+    serve_profiles(server, ring)
+    return server.test_client()
+
+
+def test_ring_keeps_the_newest(tmp_path):
+    ring = ProfileRing(str(tmp_path), keep=2)
+    names = [ring.add(profile(), {"output": "graph-{}.figure".format(i)}) for i in range(5)]
+    assert ring.names() == names[-2:]
+    assert [metadata["output"] for metadata in ring.list()] == ["graph-4.figure", "graph-3.figure"]
+    # The dumps of the trimmed profiles go too
+    assert sorted(os.listdir(tmp_path)) == sorted(name + suffix for name in names[-2:] for suffix in [".json", ".prof"])
+    assert ring.path(names[0]) is None
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Profile-Token": ""}, {"X-Profile-Token": "wrong"}])
+def test_token_required(client, headers):
+    assert client.get("/admin/profiles", headers=headers).status_code == 403
+    name = client.get("/admin/profiles", headers={"X-Profile-Token": TOKEN}).get_json()[0]["name"]
+    assert client.get("/admin/profiles/" + name, headers=headers).status_code == 403
+
+
+def test_forbidden_without_token_set(client, monkeypatch):
+    monkeypatch.setattr(profile_utils, "PROFILE_TOKEN", None)
+    assert client.get("/admin/profiles", headers={"X-Profile-Token": ""}).status_code == 403
+
+
+def test_profiles_served(client):
+    headers = {"X-Profile-Token": TOKEN}
+    listed = client.get("/admin/profiles", headers=headers).get_json()
+    assert [metadata["output"] for metadata in listed] == ["graph-2.figure", "graph-1.figure"]
+    response = client.get("/admin/profiles/" + listed[0]["name"], headers=headers)
+    assert response.status_code == 200 and response.data
+    text = client.get("/admin/profiles/{}?format=text".format(listed[0]["name"]), headers=headers)
+    assert "function calls" in text.get_data(as_text=True)
+    assert client.get("/admin/profiles/missing", headers=headers).status_code == 404
+
+
+def test_failing_ring_doesnt_fail_the_callback(tmp_path):
+    class FullRing(ProfileRing):
+        def add(self, profile, metadata):
+            raise OSError("disk full")
+
+    callback = profiled(lambda region: region.lower(), "graph.figure", FullRing(str(tmp_path)), rate=1)
+    assert callback("CA") == "ca"
+
+
+def test_profiler_busy_runs_unprofiled(tmp_path, monkeypatch):
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            # What Python 3.12+ raises while another thread is profiled
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile, "Profile", BusyProfile)
+    ring = ProfileRing(str(tmp_path))
+    callback = profiled(lambda region: region.lower(), "graph.figure", ring, rate=1)
+    assert callback("CA") == "ca"
+    assert ring.names() == []
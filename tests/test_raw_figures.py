@@ -0,0 +1,83 @@
+# Tests that the figures the vizzes build as plain dicts (Utils.graph_utils.RawFigure, and the FigureTemplate clones
+# of Utils.graphs.percentage_graph_utils) serialize to the same JSON as validated plotly figures.
+#
+# Every graph function is called with the arguments the vizzes called it with (their layouts, and the first dropdown
+# combinations of each callback, see tests.helpers.import_vizzes), once as the vizzes build figures and once with
+# plotly.graph_objects as go in every viz and graph module.
+import importlib
+import json
+from contextlib import contextmanager
+
+import plotly
+import plotly.graph_objects as go
+import pytest
+
+from Utils.graph_utils import DeferredFigure
+from tests.helpers import GRAPH_MODULES, import_vizzes
+
+
+@pytest.fixture(scope="module")
+def recorded():
+    return import_vizzes(record=True)
+
+
+@contextmanager
+def validated_figures(vizzes):
+    # Swaps go for plotly.graph_objects, which also turns off the templates
+    modules = [importlib.import_module(name) for name in GRAPH_MODULES] + list(vizzes.values())
+    saved = [(module, name, getattr(module, name)) for module in modules for name in ["go", "RAW_FIGURES"]
+             if hasattr(module, name)]
+    try:
+        for module, name, _ in saved:
+            setattr(module, name, go if name == "go" else False)
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+def to_json(figure):
+    return json.loads(json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def call(function, args, kwargs):
+    # Fresh copies: some graph functions change the frames they are given
+    return to_json(function(*[arg.copy() if hasattr(arg, "copy") else arg for arg in args], **kwargs))
+
+
+def deferred_figures(component, found):
+    if isinstance(component, DeferredFigure):
+        found.append(component)
+    elif isinstance(component, (list, tuple)):
+        for child in component:
+            deferred_figures(child, found)
+    elif hasattr(component, "to_plotly_json") and not isinstance(component, dict):
+        for value in vars(component).values():
+            deferred_figures(value, found)
+    return found
+
+
+def test_graph_functions_match_plotly(recorded):
+    vizzes, functions, calls = recorded
+    called = [qualified for qualified in sorted(functions) if calls[qualified]]
+    # The shared graph modules are checked too, not only the functions of the vizzes
+    for module in GRAPH_MODULES[1:]:
+        assert any(qualified.startswith(module + ".") for qualified in called), module
+
+    for qualified in called:
+        function = functions[qualified]
+        for i, (args, kwargs) in enumerate(calls[qualified]):
+            raw = call(function, args, kwargs)
+            with validated_figures(vizzes):
+                validated = call(function, args, kwargs)
+            assert raw == validated, "{} differs from plotly for call {}".format(qualified, i)
+
+
+def test_layout_figures_match_plotly(recorded):
+    vizzes = recorded[0]
+    for name, viz in sorted(vizzes.items()):
+        for i, deferred in enumerate(deferred_figures(viz.app.layout, [])):
+            raw = to_json(deferred.build())
+            with validated_figures(vizzes):
+                validated = to_json(deferred.build())
+            assert raw == validated, "{}: layout figure {} differs from plotly".format(name, i)
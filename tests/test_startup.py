@@ -0,0 +1,47 @@
+# Tests that importing a viz, as a server process does before it can bind, reads no table and builds no figure or
+# dropdown options: they wait for the first request (see Utils.data_utils.TableRegistry and
+# Utils.graph_utils.DeferredValue). How long the imports take is timed by benchmarks.bench_startup
+import importlib
+import sys
+
+import pytest
+
+import Vizes
+from Utils.data_utils import TableLoader
+from Utils.graph_utils import DeferredValue
+from Utils.prerender import viz_names
+
+
+@pytest.fixture
+def spied(monkeypatch):
+    '''
+    :return: List of the tables read and layout values built, as (kind, name) tuples
+    '''
+    calls = []
+    build, read, value = TableLoader._build, TableLoader._read, DeferredValue.value
+
+    def spy_build(self, keys):
+        calls.extend(("built table", key[0]) for key in keys)
+        return build(self, keys)
+
+    def spy_read(self, key):
+        calls.append(("read table", key[0]))
+        return read(self, key)
+
+    def spy_value(self):
+        calls.append(("built value", getattr(self.build, "__qualname__", self.build)))
+        return value(self)
+
+    monkeypatch.setattr(TableLoader, "_build", spy_build)
+    monkeypatch.setattr(TableLoader, "_read", spy_read)
+    monkeypatch.setattr(DeferredValue, "value", spy_value)
+    return calls
+
+
+@pytest.mark.parametrize("name", viz_names())
+def test_import_reads_no_table(name, spied, monkeypatch):
+    # Imported again, other tests may already have imported it (the module they use is put back afterwards)
+    monkeypatch.delitem(sys.modules, "Vizes." + name, raising=False)
+    monkeypatch.delattr(Vizes, name, raising=False)
+    importlib.import_module("Vizes." + name)
+    assert spied == []
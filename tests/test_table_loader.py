@@ -0,0 +1,62 @@
+# Tests of the table loader's views of its tables (see Utils.data_utils.TableLoader and pinned_tables()) and of the
+# watcher reloading them (see Utils.data_utils.TableWatcher)
+import logging
+import os
+import shutil
+
+import pandas as pd
+
+from Utils import data_utils
+from Utils.data_utils import SharedTable, TableLoader, TableRegistry, TableWatcher, pinned_tables
+
+
+def test_share_keeps_pinned_views(tmp_path):
+    loader = TableLoader()
+    registry = TableRegistry(names=["DonRate"], loader=loader)
+    before = registry["DonRate"]
+    key = ("DonRate", None)
+    with pinned_tables():
+        pinned = loader.get(key)
+        assert loader.share(str(tmp_path)) == 1
+        # A callback running while the tables are shared keeps reading the dataframe it started with
+        assert loader.get(key) is pinned
+    assert isinstance(loader.get(key), SharedTable)
+    pd.testing.assert_frame_equal(registry["DonRate"], before)
+
+
+def test_failed_reload_retried(tmp_path, monkeypatch, caplog):
+    # Reads DonRate from a copy in another Tables/ (and Store/), so the repo's aren't touched
+    (tmp_path / "Tables").mkdir()
+    shutil.copy(data_utils.table_path("DonRate"), tmp_path / "Tables")
+    monkeypatch.setattr(data_utils, "TABLES_DIR", str(tmp_path / "Tables"))
+    monkeypatch.setattr(data_utils, "STORE_DIR", str(tmp_path / "Store"))
+    loader = TableLoader(preprocess=None)
+    registry = TableRegistry(names=["DonRate"], preprocess=None, loader=loader)
+    before = registry["DonRate"]
+    watcher = TableWatcher(loader)
+    assert watcher.poll() == []
+
+    path = data_utils.table_path("DonRate")
+    table = before.copy()
+    table["Estimate"] = table["Estimate"] / 2
+    table.to_csv(path, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # Seen changed, then unchanged since
+    assert watcher.poll() == []
+
+    def fail(keys):
+        raise OSError("read half a file")
+
+    build = loader._build
+    monkeypatch.setattr(loader, "_build", fail)
+    with caplog.at_level(logging.ERROR, logger="Utils.data_utils"):
+        assert watcher.poll() == []
+    assert "Reloading tables failed: DonRate" in caplog.text
+    pd.testing.assert_frame_equal(registry["DonRate"], before)
+
+    # Tried again on the next poll, though the file didn't change since
+    monkeypatch.setattr(loader, "_build", build)
+    assert watcher.poll() == [("DonRate", None)]
+    pd.testing.assert_series_equal(registry["DonRate"]["Estimate"], before["Estimate"] / 2)
+    assert watcher.poll() == []
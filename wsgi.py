@@ -0,0 +1,26 @@
+# WSGI entry point of the portal (app.py) for gunicorn: gunicorn -c gunicorn.conf.py wsgi:server
+#
+# With preload_app (see gunicorn.conf.py) the gunicorn master imports this module once, before forking the workers:
+# every table the pages use is loaded and preprocessed here, and the workers share those pages copy-on-write instead
+# of each importing the portal and loading its own copy. SHARED_TABLES=1 also moves the tables to memory-mapped files
+# (see Utils.data_utils.TableLoader.share), which no worker can dirty, at the cost of decoding rows on every slice.
+#
+# The workers of a pod hold the tables of every page, so they are stored compacted here (COMPACT_TABLES, see
+# Utils.data_utils.compact_tables) unless COMPACT_TABLES=0: slower slices, for about half the memory.
+import os
+
+os.environ.setdefault("COMPACT_TABLES", "1")
+
+from Utils.data_utils import LOADERS
+from Utils.prerender import warm_up
+import app as portal
+
+SHARED_TABLES = os.environ.get("SHARED_TABLES", "0") == "1"
+
+# Build the figures the pages' layouts defer to the first request too (see Utils.prerender.warm_up)
+warm_up([viz for _, _, viz in portal.PAGES])
+if SHARED_TABLES:
+    for loader in LOADERS.values():
+        loader.share()
+
+server = portal.server